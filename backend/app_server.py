@@ -4,15 +4,25 @@ Madani Maktab - Cloud-Ready Server
 Server that automatically uses SQLite for local development and Cloud SQL for production
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, make_response, send_from_directory, stream_with_context
 from flask_cors import CORS
+from functools import wraps
+import csv
+import hashlib
+import io
 import json
 import os
+import time
 import logging
 from datetime import datetime
+from urllib.parse import quote
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from json_provider import FastJSONProvider
+from log_config import configure_logging
+from metrics import create_request_metrics
+
+# Configure logging (LOG_PROFILE=production keeps request-path logging quiet)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file if it exists
@@ -54,6 +64,8 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_PATH = os.path.join(BASE_DIR, "../frontend")
 
 app = Flask(__name__, static_folder=FRONTEND_PATH)
+# orjson when installed; ISO dates/datetimes and numeric Decimals either way
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # Initialize database based on environment
@@ -131,19 +143,89 @@ app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour session timeout
 if not os.path.exists(app.config['SESSION_FILE_DIR']):
     os.makedirs(app.config['SESSION_FILE_DIR'])
 
+# Request metrics (see /api/metrics)
+request_metrics = create_request_metrics()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    request_metrics.request_started()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by URL rule, not path, so /api/students/<student_id> is one series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        # Only a length that is already known: computing one would buffer a streamed body
+        size = None if response.is_streamed or response.direct_passthrough else response.content_length
+        request_metrics.observe(
+            request.method, route, response.status_code,
+            time.perf_counter() - started, size
+        )
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    request_metrics.request_finished()
+
+# Conditional GET support
+def conditional_get(*tables):
+    """
+    Tag GET responses with an ETag built from the version stamps of `tables`
+    and answer a matching If-None-Match with 304, skipping the query entirely.
+    Version stamps are bumped by the database layer on every write. They are
+    also rolled over every CACHE_TTL seconds so writes made outside the app
+    (scripts, manual SQL) are picked up eventually.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = [db.cache.version(table) for table in tables]
+            except Exception as e:
+                logger.warning(f"Could not read table versions for ETag: {e}")
+                return view(*args, **kwargs)
+            
+            bucket = int(time.time() // db.cache.ttl) if db.cache.ttl > 0 else 0
+            stamp = '|'.join([request.full_path, str(bucket)] + versions)
+            etag = hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+            
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            # Let browsers keep the body but revalidate on every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+MAX_PAGE_SIZE = 200
+
+def get_page_args(default_limit=50):
+    """(limit, cursor) from the query string; None only for ?all=true, the legacy unbounded list"""
+    if request.args.get('all') == 'true':
+        return None
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit, request.args.get('cursor') or None
+
 # ✅ Serve frontend files with correct path
 @app.route('/')
 def serve_index():
-    logger.info(f"Root route accessed - Session: {dict(session)}")
+    logger.debug("Root route accessed - Session: %s", session)
     # Check if user is authenticated before serving the main application
     if 'user_id' not in session:
-        logger.info("🔒 User not authenticated, serving login page")
+        logger.debug("🔒 User not authenticated, serving login page")
         return send_from_directory(FRONTEND_PATH, 'login.html')
     
-    logger.info(f"User authenticated, serving main application")
-    logger.info(f"Serving index.html from: {FRONTEND_PATH}")
-    logger.info(f"FRONTEND_PATH exists: {os.path.exists(FRONTEND_PATH)}")
-    logger.info(f"index.html exists: {os.path.exists(os.path.join(FRONTEND_PATH, 'index.html'))}")
+    logger.debug("User authenticated, serving index.html from: %s", FRONTEND_PATH)
     try:
         return send_from_directory(FRONTEND_PATH, 'index.html')
     except Exception as e:
@@ -152,13 +234,13 @@ def serve_index():
 
 @app.route('/login.html')
 def serve_login():
-    logger.info(f"Login route accessed - Session: {dict(session)}")
+    logger.debug("Login route accessed - Session: %s", session)
     # If user is already authenticated, redirect to main app
     if 'user_id' in session:
-        logger.info("🔒 User already authenticated, serving main app")
+        logger.debug("🔒 User already authenticated, serving main app")
         return send_from_directory(FRONTEND_PATH, 'index.html')
     
-    logger.info(f"Serving login.html from: {FRONTEND_PATH}")
+    logger.debug("Serving login.html from: %s", FRONTEND_PATH)
     try:
         return send_from_directory(FRONTEND_PATH, 'login.html')
     except Exception as e:
@@ -169,10 +251,10 @@ def serve_login():
 def serve_main_app():
     # Check if user is authenticated before serving the main application
     if 'user_id' not in session:
-        logger.info("🔒 User not authenticated, redirecting to login")
+        logger.debug("🔒 User not authenticated, redirecting to login")
         return send_from_directory(FRONTEND_PATH, 'login.html')
     
-    logger.info(f"Serving main app from: {FRONTEND_PATH}")
+    logger.debug("Serving main app from: %s", FRONTEND_PATH)
     try:
         return send_from_directory(FRONTEND_PATH, 'index.html')
     except Exception as e:
@@ -291,7 +373,7 @@ def get_all_users():
             return admin_check
         
         users = db.get_all_users()
-        logger.info(f"Found {len(users)} users in database")
+        logger.debug("Found %d users in database", len(users))
         
         # Remove sensitive information
         for user in users:
@@ -342,7 +424,7 @@ def create_user():
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     try:
-        logger.info(f"Updating user {user_id}")
+        logger.debug("Updating user %s", user_id)
         
         admin_check = require_admin()
         if admin_check:
@@ -355,7 +437,8 @@ def update_user(user_id):
         class_name = data.get('class_name')
         is_active = data.get('is_active')
         
-        logger.info(f"Update data for user {user_id}: username={username}, role={role}, class_name={class_name}, is_active={is_active}")
+        logger.debug("Update data for user %s: username=%s, role=%s, class_name=%s, is_active=%s",
+                     user_id, username, role, class_name, is_active)
         
         if role and role not in ['admin', 'user']:
             return jsonify({'error': 'Invalid role. Must be admin or user'}), 400
@@ -381,12 +464,12 @@ def update_user(user_id):
                 'success': True,
                 'message': 'User updated successfully'
             }
-            logger.info(f"Sending success response: {response_data}")
+            logger.debug("Sending success response: %s", response_data)
             return jsonify(response_data)
         else:
             logger.error(f"Failed to update user {user_id}")
             error_response = {'error': 'Failed to update user - user may not exist or no changes were made'}
-            logger.info(f"Sending error response: {error_response}")
+            logger.debug("Sending error response: %s", error_response)
             return jsonify(error_response), 500
         
     except Exception as e:
@@ -474,22 +557,28 @@ def bulk_import_students():
                 'invalid_classes': sorted(list(invalid_classes))
             }), 400
 
-        # 3. If all classes are valid, proceed with the import
-        # This part should be transactional in a real-world scenario
-        for student_data in students_data:
-            # Use existing add_student logic which handles updates (UPSERT)
-            db.add_student(student_data)
+        # 3. If all classes are valid, upsert everything in one transaction
+        result = db.bulk_import_students(students_data)
 
-        return jsonify({'success': True, 'message': f'Successfully imported/updated {len(students_data)} students.'})
+        processed = result['imported'] + result['updated']
+        return jsonify({
+            'success': True,
+            'message': f'Successfully imported/updated {processed} students.',
+            **result
+        })
     except Exception as e:
         logger.error(f"Bulk import error: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/students', methods=['GET'])
+@conditional_get('students')
 def get_students():
     try:
-        students = db.get_students()
-        return jsonify(students)
+        include_archived = request.args.get('include_archived') == 'true'
+        rows = db.iter_students(include_archived=include_archived, roster=True)
+        # Pull the first row here so connection/query errors still produce a 500
+        first_row = next(rows, None)
+        return Response(stream_with_context(app.json.stream_array(rows, first_row)), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -505,13 +594,11 @@ def add_student():
             if field not in student_data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Check for duplicate roll number
-        existing_students = db.get_students()
-        if any(s.get('rollNumber') == student_data['rollNumber'] for s in existing_students):
-            return jsonify({'error': f'Roll number {student_data["rollNumber"]} already exists'}), 400
-        
-        db.add_student(student_data)
+        # Roll number uniqueness is enforced by the unique index on students.rollNumber
+        db.create_student(student_data)
         return jsonify({'success': True, 'student': student_data})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -522,16 +609,14 @@ def update_student(student_id):
         if not student_data:
             return jsonify({'error': 'No data provided'}), 400
             
-        # Check for duplicate roll number (excluding current student)
-        existing_students = db.get_students()
-        for student in existing_students:
-            if (student.get('rollNumber') == student_data.get('rollNumber') and 
-                student.get('id') != student_id):
-                return jsonify({'error': f'Roll number {student_data["rollNumber"]} already exists'}), 400
-            
-        student_data['id'] = student_id  # Ensure ID matches URL
-        db.add_student(student_data)  # add_student handles updates too
-        return jsonify({'success': True, 'student': student_data})
+        # Roll number uniqueness is enforced by the unique index on students.rollNumber
+        if not db.update_student(student_id, student_data):
+            return jsonify({'error': 'Student not found'}), 404
+        
+        student = db.get_student_by_id(student_id)
+        return jsonify({'success': True, 'student': student})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -583,15 +668,26 @@ def get_student_status_for_date(student_id, date):
 
 @app.route('/api/students/<student_id>', methods=['DELETE'])
 def delete_student(student_id):
+    """Delete one student, or archive them with ?mode=archive to keep their history"""
     try:
-        students = db.get_students()
-        students = [s for s in students if s['id'] != student_id]
-        db.save_students(students)
-        return jsonify({'success': True})
+        mode = request.args.get('mode', 'delete')
+        if mode not in ['delete', 'archive']:
+            return jsonify({'error': 'Invalid mode. Must be delete or archive'}), 400
+        
+        if mode == 'archive':
+            success = db.archive_student(student_id)
+        else:
+            success = db.delete_student(student_id)
+        
+        if success:
+            return jsonify({'success': True, 'mode': mode})
+        else:
+            return jsonify({'error': 'Student not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/students/<student_id>', methods=['GET'])
+@conditional_get('students')
 def get_student_detail(student_id):
     try:
         student = db.get_student_by_id(student_id)
@@ -603,6 +699,56 @@ def get_student_detail(student_id):
         logger.error(f"Error getting student details for ID {student_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/students/<student_id>/attendance-stats', methods=['GET'])
+@conditional_get('attendance', 'students', 'holidays', 'settings')
+def get_student_attendance_stats(student_id):
+    """Attendance counts, rate and streaks for one student (defaults to the current academic year)"""
+    try:
+        start_date = request.args.get('from')
+        end_date = request.args.get('to')
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        stats = db.get_student_attendance_stats(student_id, start_date, end_date)
+        if stats is None:
+            return jsonify({'error': 'Student not found'}), 404
+        return jsonify(stats)
+    except Exception as e:
+        logger.error(f"Error getting attendance stats for student {student_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/students/<student_id>/profile', methods=['GET'])
+@conditional_get('students', 'attendance', 'holidays', 'settings', 'teacher_logs')
+def get_student_profile(student_id):
+    """Student row, attendance stats, recent teacher logs and score history in one response"""
+    try:
+        start_date = request.args.get('from')
+        end_date = request.args.get('to')
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        profile = db.get_student_profile(
+            student_id,
+            start_date,
+            end_date,
+            log_limit=request.args.get('logs', 50, type=int),
+            history_limit=request.args.get('history', 50, type=int)
+        )
+        if profile is None:
+            return jsonify({'error': 'Student not found'}), 404
+        return jsonify(profile)
+    except Exception as e:
+        logger.error(f"Error getting profile for student {student_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/students', methods=['DELETE'])
 def delete_all_students():
     try:
@@ -620,12 +766,64 @@ def get_next_roll_number(class_name):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def stream_attendance_json(rows, first_row, chunk_rows=500):
+    """Serialize date-ordered attendance rows as {date: {student_id: {...}}} in chunks"""
+    parts = ['{']
+    current_date = None
+    pending = 0
+    row = first_row
+    while row is not None:
+        if row['date'] != current_date:
+            if current_date is not None:
+                parts.append('},')
+            parts.append(app.json.dumps(row['date']) + ':{')
+            current_date = row['date']
+        else:
+            parts.append(',')
+        parts.append(app.json.dumps(row['student_id']) + ':' + app.json.dumps({
+            'status': row['status'],
+            'reason': row['reason'] or ''
+        }))
+        
+        pending += 1
+        if pending >= chunk_rows:
+            yield ''.join(parts)
+            parts = []
+            pending = 0
+        row = next(rows, None)
+    
+    if current_date is not None:
+        parts.append('}')
+    parts.append('}')
+    yield ''.join(parts)
+
 @app.route('/api/attendance', methods=['GET'])
+@conditional_get('attendance', 'students')
 def get_attendance():
     try:
         date = request.args.get('date')
-        attendance = db.get_attendance(date)
-        return jsonify(attendance)
+        if date:
+            attendance = db.get_attendance(date)
+            return jsonify(attendance)
+        
+        start_date = request.args.get('from')
+        end_date = request.args.get('to')
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        rows = db.iter_attendance(
+            start_date=start_date,
+            end_date=end_date,
+            class_name=request.args.get('class'),
+            student_id=request.args.get('student_id')
+        )
+        # Pull the first row here so connection/query errors still produce a 500
+        first_row = next(rows, None)
+        return Response(stream_with_context(stream_attendance_json(rows, first_row)), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -645,6 +843,146 @@ def save_attendance():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+MAX_ATTENDANCE_BATCH_DATES = 62
+
+@app.route('/api/attendance', methods=['PUT'])
+def save_attendance_for_dates():
+    """Merge several days' roll calls in one transaction: {"YYYY-MM-DD": {student_id: {...}}, ...}"""
+    try:
+        days = request.json
+        if not isinstance(days, dict) or not days:
+            return jsonify({'error': 'Attendance must be an object keyed by date'}), 400
+        if len(days) > MAX_ATTENDANCE_BATCH_DATES:
+            return jsonify({'error': f'At most {MAX_ATTENDANCE_BATCH_DATES} dates per request'}), 400
+        for date, records in days.items():
+            try:
+                datetime.strptime(date, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            if records is not None and not isinstance(records, dict):
+                return jsonify({'error': 'Attendance must be an object keyed by student ID'}), 400
+        
+        result = db.save_attendance_for_dates({date: records or {} for date, records in days.items()})
+        return jsonify({'success': True, **result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error saving attendance batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/summary', methods=['GET'])
+@conditional_get('attendance', 'students', 'holidays')
+def get_attendance_summary():
+    """Attendance counts and rates per day, class and student over a date range"""
+    try:
+        end_date = request.args.get('to') or db.timezone.today()
+        start_date = request.args.get('from') or end_date
+        for value in (start_date, end_date):
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        if start_date > end_date:
+            return jsonify({'error': '"from" must not be after "to"'}), 400
+
+        include = request.args.get('include', 'day,class,student').split(',')
+        summary = db.get_attendance_summary(start_date, end_date, request.args.get('class'), include)
+        return jsonify(summary)
+    except Exception as e:
+        logger.error(f"Error getting attendance summary: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/calendar', methods=['GET'])
+@conditional_get('attendance', 'students', 'holidays')
+def get_attendance_calendar():
+    """Per-day attendance counts, saved flag and holidays for one month"""
+    try:
+        today = datetime.strptime(db.timezone.today(), '%Y-%m-%d')
+        year = request.args.get('year', today.year, type=int)
+        month = request.args.get('month', today.month, type=int)
+        if not 1 <= month <= 12 or not 1900 <= year <= 9999:
+            return jsonify({'error': 'Invalid year or month'}), 400
+        
+        calendar_data = db.get_attendance_calendar(year, month, request.args.get('class'))
+        return jsonify(calendar_data)
+    except Exception as e:
+        logger.error(f"Error getting attendance calendar: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/archive', methods=['GET'])
+@conditional_get('attendance', 'students')
+def get_attendance_archive():
+    """Archived months, or per-student counts over archived months with ?from=YYYY-MM&to=YYYY-MM"""
+    try:
+        first_month = request.args.get('from')
+        if not first_month:
+            return jsonify({'months': db.get_archived_months()})
+        
+        last_month = request.args.get('to') or first_month
+        for value in (first_month, last_month):
+            datetime.strptime(value, '%Y-%m')
+        counts = db.get_archived_attendance_counts(first_month, last_month, request.args.get('class'))
+        return jsonify({'from': first_month, 'to': last_month, 'by_student': counts})
+    except ValueError:
+        return jsonify({'error': 'Invalid month format. Use YYYY-MM'}), 400
+    except Exception as e:
+        logger.error(f"Error getting attendance archive: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/archive', methods=['POST'])
+def archive_attendance():
+    """Move closed months of attendance into the packed archive"""
+    try:
+        data = request.json or {}
+        first_month = data.get('from')
+        last_month = data.get('to') or first_month
+        if not first_month:
+            return jsonify({'error': 'Missing required field: from'}), 400
+        
+        result = db.archive_attendance(first_month, last_month)
+        return jsonify({'success': True, **result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error archiving attendance: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/archive/<month>', methods=['DELETE'])
+def restore_attendance_archive(month):
+    """Move an archived month back into live attendance"""
+    try:
+        datetime.strptime(month, '%Y-%m')
+        restored = db.restore_attendance_archive(month)
+        return jsonify({'success': True, 'month': month, 'restored': restored})
+    except ValueError:
+        return jsonify({'error': 'Invalid month format. Use YYYY-MM'}), 400
+    except Exception as e:
+        logger.error(f"Error restoring archived attendance for {month}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attendance/<date>', methods=['PUT'])
+def save_attendance_for_date(date):
+    """Merge one day's roll call: 'neutral' clears a student, students left out are untouched"""
+    try:
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+        records = request.json
+        if records is None:
+            records = {}
+        if not isinstance(records, dict):
+            return jsonify({'error': 'Attendance must be an object keyed by student ID'}), 400
+
+        result = db.save_attendance_for_date(date, records)
+        return jsonify({'success': True, 'date': date, **result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error saving attendance for {date}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/test-delete', methods=['DELETE'])
 def test_delete():
     logger.info("DEBUG: test_delete called")
@@ -765,7 +1103,7 @@ def get_education_progress_history(progress_id):
 @app.route('/api/education/history/book/<int:book_id>/class/<int:class_id>', methods=['GET'])
 def get_education_progress_history_by_book(book_id, class_id):
     try:
-        logger.info(f"API: Getting history for book_id={book_id}, class_id={class_id}")
+        logger.debug("API: Getting history for book_id=%s, class_id=%s", book_id, class_id)
         
         # First check if the book and class exist
         try:
@@ -778,19 +1116,8 @@ def get_education_progress_history_by_book(book_id, class_id):
         
         # Use the database method directly
         history = db.get_progress_history_by_book(book_id, class_id)
-        logger.info(f"API: Method returned {len(history)} history records")
-        
-        # The database method now handles timezone conversion, so we just need to ensure proper JSON serialization
-        for record in history:
-            # Handle any remaining datetime objects that might not be converted
-            for key, value in record.items():
-                if hasattr(value, 'strftime') and not isinstance(value, str):
-                    try:
-                        record[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                    except:
-                        record[key] = str(value)
-        
-        logger.info(f"API: History data: {history}")
+        logger.debug("API: Method returned %d history records", len(history))
+        
         return jsonify(history)
     except Exception as e:
         logger.error(f"API: Error getting history: {e}")
@@ -798,9 +1125,102 @@ def get_education_progress_history_by_book(book_id, class_id):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+# ===== EXPORT ENDPOINTS =====
+
+EXPORT_CHUNK_ROWS = 500
+
+# Same column names as the bulk student import, so an export can be re-imported
+STUDENT_EXPORT_HEADER = ['id', 'name', 'fathername', 'rollnumber', 'mobilenumber', 'district', 'upazila',
+                         'class', 'registrationdate', 'status', 'inactivationdate']
+ATTENDANCE_EXPORT_HEADER = ['date', 'student_id', 'rollnumber', 'name', 'class', 'status', 'reason']
+
+def stream_csv(header, rows, first_row, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Serialize rows as CSV in chunks, starting with a UTF-8 BOM so Excel shows Bengali text"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    pending = 0
+    row = first_row
+    while row is not None:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+        row = next(rows, None)
+    yield buffer.getvalue()
+
+def csv_download(filename, header, rows):
+    """Streaming CSV attachment; the first row is read here so query errors still produce a 500"""
+    first_row = next(rows, None)
+    response = Response(stream_with_context(stream_csv(header, rows, first_row)), mimetype='text/csv')
+    # Class names may be Bengali: send an ASCII fallback plus the RFC 5987 UTF-8 name
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('?', '_')
+    response.headers['Content-Disposition'] = f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+    # Let nginx/Passenger pass chunks through instead of buffering the whole file
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/export/students', methods=['GET'])
+def export_students():
+    """Student register as CSV, optionally for one class"""
+    try:
+        class_name = request.args.get('class')
+        include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+        students = db.iter_students(class_name, include_archived)
+        rows = ([
+            student['id'], student['name'], student['fatherName'], student['rollNumber'],
+            student['mobileNumber'], student['district'], student['upazila'], student['class'],
+            student['registrationDate'], student['status'], student['inactivationDate']
+        ] for student in students)
+        
+        filename = f"students_{class_name or 'all'}_{datetime.now().strftime('%Y-%m-%d')}.csv"
+        return csv_download(filename, STUDENT_EXPORT_HEADER, rows)
+    except Exception as e:
+        logger.error(f"Error exporting students: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export/attendance', methods=['GET'])
+def export_attendance():
+    """Attendance register as CSV (newest date first), filtered by class and date range"""
+    try:
+        start_date = request.args.get('from')
+        end_date = request.args.get('to')
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        class_name = request.args.get('class')
+        
+        # The roster is small next to the attendance rows, so names are joined from memory
+        roster = {
+            student['id']: student
+            for student in db.iter_students(class_name, include_archived=True)
+        }
+        records = db.iter_attendance(start_date=start_date, end_date=end_date, class_name=class_name)
+        rows = ([
+            record['date'], record['student_id'],
+            roster.get(record['student_id'], {}).get('rollNumber'),
+            roster.get(record['student_id'], {}).get('name'),
+            roster.get(record['student_id'], {}).get('class'),
+            record['status'], record['reason']
+        ] for record in records)
+        
+        filename = f"attendance_{class_name or 'all'}_{start_date or 'start'}_{end_date or datetime.now().strftime('%Y-%m-%d')}.csv"
+        return csv_download(filename, ATTENDANCE_EXPORT_HEADER, rows)
+    except Exception as e:
+        logger.error(f"Error exporting attendance: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # ===== APP SETTINGS API ENDPOINTS =====
 
 @app.route('/api/settings', methods=['GET'])
+@conditional_get('settings')
 def get_all_settings():
     try:
         settings = db.get_all_app_settings()
@@ -809,6 +1229,7 @@ def get_all_settings():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/settings/<setting_key>', methods=['GET'])
+@conditional_get('settings')
 def get_setting(setting_key):
     try:
         value = db.get_app_setting(setting_key)
@@ -850,6 +1271,7 @@ def delete_setting(setting_key):
 # ===== SPECIFIC SETTINGS ENDPOINTS FOR FRONTEND COMPATIBILITY =====
 
 @app.route('/api/settings/alertConfig', methods=['GET'])
+@conditional_get('settings')
 def get_alert_config():
     """Get alert configuration settings"""
     try:
@@ -894,6 +1316,7 @@ def set_alert_config():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/settings/hijriAdjustment', methods=['GET'])
+@conditional_get('settings')
 def get_hijri_adjustment():
     """Get Hijri date adjustment setting"""
     try:
@@ -925,6 +1348,7 @@ def set_hijri_adjustment():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/settings/appName', methods=['GET'])
+@conditional_get('settings')
 def get_app_name():
     """Get application name setting"""
     try:
@@ -959,6 +1383,7 @@ def set_app_name():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/settings/academicYearStart', methods=['GET'])
+@conditional_get('settings')
 def get_academic_year_start():
     """Get academic year start date setting"""
     try:
@@ -1023,9 +1448,34 @@ def get_teacher_logs():
         if not class_name:
             return jsonify({'error': 'Class name is required'}), 400
         
+        # Keyset pagination by default: {items, next_cursor, limit}; ?all=true returns the whole list
+        page_args = get_page_args()
+        if page_args:
+            page = db.get_teacher_logs_page(class_name, student_id, *page_args)
+            return jsonify(page)
+        
         logs = db.get_teacher_logs(class_name, student_id)
         return jsonify(logs)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/teacher-logs/alerts', methods=['GET'])
+@conditional_get('teacher_logs', 'students')
+def get_teacher_log_alerts():
+    """Counts and newest important / follow-up logs across all classes"""
+    try:
+        kinds = request.args.get('type', 'important,followup').split(',')
+        if any(kind not in ('important', 'followup') for kind in kinds):
+            return jsonify({'error': 'type must be important, followup or both'}), 400
+        
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        alerts = db.get_teacher_log_alerts(kinds, limit, offset, request.args.get('class'))
+        return jsonify(alerts)
     except Exception as e:
+        logger.error(f"Error getting teacher log alerts: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/teacher-logs', methods=['POST'])
@@ -1119,8 +1569,16 @@ def update_student_score(student_id):
 @app.route('/api/student-scores/<student_id>/history', methods=['GET'])
 def get_student_score_history(student_id):
     try:
+        # Keyset pagination by default: {items, next_cursor, limit}; ?all=true returns the whole list
+        page_args = get_page_args()
+        if page_args:
+            page = db.get_score_history_page(student_id, *page_args)
+            return jsonify(page)
+        
         history = db.get_score_history(student_id)
         return jsonify(history)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1135,47 +1593,51 @@ def get_students_with_scores():
 
 @app.route('/api/all-student-scores', methods=['GET'])
 def get_all_student_scores():
+    """Scores for all active students, with optional tier buckets and class averages"""
     try:
-        logger.info("Fetching all student scores for batch processing...")
+        include = request.args.get('include', '').split(',')
+        result = db.get_all_student_scores(request.args.get('class'))
         
-        # Get all active students
-        students = db.get_students()
-        active_students = [s for s in students if s.get('status') == 'active']
-        
-        if not active_students:
-            logger.info("No active students found")
-            return jsonify({'scores': {}})
-        
-        # Fetch scores for all active students in one batch
-        scores_data = {}
-        for student in active_students:
-            try:
-                score = db.get_student_score(student['id'])
-                if score is not None:
-                    scores_data[student['id']] = {
-                        'score': score,
-                        'class': student.get('class'),
-                        'name': student.get('name')
-                    }
-            except Exception as e:
-                logger.error(f"Error fetching score for student {student['id']}: {e}")
-                # Continue with other students even if one fails
-                continue
-        
-        logger.info(f"Successfully fetched scores for {len(scores_data)} students")
-        return jsonify({
+        response = {
             'success': True,
-            'total_students': len(active_students),
-            'scores_fetched': len(scores_data),
-            'scores': scores_data
-        })
+            'total_students': result['total_students'],
+            'scores_fetched': len(result['scores']),
+            'scores': result['scores']
+        }
+        if 'tiers' in include:
+            response['tiers'] = result['tiers']
+        if 'class_averages' in include:
+            response['class_averages'] = result['class_averages']
+        
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Error in get_all_student_scores: {e}")
         return jsonify({'error': str(e)}), 500
 
+# ===== DASHBOARD API ENDPOINTS =====
+
+@app.route('/api/dashboard/alerts', methods=['GET'])
+@conditional_get('students', 'attendance', 'teacher_logs', 'settings')
+def get_dashboard_alerts():
+    """Score, absence and teacher log alerts for the main dashboard"""
+    today = request.args.get('date') or db.timezone.today()
+    try:
+        datetime.strptime(today, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    
+    try:
+        log_limit = request.args.get('logs', type=int)
+        log_limit = 50 if log_limit is None else min(max(log_limit, 1), 200)
+        return jsonify(db.get_dashboard_alerts(today, log_limit))
+    except Exception as e:
+        logger.error(f"Error getting dashboard alerts: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # Class Management API Endpoints
 @app.route('/api/classes', methods=['GET'])
+@conditional_get('classes')
 def get_classes():
     try:
         classes = db.get_classes()
@@ -1232,6 +1694,7 @@ def delete_class(class_id):
 
 # Book Management API Endpoints
 @app.route('/api/books', methods=['GET'])
+@conditional_get('books')
 def get_books():
     try:
         class_id = request.args.get('class_id', type=int)
@@ -1340,6 +1803,7 @@ def reset_all_student_scores():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/books/<int:book_id>', methods=['GET'])
+@conditional_get('books')
 def get_book(book_id):
     try:
         book = db.get_book_by_id(book_id)
@@ -1351,6 +1815,7 @@ def get_book(book_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/books/class/<int:class_id>', methods=['GET'])
+@conditional_get('books')
 def get_books_by_class(class_id):
     try:
         books = db.get_books(class_id)
@@ -1389,6 +1854,8 @@ def health():
             'students_count': student_counts.get('total', 0),
             'active_students_count': student_counts.get('active', 0),
             'inactive_students_count': student_counts.get('inactive', 0),
+            'connection_pool': db.get_pool_stats(),
+            'cache': db.get_cache_stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -1398,6 +1865,35 @@ def health():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/metrics')
+def metrics():
+    """Request metrics of all workers in the Prometheus text format"""
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/db-stats', methods=['GET'])
+def get_db_stats():
+    """Query timings and recent slow queries of the worker serving this request"""
+    try:
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        top = request.args.get('top', type=int)
+        top = 20 if top is None else min(max(top, 1), 200)
+        return jsonify(db.get_query_stats(top))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/db-stats', methods=['DELETE'])
+def reset_db_stats():
+    """Clear the query timings of the worker serving this request"""
+    admin_check = require_admin()
+    if admin_check:
+        return admin_check
+    
+    db.reset_query_stats()
+    return jsonify({'success': True})
+
 @app.route('/api/debug')
 def debug():
     """Debug endpoint to check environment variables and database selection"""
@@ -1445,6 +1941,7 @@ def debug_timezone():
             'database_utc': db_utc_time.strftime('%Y-%m-%d %H:%M:%S UTC'),
             'database_local': db_local_time,
             'server_timezone_info': server_tz_info,
+            'display_timezone_info': db.timezone.info(),
             'timezone_info': {
                 'utc_offset': utc_now.strftime('%z'),
                 'local_offset': local_now.strftime('%z') if hasattr(local_now, 'strftime') else 'Unknown'
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Daily Attendance Rollup
+Per-day, per-class attendance counts kept in attendance_daily_rollup
+
+A rollup row holds the present/absent/leave/holiday counts of the students
+enrolled in a class on that date, plus the number of enrolled students
+(headcount). A student counts as enrolled from their registrationDate (or
+any earlier day they have attendance on) while active, or before their
+inactivationDate. Attendance writes refresh the rows of the dates they touch
+inside the same transaction; roster changes refresh the classes they touch,
+from the earliest date the change can affect.
+Rows of archived months (see MySQLDatabase.archive_attendance) are frozen
+when the month is archived and are never recomputed.
+
+Usage:
+    python attendance_rollup.py rebuild   # recompute the rollup from raw attendance
+"""
+
+import sys
+import argparse
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_DAYS = 31
+
+
+def _not_archived(column='date'):
+    return f'LEFT({column}, 7) NOT IN (SELECT month FROM attendance_archive_months)'
+
+
+_NOT_ARCHIVED_SQL = _not_archived()
+
+# Set once the archive tables (migration 8) are seen; they are never dropped
+_archive_tables_exist = False
+
+
+def _has_archive_tables(cursor):
+    """Whether attendance_archive_months exists yet (it does not while migration 7 backfills)"""
+    global _archive_tables_exist
+    if not _archive_tables_exist:
+        cursor.execute('''
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = 'attendance_archive_months'
+        ''')
+        _archive_tables_exist = cursor.fetchone()[0] > 0
+    return _archive_tables_exist
+
+# Enrolment starts at an ISO registrationDate, or earlier on any day the student has
+# attendance; students without a usable registrationDate count from the first day
+_REGISTERED_SQL = (
+    "(a.student_id IS NOT NULL"
+    " OR COALESCE(s.registrationDate, '') NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}'"
+    " OR d.date >= LEFT(s.registrationDate, 10))"
+)
+
+
+def _in_clause(column, values):
+    return f"{column} IN ({', '.join(['%s'] * len(values))})"
+
+
+def refresh(cursor, dates=None, classes=None, since=None, keep_archived=None):
+    """
+    Recompute the rollup rows for the given dates and/or classes, optionally only
+    for dates on or after `since`. With no bounds, the whole table is recomputed.
+    Fresh rows are upserted and only the rows of (date, class) pairs that no longer
+    exist are deleted, so readers never see a scope half-rebuilt. Callers run it
+    inside the transaction of the write it follows. Returns the upsert's row count.
+    Rows of archived months are left alone; keep_archived=None applies that guard
+    once the archive tables exist, which lets migration 7 run before migration 8.
+    """
+    dates = None if dates is None else sorted({d for d in dates if d})
+    classes = None if classes is None else sorted({c or '' for c in classes})
+    if dates == [] or classes == []:
+        return 0
+
+    # Bounds on raw attendance dates (fresh rows) and on existing rollup rows (r)
+    date_conditions, rollup_conditions, date_params = [], [], []
+    if dates is not None:
+        date_conditions.append(_in_clause('date', dates))
+        rollup_conditions.append(_in_clause('r.date', dates))
+        date_params.extend(dates)
+    if since:
+        date_conditions.append('date >= %s')
+        rollup_conditions.append('r.date >= %s')
+        date_params.append(since)
+    if keep_archived is None:
+        keep_archived = _has_archive_tables(cursor)
+    if keep_archived:
+        date_conditions.append(_not_archived('date'))
+        rollup_conditions.append(_not_archived('r.date'))
+    rollup_params = list(date_params)
+    if classes is not None:
+        rollup_conditions.append(_in_clause('r.class', classes))
+        rollup_params.extend(classes)
+
+    date_where = f"WHERE {' AND '.join(date_conditions)}" if date_conditions else ''
+    class_where = f"AND {_in_clause('COALESCE(s.class, %s)', classes)}" if classes is not None else ''
+    fresh_params = date_params + ([''] + classes if classes is not None else [])
+
+    # Only enrolled students are joined, so COUNT(*) is the headcount and the
+    # status sums ignore attendance recorded after a student left
+    fresh_sql = f'''
+        SELECT d.date AS date, COALESCE(s.class, '') AS class,
+            COALESCE(SUM(a.status = 'present'), 0) AS present,
+            COALESCE(SUM(a.status = 'absent'), 0) AS absent,
+            COALESCE(SUM(a.status = 'leave'), 0) AS `leave`,
+            COALESCE(SUM(a.status = 'holiday'), 0) AS holiday,
+            COUNT(*) AS headcount
+        FROM (SELECT DISTINCT date FROM attendance {date_where}) d
+        JOIN students s ON (s.status = 'active' OR d.date < s.inactivationDate) {class_where}
+        LEFT JOIN attendance a ON a.student_id = s.id AND a.date = d.date
+        WHERE {_REGISTERED_SQL}
+        GROUP BY d.date, COALESCE(s.class, '')
+    '''
+
+    rollup_where = f"AND {' AND '.join(rollup_conditions)}" if rollup_conditions else ''
+    cursor.execute(f'''
+        DELETE r FROM attendance_daily_rollup r
+        LEFT JOIN ({fresh_sql}) fresh ON fresh.date = r.date AND fresh.class = r.class
+        WHERE fresh.date IS NULL {rollup_where}
+    ''', fresh_params + rollup_params)
+
+    cursor.execute(f'''
+        INSERT INTO attendance_daily_rollup (date, class, present, absent, `leave`, holiday, headcount)
+        {fresh_sql}
+        ON DUPLICATE KEY UPDATE
+        present = VALUES(present),
+        absent = VALUES(absent),
+        `leave` = VALUES(`leave`),
+        holiday = VALUES(holiday),
+        headcount = VALUES(headcount)
+    ''', fresh_params)
+    return cursor.rowcount
+
+
+def rebuild(db, batch_days=REBUILD_BATCH_DAYS):
+    """
+    Recompute the whole rollup from raw attendance, committing every `batch_days` dates
+    so large histories do not hold one long transaction. Returns (dates, rows) written.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            DELETE FROM attendance_daily_rollup
+            WHERE date NOT IN (SELECT DISTINCT date FROM attendance)
+            AND {_NOT_ARCHIVED_SQL}
+        ''')
+        conn.commit()
+
+        cursor.execute(f'SELECT DISTINCT date FROM attendance WHERE {_NOT_ARCHIVED_SQL} ORDER BY date')
+        dates = [row[0] for row in cursor.fetchall()]
+        rows = 0
+        for start in range(0, len(dates), batch_days):
+            rows += refresh(cursor, dates=dates[start:start + batch_days])
+            conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    db.cache.invalidate('attendance')
+    logger.info(f"AttendanceRollup: Rebuilt {rows} rows for {len(dates)} dates")
+    return len(dates), rows
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Madani Maktab daily attendance rollup')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rebuild_parser = subparsers.add_parser('rebuild', help='Recompute the rollup from raw attendance')
+    rebuild_parser.add_argument('--batch-days', type=int, default=REBUILD_BATCH_DAYS, help='Dates per transaction')
+    args = parser.parse_args(argv)
+
+    from mysql_database import MySQLDatabase
+    db = MySQLDatabase()
+
+    dates, rows = rebuild(db, batch_days=args.batch_days)
+    print(f"Rebuilt attendance rollup: {rows} rows for {dates} dates")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Read-Through Cache
+In-process cache for reference data with TTL and cross-worker invalidation
+"""
+
+import os
+import copy
+import time
+import itertools
+import tempfile
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class LocalVersionStore:
+    """
+    Keeps namespace versions in process memory.
+    Invalidation is only seen by the current process (single worker setups).
+    """
+
+    name = 'local'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._counter = itertools.count(1)
+        self._prefix = f'{os.getpid()}-{time.time_ns()}'
+
+    def get_version(self, namespace):
+        with self._lock:
+            if namespace not in self._versions:
+                self._versions[namespace] = f'{self._prefix}-{next(self._counter)}'
+            return self._versions[namespace]
+
+    def bump_version(self, namespace):
+        with self._lock:
+            self._versions[namespace] = f'{self._prefix}-{next(self._counter)}'
+            return self._versions[namespace]
+
+
+class FileVersionStore:
+    """
+    Keeps namespace versions in small files in a local directory.
+    Every gunicorn/Passenger worker on the host reads the same files, so a
+    write in one worker invalidates the cached copies in all of them.
+    """
+
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._counter = itertools.count(1)
+
+    def _path(self, namespace):
+        return os.path.join(self.directory, f'{namespace}.version')
+
+    def get_version(self, namespace):
+        try:
+            with open(self._path(namespace), 'r') as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+        return self.bump_version(namespace)
+
+    def bump_version(self, namespace):
+        version = f'{time.time_ns()}-{os.getpid()}-{next(self._counter)}'
+        # A unique temp file per call, so threads of one worker never share it
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f'{namespace}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(version)
+            # Atomic rename so readers never see a half-written version
+            os.replace(tmp_path, self._path(namespace))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return version
+
+
+def create_version_store(backend=None, directory=None):
+    """Build the version store named by CACHE_BACKEND ('file' or 'local')"""
+    backend = (backend or os.getenv('CACHE_BACKEND', 'file')).lower()
+    if backend == 'local':
+        return LocalVersionStore()
+    if backend == 'file':
+        directory = directory or os.getenv('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'madani_maktab_cache')
+        try:
+            return FileVersionStore(directory)
+        except OSError as e:
+            logger.warning(f"ReadThroughCache: Cannot use cache directory {directory} ({e}), falling back to local store")
+            return LocalVersionStore()
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+class ReadThroughCache:
+    """
+    Read-through cache keyed by (namespace, key).
+
+    An entry is served while it is younger than `ttl` seconds and its
+    namespace version has not changed. Writers call invalidate(namespace),
+    which bumps the version in the shared store. Callers get a copy of the
+    cached value so they can modify it freely.
+    """
+
+    def __init__(self, store=None, ttl=300, enabled=True):
+        self.store = store or LocalVersionStore()
+        self.ttl = float(ttl)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get_or_load(self, namespace, key, loader, ttl=None, depends_on=()):
+        """
+        Return the cached value for (namespace, key), calling loader() on a miss.
+        `ttl` overrides the default lifetime for this entry; `depends_on` names
+        further namespaces whose invalidation also drops the entry.
+        """
+        if not self.enabled:
+            return loader()
+
+        # Read the version before loading so a concurrent write marks this load stale
+        try:
+            version = '|'.join(self.store.get_version(ns) for ns in (namespace,) + tuple(depends_on))
+        except OSError as e:
+            logger.warning(f"ReadThroughCache: Could not read version for {namespace}, loading uncached: {e}")
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry and entry[0] == version and entry[1] > now:
+                self._counters['hits'] += 1
+                return copy.deepcopy(entry[2])
+            self._counters['misses'] += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[(namespace, key)] = (version, now + (self.ttl if ttl is None else float(ttl)), value)
+        return copy.deepcopy(value)
+
+    def invalidate(self, *namespaces):
+        """Drop cached entries for the given namespaces in every worker"""
+        for namespace in namespaces:
+            try:
+                self.store.bump_version(namespace)
+            except OSError as e:
+                logger.warning(f"ReadThroughCache: Could not bump version for {namespace}: {e}")
+            with self._lock:
+                for cache_key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[cache_key]
+                self._counters['invalidations'] += 1
+
+    def version(self, namespace):
+        """Current version token for a namespace"""
+        return self.store.get_version(namespace)
+
+    def clear(self):
+        """Drop all entries cached in this process"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Snapshot of cache usage for health checks"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            stats = {
+                'backend': self.store.name,
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'entries': len(self._entries),
+                'hit_rate': round(self._counters['hits'] / lookups * 100, 1) if lookups else 0.0,
+            }
+            stats.update(self._counters)
+        return stats
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - MySQL Connection Pool
+Bounded, thread-safe pool of MySQL connections shared by MySQLDatabase
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Error):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class _PoolEntry:
+    """A physical connection plus the bookkeeping the pool needs for it"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection:
+    """
+    Proxy handed out by the pool.
+    Behaves like a normal connection, but close() returns it to the pool.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise Error("Connection has already been returned to the pool")
+        return getattr(entry.conn, name)
+
+    def close(self):
+        """Return the underlying connection to the pool"""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # Safety net for code paths that raise before reaching close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections.
+
+    Connections are created lazily up to `size`. Idle connections are
+    pinged before reuse when they have been idle longer than
+    `ping_interval` seconds and replaced after `recycle` seconds, so a
+    connection dropped by the server is never handed to a request.
+    `session_init` runs once per physical connection (e.g. SET time_zone).
+    """
+
+    def __init__(self, config, size=5, timeout=10, recycle=1800, ping_interval=30, session_init=None):
+        self._config = dict(config)
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.ping_interval = float(ping_interval)
+        self._session_init = session_init
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._open = 0
+        self._pid = os.getpid()
+        self._counters = {
+            'checkouts': 0,
+            'connects': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+
+    def _check_fork(self):
+        """Drop connections inherited from a parent process (gunicorn --preload)"""
+        pid = os.getpid()
+        if pid != self._pid:
+            logger.info("ConnectionPool: Detected fork, discarding inherited connections")
+            self._pid = pid
+            self._idle.clear()
+            self._open = 0
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self._config)
+        try:
+            if self._session_init:
+                self._session_init(conn)
+        except Exception:
+            self._close_quietly(conn)
+            raise
+        with self._cond:
+            self._counters['connects'] += 1
+        logger.debug("ConnectionPool: Opened new MySQL connection")
+        return _PoolEntry(conn)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _validate(self, entry):
+        """Return a usable entry, replacing it if it is stale or dead"""
+        now = time.monotonic()
+        if now - entry.created_at > self.recycle:
+            self._close_quietly(entry.conn)
+            with self._cond:
+                self._counters['recycled'] += 1
+            return self._connect()
+
+        if now - entry.last_used > self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception as e:
+                logger.warning(f"ConnectionPool: Health check failed, reconnecting: {e}")
+                self._close_quietly(entry.conn)
+                with self._cond:
+                    self._counters['health_check_failures'] += 1
+                return self._connect()
+        return entry
+
+    def get_connection(self):
+        """Check out a connection, waiting up to `timeout` seconds for one to free up"""
+        deadline = time.monotonic() + self.timeout
+        entry = None
+        with self._cond:
+            self._check_fork()
+            while True:
+                if self._idle:
+                    # LIFO keeps the most recently used connections warm
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"(pool size {self.size})"
+                    )
+                self._counters['waits'] += 1
+                self._cond.wait(remaining)
+            self._counters['checkouts'] += 1
+
+        try:
+            entry = self._connect() if entry is None else self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, entry)
+
+    def _reset(self, conn):
+        """Leave no transaction or unread result behind for the next borrower"""
+        if getattr(conn, 'unread_result', False):
+            conn.consume_results()
+        if getattr(conn, 'in_transaction', False):
+            conn.rollback()
+
+    def _release(self, entry):
+        healthy = True
+        try:
+            self._reset(entry.conn)
+        except Exception as e:
+            logger.warning(f"ConnectionPool: Discarding connection that failed to reset: {e}")
+            healthy = False
+
+        with self._cond:
+            if os.getpid() != self._pid:
+                return
+            if healthy:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._open -= 1
+                self._counters['discarded'] += 1
+            self._cond.notify()
+
+        if not healthy:
+            self._close_quietly(entry.conn)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on return)"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for entry in idle:
+            self._close_quietly(entry.conn)
+
+    def stats(self):
+        """Snapshot of pool usage for health checks"""
+        with self._cond:
+            idle = len(self._idle)
+            stats = {
+                'size': self.size,
+                'open': self._open,
+                'idle': idle,
+                'in_use': self._open - idle,
+            }
+            stats.update(self._counters)
+        return stats
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - JSON Provider
+Flask JSON provider that uses orjson when it is installed and the standard
+library otherwise, with the same output either way:
+
+    datetime  ISO 8601; naive values are UTC (every connection runs with
+              time_zone '+00:00') and get a 'Z' suffix
+    date      'YYYY-MM-DD'
+    Decimal   a JSON number (int when integral)
+
+Large result sets can be streamed as a JSON array with stream_array(),
+which serializes rows in chunks instead of building one string.
+"""
+
+import json
+import uuid
+import logging
+import dataclasses
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_ROWS = 500
+
+
+def _decimal(value):
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def _datetime(value):
+    if value.tzinfo is None:
+        return value.isoformat() + 'Z'
+    if value.utcoffset() == timedelta(0):
+        return value.replace(tzinfo=None).isoformat() + 'Z'
+    return value.isoformat()
+
+
+def _stdlib_default(value):
+    """json.dumps fallback for the types the standard encoder does not know"""
+    if isinstance(value, datetime):
+        return _datetime(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _orjson_default(value):
+    """orjson handles datetime/date/UUID/dataclasses itself; this covers the rest"""
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Drop-in replacement for Flask's default provider (app.json).
+    sort_keys keeps Flask's default key order; set it to False to skip sorting.
+    """
+
+    sort_keys = True
+    mimetype = 'application/json'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = 'orjson' if orjson is not None else 'json'
+
+    def _orjson_options(self, sort_keys):
+        options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps_bytes(self, obj, sort_keys=None):
+        """UTF-8 encoded JSON, without the str round trip when orjson is available"""
+        sort_keys = self.sort_keys if sort_keys is None else sort_keys
+        if orjson is not None:
+            return orjson.dumps(obj, default=_orjson_default, option=self._orjson_options(sort_keys))
+        return json.dumps(obj, default=_stdlib_default, ensure_ascii=False,
+                          separators=(',', ':'), sort_keys=sort_keys).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing json.dumps options (indent, cls, ...) get the standard library
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_orjson_default, option=self._orjson_options(sort_keys)).decode('utf-8')
+        kwargs.setdefault('default', _stdlib_default)
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(obj, sort_keys=sort_keys, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """Used by flask.jsonify()"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+    def stream_array(self, rows, first_row=None, chunk_rows=STREAM_CHUNK_ROWS, transform=None):
+        """
+        Serialize an iterator of rows as one JSON array, yielding a chunk every
+        `chunk_rows` rows. Pass a first_row pulled from `rows` beforehand so
+        query errors surface before the response starts (see csv_download).
+        """
+        dumps = self.dumps_bytes
+        parts = [b'[']
+        separator = b''
+        pending = 0
+        row = first_row
+        while row is not None:
+            if transform is not None:
+                row = transform(row)
+            parts.append(separator)
+            parts.append(dumps(row))
+            separator = b','
+            pending += 1
+            if pending >= chunk_rows:
+                yield b''.join(parts)
+                parts = []
+                pending = 0
+            row = next(rows, None)
+        parts.append(b']')
+        yield b''.join(parts)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Logging Setup
+Queue-based, sampled logging with development and production profiles
+
+Request threads only put records on a bounded in-memory queue; a listener
+thread formats them and does the console/file I/O. When the queue is full,
+records are dropped (and counted) rather than blocking a request.
+
+Profiles:
+    development  INFO everywhere, like the old logging.basicConfig setup
+    production   WARNING everywhere, so request-path INFO/DEBUG calls return
+                 after one cached level check. Turn loggers back on with
+                 LOG_LEVELS, e.g. "mysql_database=INFO,app_server=DEBUG"
+
+LOG_SAMPLE keeps a fraction of a logger's INFO/DEBUG records, e.g.
+"mysql_database=0.1"; warnings and errors are never sampled.
+"""
+
+import os
+import sys
+import queue
+import atexit
+import random
+import threading
+import logging
+import logging.handlers
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+PROFILES = {
+    'development': {'level': 'INFO', 'loggers': {}},
+    'production': {'level': 'WARNING', 'loggers': {'werkzeug': 'WARNING'}},
+}
+
+DEFAULT_QUEUE_SIZE = 10000
+
+_state = {'handler': None, 'listener': None}
+_lock = threading.Lock()
+
+
+def _parse_pairs(value):
+    """'a=1,b.c=2' -> {'a': '1', 'b.c': '2'}"""
+    pairs = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            if name.strip():
+                pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the INFO/DEBUG records of selected loggers.
+    A rate set for 'mysql_database' also applies to its child loggers.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {name: max(0.0, min(1.0, float(rate))) for name, rate in rates.items()}
+        self._resolved = {}
+
+    def _rate(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped and counted"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _output_handlers(log_file):
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(logging.handlers.WatchedFileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _restart_listener_after_fork():
+    """The listener thread does not survive fork; give each worker its own queue and thread"""
+    handler, listener = _state['handler'], _state['listener']
+    if handler is None or listener is None:
+        return
+    log_queue = queue.Queue(handler.queue.maxsize)
+    handler.queue = listener.queue = log_queue
+    handler.dropped = 0
+    listener._thread = None
+    listener.start()
+
+
+def _stop_listener():
+    handler, listener = _state['handler'], _state['listener']
+    if listener is not None:
+        listener.stop()
+    if handler is not None and handler.dropped:
+        sys.stderr.write(f"log_config: {handler.dropped} log records were dropped because the queue was full\n")
+
+
+def configure_logging(profile=None):
+    """
+    Set up root logging from LOG_PROFILE, LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE,
+    LOG_FILE, LOG_ASYNC and LOG_QUEUE_SIZE. Safe to call more than once;
+    only the first call takes effect.
+    """
+    with _lock:
+        if _state['handler'] is not None:
+            return _state['handler']
+
+        profile = (profile or os.getenv('LOG_PROFILE', 'development')).lower()
+        settings = PROFILES.get(profile)
+        if settings is None:
+            settings = PROFILES['development']
+            sys.stderr.write(f"log_config: Unknown LOG_PROFILE '{profile}', using development\n")
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.setLevel(os.getenv('LOG_LEVEL', settings['level']).upper())
+        levels = dict(settings['loggers'], **_parse_pairs(os.getenv('LOG_LEVELS')))
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        outputs = _output_handlers(os.getenv('LOG_FILE'))
+        sampling = SamplingFilter(_parse_pairs(os.getenv('LOG_SAMPLE')))
+
+        if os.getenv('LOG_ASYNC', 'true').lower() == 'false':
+            for output in outputs:
+                output.addFilter(sampling)
+                root.addHandler(output)
+            _state['handler'] = outputs[0]
+            return outputs[0]
+
+        handler = DroppingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))))
+        # Sampling runs before the record is queued, so dropped records cost no I/O
+        handler.addFilter(sampling)
+        listener = logging.handlers.QueueListener(handler.queue, *outputs, respect_handler_level=True)
+        listener.start()
+        root.addHandler(handler)
+
+        _state['handler'], _state['listener'] = handler, listener
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+        logger.debug("Logging configured: profile=%s level=%s", profile, logging.getLevelName(root.level))
+        return handler
+
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Request Metrics
+Per-route latency histograms, status counts, in-flight requests and response
+bytes, rendered in the Prometheus text format
+
+Each worker counts in memory and periodically writes a snapshot to its own
+file in a shared local directory. /api/metrics merges the files of all live
+workers, so the numbers cover every gunicorn/Passenger worker on the host.
+"""
+
+import os
+import json
+import time
+import bisect
+import tempfile
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; the implicit +Inf bucket catches the rest
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = 'madani'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class RequestMetrics:
+    """
+    In-process request counters with a per-worker snapshot file.
+
+    observe() is called once per request under a lock and only does a few
+    dict updates; the snapshot is written at most every `flush_interval`
+    seconds, from whichever request happens to finish after that.
+    """
+
+    def __init__(self, directory=None, flush_interval=5, enabled=True):
+        self.enabled = enabled
+        self.flush_interval = float(flush_interval)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'madani_maktab_metrics')
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+        self._reset()
+        if enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"RequestMetrics: Cannot use metrics directory {self.directory} ({e}), metrics stay per-worker")
+                self.directory = None
+
+    def _reset(self):
+        # route key "METHOD route" -> [bucket counts..., +Inf count], sum, bytes
+        self._buckets = {}
+        self._sums = {}
+        self._bytes = {}
+        # "METHOD route status" -> count
+        self._statuses = {}
+        self._in_flight = 0
+
+    def _check_fork(self):
+        """Start from zero in a forked worker instead of re-reporting the parent's counts"""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._last_flush = 0.0
+            self._reset()
+
+    def request_started(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_fork()
+            self._in_flight += 1
+
+    def request_finished(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    def observe(self, method, route, status, seconds, response_bytes):
+        """Record one finished request"""
+        if not self.enabled:
+            return
+        key = f'{method} {route}'
+        with self._lock:
+            self._check_fork()
+            buckets = self._buckets.get(key)
+            if buckets is None:
+                buckets = self._buckets[key] = [0] * (len(LATENCY_BUCKETS) + 1)
+            buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + seconds
+            self._bytes[key] = self._bytes.get(key, 0) + (response_bytes or 0)
+            status_key = f'{key} {status}'
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+            now = time.monotonic()
+            flush = self.directory is not None and now - self._last_flush >= self.flush_interval
+            if flush:
+                self._last_flush = now
+                snapshot = self._snapshot()
+        if flush:
+            self._write(snapshot)
+
+    def _snapshot(self):
+        return {
+            'buckets': {key: list(counts) for key, counts in self._buckets.items()},
+            'sums': dict(self._sums),
+            'bytes': dict(self._bytes),
+            'statuses': dict(self._statuses),
+            'in_flight': self._in_flight
+        }
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'worker-{pid}.json')
+
+    def _write(self, snapshot):
+        path = self._path(os.getpid())
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            # Atomic rename so readers never see a half-written snapshot
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"RequestMetrics: Could not write snapshot: {e}")
+
+    def _collect(self):
+        """Snapshots of all live workers, this one taken fresh"""
+        with self._lock:
+            self._check_fork()
+            own = self._snapshot()
+        if self.directory is None:
+            return [own]
+
+        self._write(own)
+        snapshots = [own]
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            logger.warning(f"RequestMetrics: Could not list {self.directory}: {e}")
+            return snapshots
+
+        for name in names:
+            if not (name.startswith('worker-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[len('worker-'):-len('.json')])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            path = os.path.join(self.directory, name)
+            if not _pid_alive(pid):
+                # A restarted worker starts a new series; Prometheus treats the drop as a counter reset
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, 'r') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        """All workers' metrics in the Prometheus text exposition format"""
+        snapshots = self._collect()
+        buckets, sums, sizes, statuses = {}, {}, {}, {}
+        in_flight = 0
+        for snapshot in snapshots:
+            for key, counts in snapshot['buckets'].items():
+                merged = buckets.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 1))
+                for index, count in enumerate(counts):
+                    merged[index] += count
+            for target, source in ((sums, snapshot['sums']), (sizes, snapshot['bytes']), (statuses, snapshot['statuses'])):
+                for key, value in source.items():
+                    target[key] = target.get(key, 0) + value
+            in_flight += snapshot['in_flight']
+
+        name = f'{METRIC_PREFIX}_http_request_duration_seconds'
+        lines = [
+            f'# HELP {name} Time until the response was ready, by route.',
+            f'# TYPE {name} histogram',
+        ]
+        for key in sorted(buckets):
+            method, route = key.split(' ', 1)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), buckets[key]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(method=method, route=route, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(method=method, route=route)} {sums.get(key, 0.0):.6f}')
+            lines.append(f'{name}_count{_labels(method=method, route=route)} {cumulative}')
+
+        name = f'{METRIC_PREFIX}_http_requests_total'
+        lines += [f'# HELP {name} Finished requests by route and status.', f'# TYPE {name} counter']
+        for key in sorted(statuses):
+            method, rest = key.split(' ', 1)
+            route, status = rest.rsplit(' ', 1)
+            lines.append(f'{name}{_labels(method=method, route=route, status=status)} {statuses[key]}')
+
+        name = f'{METRIC_PREFIX}_http_response_bytes_total'
+        lines += [f'# HELP {name} Response body bytes with a known length, by route.', f'# TYPE {name} counter']
+        for key in sorted(sizes):
+            method, route = key.split(' ', 1)
+            lines.append(f'{name}{_labels(method=method, route=route)} {sizes[key]}')
+
+        name = f'{METRIC_PREFIX}_http_requests_in_flight'
+        lines += [f'# HELP {name} Requests being handled right now.', f'# TYPE {name} gauge', f'{name} {in_flight}']
+
+        name = f'{METRIC_PREFIX}_metrics_workers'
+        lines += [f'# HELP {name} Worker processes included in these metrics.', f'# TYPE {name} gauge', f'{name} {len(snapshots)}']
+        return '\n'.join(lines) + '\n'
+
+
+def create_request_metrics():
+    """Build RequestMetrics from METRICS_ENABLED / METRICS_DIR / METRICS_FLUSH_INTERVAL"""
+    return RequestMetrics(
+        directory=os.getenv('METRICS_DIR') or None,
+        flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', 5)),
+        enabled=os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+    )
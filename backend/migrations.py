@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Schema Migrations
+Ordered, idempotent schema migrations tracked in the schema_version table
+
+Usage:
+    python migrations.py status           # show current and latest schema version
+    python migrations.py migrate          # apply all pending migrations
+    python migrations.py migrate --to 3   # apply pending migrations up to version 3
+"""
+
+import sys
+import argparse
+import hashlib
+import logging
+
+from mysql.connector import Error, errorcode
+
+import attendance_rollup
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_NAME = 'madani_maktab_schema_migration'
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+class SchemaVersionError(Exception):
+    """Raised when the database schema is older than the code expects"""
+
+
+# ===== HELPERS =====
+
+def _column_exists(cursor, table, column):
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE %s", (column,))
+    return cursor.fetchone() is not None
+
+
+def _index_exists(cursor, table, index_name):
+    cursor.execute(f"SHOW INDEX FROM {table} WHERE Key_name = %s", (index_name,))
+    return bool(cursor.fetchall())
+
+
+def _add_column(cursor, table, column, definition):
+    if not _column_exists(cursor, table, column):
+        logger.info(f"Migrations: Adding {column} column to {table} table...")
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _add_index(cursor, table, index_name, columns, unique=False):
+    if not _index_exists(cursor, table, index_name):
+        logger.info(f"Migrations: Adding {index_name} index to {table} table...")
+        cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {index_name} ON {table} ({columns})")
+
+
+# ===== MIGRATION STEPS =====
+
+def _create_base_tables(cursor):
+    """Create all application tables"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS students (
+            id VARCHAR(50) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            fatherName VARCHAR(255),
+            mobileNumber VARCHAR(20),
+            district VARCHAR(100),
+            upazila VARCHAR(100),
+            class VARCHAR(50),
+            rollNumber VARCHAR(20) UNIQUE,
+            registrationDate VARCHAR(20),
+            status VARCHAR(20) NOT NULL DEFAULT 'active',
+            inactivationDate DATE DEFAULT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            current_score INT DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_class (class)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id VARCHAR(50) NOT NULL,
+            date VARCHAR(20) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            reason TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+            UNIQUE KEY unique_student_date (student_id, date),
+            INDEX idx_date_student (date, student_id)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS holidays (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            date VARCHAR(20) UNIQUE NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS classes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            book_name VARCHAR(255) NOT NULL,
+            class_id INT,
+            total_pages INT DEFAULT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users_new (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            role VARCHAR(20) NOT NULL DEFAULT 'admin',
+            class_name VARCHAR(255) DEFAULT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            last_login TIMESTAMP NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS education_progress (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            class_id INT,
+            class_name VARCHAR(50) NOT NULL,
+            subject_name VARCHAR(100) NOT NULL,
+            book_id INT,
+            book_name VARCHAR(255) NOT NULL,
+            total_pages INT NOT NULL,
+            completed_pages INT DEFAULT 0,
+            last_updated VARCHAR(20),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_class_subject_book (class_id, subject_name, book_id),
+            FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE SET NULL,
+            FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS education_progress_history (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            progress_id INT NOT NULL,
+            class_id INT,
+            class_name VARCHAR(50) NOT NULL,
+            book_id INT,
+            book_name VARCHAR(255) NOT NULL,
+            completed_pages INT NOT NULL,
+            notes TEXT,
+            change_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (progress_id) REFERENCES education_progress(id) ON DELETE CASCADE,
+            FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE SET NULL,
+            FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            setting_key VARCHAR(100) NOT NULL UNIQUE,
+            setting_value TEXT,
+            description VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS teacher_logs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            class_name VARCHAR(50) NOT NULL,
+            student_id VARCHAR(50) NULL,
+            log_type VARCHAR(100) NOT NULL,
+            details TEXT NOT NULL,
+            is_important BOOLEAN DEFAULT FALSE,
+            needs_followup BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+            INDEX idx_class_student (class_name, student_id),
+            INDEX idx_important_followup (is_important, needs_followup)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS score_change_history (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id VARCHAR(50) NOT NULL,
+            old_score INT NOT NULL,
+            new_score INT NOT NULL,
+            change_reason TEXT,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+            INDEX idx_student_date (student_id, changed_at)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+
+def _add_missing_columns(cursor):
+    """Bring tables created by older versions up to the current column set"""
+    _add_column(cursor, 'students', 'current_score', 'INT DEFAULT 0')
+    # Older installs used a default of 70
+    cursor.execute('ALTER TABLE students ALTER COLUMN current_score SET DEFAULT 0')
+    _add_column(cursor, 'students', 'last_updated', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')
+    _add_column(cursor, 'students', 'status', 'VARCHAR(20) NOT NULL DEFAULT "active"')
+    _add_column(cursor, 'students', 'inactivationDate', 'DATE DEFAULT NULL')
+    _add_column(cursor, 'users_new', 'class_name', 'VARCHAR(255) DEFAULT NULL')
+    _add_column(cursor, 'books', 'total_pages', 'INT DEFAULT NULL')
+
+
+def _add_education_class_ids(cursor):
+    """Link education progress (and its history) to classes by id and backfill it"""
+    for table in ('education_progress', 'education_progress_history'):
+        if not _column_exists(cursor, table, 'class_id'):
+            logger.info(f"Migrations: Adding class_id column to {table} table...")
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN class_id INT DEFAULT NULL')
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT fk_{table}_class_id FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE')
+
+    cursor.execute("""
+        UPDATE education_progress ep
+        JOIN classes c ON ep.class_name = c.name
+        SET ep.class_id = c.id
+        WHERE ep.class_id IS NULL
+    """)
+    if cursor.rowcount > 0:
+        logger.info(f"Migrations: Updated {cursor.rowcount} education_progress records with class_id")
+
+    cursor.execute("""
+        UPDATE education_progress_history eph
+        JOIN education_progress ep ON eph.progress_id = ep.id
+        SET eph.class_id = ep.class_id
+        WHERE eph.class_id IS NULL AND ep.class_id IS NOT NULL
+    """)
+    if cursor.rowcount > 0:
+        logger.info(f"Migrations: Updated {cursor.rowcount} education_progress_history records with class_id")
+
+
+def _add_lookup_indexes(cursor):
+    """Indexes for roll number uniqueness, date-range attendance and class filters"""
+    cursor.execute("SHOW INDEX FROM students WHERE Column_name = 'rollNumber' AND Non_unique = 0")
+    if not cursor.fetchall():
+        _add_index(cursor, 'students', 'unique_roll_number', 'rollNumber', unique=True)
+    _add_index(cursor, 'attendance', 'idx_date_student', 'date, student_id')
+    _add_index(cursor, 'students', 'idx_class', 'class')
+
+
+def _create_default_admin(cursor):
+    """Create the default admin user (admin / admin123) if there is none"""
+    cursor.execute("SELECT COUNT(*) FROM users_new WHERE username = 'admin'")
+    if cursor.fetchone()[0] == 0:
+        password_hash = hashlib.sha256("admin123".encode()).hexdigest()
+        cursor.execute('''
+            INSERT INTO users_new (username, password_hash, role)
+            VALUES ('admin', %s, 'admin')
+        ''', (password_hash,))
+        logger.info("Migrations: Default admin user created (username: admin, password: admin123)")
+
+
+def _add_log_pagination_indexes(cursor):
+    """Indexes for keyset pagination of teacher logs by (created_at, id)"""
+    # InnoDB appends the primary key to secondary indexes, so these also cover the id tie-breaker
+    _add_index(cursor, 'teacher_logs', 'idx_class_created', 'class_name, created_at')
+    _add_index(cursor, 'teacher_logs', 'idx_student_created', 'student_id, created_at')
+
+
+def _create_attendance_rollup(cursor):
+    """Per-day, per-class attendance counts, backfilled from raw attendance"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+            date VARCHAR(20) NOT NULL,
+            class VARCHAR(50) NOT NULL DEFAULT '',
+            present INT NOT NULL DEFAULT 0,
+            absent INT NOT NULL DEFAULT 0,
+            `leave` INT NOT NULL DEFAULT 0,
+            holiday INT NOT NULL DEFAULT 0,
+            headcount INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, class),
+            INDEX idx_class_date (class, date)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+    rows = attendance_rollup.refresh(cursor)
+    logger.info(f"Migrations: Backfilled {rows} attendance rollup rows")
+
+
+def _create_attendance_archive(cursor):
+    """Packed per-student, per-month attendance for closed academic years"""
+    # days holds 2 bits per day of the month (day 1 in the lowest bits): 0 none, 1 present, 2 absent, 3 leave
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_archive (
+            student_id VARCHAR(50) NOT NULL,
+            month CHAR(7) NOT NULL,
+            days BIGINT UNSIGNED NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, month),
+            INDEX idx_month (month),
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+    # Only days with a reason, or a status the 2-bit code cannot hold
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_archive_reasons (
+            student_id VARCHAR(50) NOT NULL,
+            date VARCHAR(20) NOT NULL,
+            status VARCHAR(20) DEFAULT NULL,
+            reason TEXT,
+            PRIMARY KEY (student_id, date),
+            INDEX idx_date (date),
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_archive_months (
+            month CHAR(7) PRIMARY KEY,
+            records INT NOT NULL DEFAULT 0,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+
+def _recompute_attendance_rollup(cursor):
+    """Headcounts now start at each student's registration date"""
+    rows = attendance_rollup.refresh(cursor)
+    logger.info(f"Migrations: Recomputed {rows} attendance rollup rows")
+
+
+# Append new steps at the end; never renumber or edit an applied step.
+MIGRATIONS = [
+    (1, 'Create base tables', _create_base_tables),
+    (2, 'Add columns missing from older installs', _add_missing_columns),
+    (3, 'Link education progress to classes by id', _add_education_class_ids),
+    (4, 'Add roll number, attendance date and class indexes', _add_lookup_indexes),
+    (5, 'Create default admin user', _create_default_admin),
+    (6, 'Add teacher log pagination indexes', _add_log_pagination_indexes),
+    (7, 'Create daily attendance rollup', _create_attendance_rollup),
+    (8, 'Create packed attendance archive', _create_attendance_archive),
+    (9, 'Count rollup headcounts from registration dates', _recompute_attendance_rollup),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ===== VERSION TRACKING =====
+
+def _ensure_version_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    ''')
+
+
+def _read_version(cursor):
+    try:
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+    except Error as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:  # database predates versioning
+            return 0
+        raise
+    row = cursor.fetchone()
+    return row[0] or 0
+
+
+def get_schema_version(db):
+    """Version of the last migration applied to the database (0 if none)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        version = _read_version(cursor)
+        cursor.close()
+        return version
+    finally:
+        conn.close()
+
+
+def migrate(db, target=None):
+    """
+    Apply pending migrations in order, up to `target` (default: latest).
+    A MySQL named lock keeps concurrently starting workers from migrating twice.
+    Returns the list of versions applied.
+    """
+    target = LATEST_VERSION if target is None else target
+    conn = db.get_connection()
+    applied = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT GET_LOCK(%s, %s)', (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise SchemaVersionError("Timed out waiting for another process to finish migrating")
+        try:
+            _ensure_version_table(cursor)
+            current = _read_version(cursor)
+            for version, description, step in MIGRATIONS:
+                if version <= current or version > target:
+                    continue
+                logger.info(f"Migrations: Applying {version}: {description}")
+                step(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (%s, %s)',
+                    (version, description)
+                )
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (MIGRATION_LOCK_NAME,))
+            cursor.fetchone()
+            cursor.close()
+    finally:
+        conn.close()
+
+    if applied:
+        logger.info(f"Migrations: Schema is now at version {applied[-1]}")
+    return applied
+
+
+def check_schema(db, auto_migrate=True):
+    """
+    Startup check: compare the database version with LATEST_VERSION.
+    Pending migrations are applied when auto_migrate is set, otherwise
+    SchemaVersionError is raised.
+    """
+    current = get_schema_version(db)
+    if current >= LATEST_VERSION:
+        logger.info(f"Migrations: Schema is up to date (version {current})")
+        return current
+    if not auto_migrate:
+        raise SchemaVersionError(
+            f"Database schema is at version {current}, expected {LATEST_VERSION}. "
+            f"Run: python backend/migrations.py migrate"
+        )
+    logger.info(f"Migrations: Schema is at version {current}, migrating to {LATEST_VERSION}")
+    migrate(db)
+    return LATEST_VERSION
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Madani Maktab schema migrations')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='Show current and latest schema version')
+    migrate_parser = subparsers.add_parser('migrate', help='Apply pending migrations')
+    migrate_parser.add_argument('--to', type=int, default=None, help='Stop after this version')
+    args = parser.parse_args(argv)
+
+    from mysql_database import MySQLDatabase
+    db = MySQLDatabase()
+
+    if args.command == 'status':
+        current = get_schema_version(db)
+        print(f"Current schema version: {current}")
+        print(f"Latest schema version:  {LATEST_VERSION}")
+        for version, description, _ in MIGRATIONS:
+            print(f"  [{'x' if version <= current else ' '}] {version}: {description}")
+        return 0
+
+    applied = migrate(db, target=args.to)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("Nothing to migrate")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,9 +7,22 @@ MySQL-based database for persistent storage in Google Cloud Run
 import mysql.connector
 import json
 import os
+import re
+import sys
+import time
+import base64
 import logging
-from datetime import datetime, timezone, timedelta
-from mysql.connector import Error
+import threading
+import calendar
+from datetime import datetime, timezone
+from mysql.connector import Error, IntegrityError, errorcode
+
+from db_pool import ConnectionPool
+from cache import ReadThroughCache, create_version_store
+from query_stats import QueryStats, InstrumentedConnection
+from timezone_service import TimezoneService
+import attendance_rollup
+import migrations
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -36,6 +49,34 @@ class MySQLDatabase:
         logger.info(f"   Port: {self.db_config['port']}")
         logger.info(f"   Password: {'*' * len(self.db_config['password']) if self.db_config['password'] else 'None'}")
         
+        # Connection pool settings (pool itself is created on first use)
+        self.pool_config = {
+            'size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'recycle': float(os.getenv('DB_POOL_RECYCLE', 1800)),
+            'ping_interval': float(os.getenv('DB_POOL_PING_INTERVAL', 30))
+        }
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        
+        # Read-through cache for reference data (classes, books, holidays, settings)
+        self.cache = ReadThroughCache(
+            create_version_store(),
+            ttl=float(os.getenv('CACHE_TTL', 300)),
+            enabled=os.getenv('CACHE_ENABLED', 'true').lower() != 'false'
+        )
+        self.dashboard_alerts_ttl = float(os.getenv('DASHBOARD_ALERTS_TTL', 30))
+        
+        # Per-method / per-statement timings and the slow-query log
+        self.query_stats = QueryStats(
+            slow_threshold=float(os.getenv('DB_SLOW_QUERY_MS', 500)) / 1000,
+            slow_buffer_size=int(os.getenv('DB_SLOW_QUERY_BUFFER', 50)),
+            enabled=os.getenv('DB_QUERY_STATS', 'true').lower() != 'false'
+        )
+        
+        # Display timezone (DISPLAY_TIMEZONE_OFFSET), parsed once
+        self.timezone = TimezoneService.from_env()
+        
         logger.info("MySQLDatabase: Initialization completed successfully (lazy connection)")
     
     def get_timezone_aware_datetime(self):
@@ -52,59 +93,7 @@ class MySQLDatabase:
     
     def convert_utc_to_local(self, utc_dt):
         """Convert UTC datetime to local time for display"""
-        if utc_dt is None:
-            return None
-        
-        try:
-            # Log the original datetime for debugging
-            logger.info(f"Converting datetime: {utc_dt} (type: {type(utc_dt)})")
-            
-            # Check if we have a specific timezone offset configured
-            timezone_offset = os.getenv('DISPLAY_TIMEZONE_OFFSET', '+06:00')  # Default to Bangladesh time for testing
-            
-            if timezone_offset:
-                # Use a specific timezone offset if configured (e.g., "+06:00", "-05:00")
-                try:
-                    # Parse offset like "+06:00" or "-05:00"
-                    if timezone_offset.startswith(('+', '-')):
-                        sign = 1 if timezone_offset.startswith('+') else -1
-                        offset_str = timezone_offset[1:]  # Remove + or -
-                        hours, minutes = map(int, offset_str.split(':'))
-                        offset_seconds = sign * (hours * 3600 + minutes * 60)
-                        
-                        # Apply offset
-                        if hasattr(utc_dt, 'tzinfo') and utc_dt.tzinfo is not None:
-                            local_dt = utc_dt + timedelta(seconds=offset_seconds)
-                        else:
-                            utc_dt_with_tz = utc_dt.replace(tzinfo=timezone.utc)
-                            local_dt = utc_dt_with_tz + timedelta(seconds=offset_seconds)
-                        
-                        result = local_dt.strftime('%Y-%m-%d %H:%M:%S')
-                        logger.info(f"Converted with offset {timezone_offset}: {result}")
-                        return result
-                except Exception as offset_error:
-                    logger.warning(f"Error using timezone offset {timezone_offset}: {offset_error}")
-            
-            # Default behavior: convert to server's local time
-            if hasattr(utc_dt, 'tzinfo') and utc_dt.tzinfo is not None:
-                # Convert from UTC to local time
-                local_dt = utc_dt.astimezone()
-                result = local_dt.strftime('%Y-%m-%d %H:%M:%S')
-                logger.info(f"Converted timezone-aware UTC to local: {result}")
-                return result
-            else:
-                # If it's naive, assume it's UTC and convert
-                utc_dt_with_tz = utc_dt.replace(tzinfo=timezone.utc)
-                local_dt = utc_dt_with_tz.astimezone()
-                result = local_dt.strftime('%Y-%m-%d %H:%M:%S')
-                logger.info(f"Converted naive UTC to local: {result}")
-                return result
-        except Exception as e:
-            logger.warning(f"Error converting UTC to local time: {e}")
-            # Fallback to original formatting
-            fallback = self.format_datetime_for_display(utc_dt)
-            logger.info(f"Using fallback formatting: {fallback}")
-            return fallback
+        return self.timezone.to_local(utc_dt)
     
     def get_server_timezone_info(self):
         """Get information about the server's timezone"""
@@ -132,24 +121,39 @@ class MySQLDatabase:
             logger.error(f"Error getting timezone info: {e}")
             return {'error': str(e)}
     
+    def _init_session(self, conn):
+        """Per-connection session setup, run once when the pool opens a connection"""
+        # Set timezone to UTC for consistent timestamp handling
+        cursor = conn.cursor()
+        cursor.execute("SET time_zone = '+00:00'")
+        cursor.close()
+    
+    def _get_pool(self):
+        """Create the connection pool on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    config = self.db_config.copy()
+                    config['connect_timeout'] = 10  # 10 seconds timeout
+                    config['autocommit'] = True
+                    self._pool = ConnectionPool(config, session_init=self._init_session, **self.pool_config)
+                    logger.info(f"MySQLDatabase: Connection pool created (size {self.pool_config['size']})")
+        return self._pool
+    
     def get_connection(self):
-        """Get a database connection"""
-        logger.info("MySQLDatabase: Attempting to connect to MySQL...")
+        """
+        Get a pooled database connection (close() returns it to the pool).
+        With query stats on, the connection is wrapped so its statements are timed
+        and attributed to the calling method.
+        """
         try:
-            # Add connection timeout to prevent hanging
-            config = self.db_config.copy()
-            config['connect_timeout'] = 10  # 10 seconds timeout
-            config['autocommit'] = True
-            
-            conn = mysql.connector.connect(**config)
-            
-            # Set timezone to UTC for consistent timestamp handling
-            cursor = conn.cursor()
-            cursor.execute("SET time_zone = '+00:00'")
-            cursor.close()
-            
-            logger.info("MySQLDatabase: Successfully connected to MySQL")
-            return conn
+            started = time.perf_counter()
+            conn = self._get_pool().get_connection()
+            if not self.query_stats.enabled:
+                return conn
+            method = sys._getframe(1).f_code.co_name
+            self.query_stats.record_acquire(method, time.perf_counter() - started)
+            return InstrumentedConnection(conn, self.query_stats, method)
         except Error as e:
             logger.error(f"MySQLDatabase: Error connecting to MySQL: {e}")
             raise
@@ -157,342 +161,32 @@ class MySQLDatabase:
             logger.error(f"MySQLDatabase: Unexpected error connecting to MySQL: {e}")
             raise
     
+    def get_cache_stats(self):
+        """Hit/miss counters of the reference data cache"""
+        return self.cache.stats()
+    
+    def get_query_stats(self, top=20):
+        """Slowest methods and statements of this worker, plus recent slow queries"""
+        return self.query_stats.snapshot(top)
+    
+    def reset_query_stats(self):
+        """Start query timings over (e.g. before load-testing one screen)"""
+        self.query_stats.reset()
+    
+    def get_pool_stats(self):
+        """Get connection pool usage statistics"""
+        if self._pool is None:
+            return {'size': self.pool_config['size'], 'open': 0, 'idle': 0, 'in_use': 0}
+        return self._pool.stats()
+    
     def _ensure_tables_exist(self):
-        """Initialize database tables if they don't exist"""
+        """Create or upgrade all tables by applying pending schema migrations"""
         logger.info("MySQLDatabase: Ensuring tables exist...")
         try:
-            logger.info("MySQLDatabase: Getting connection...")
-            conn = self.get_connection()
-            logger.info("MySQLDatabase: Creating cursor...")
-            cursor = conn.cursor()
-            
-            # Create students table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS students (
-                    id VARCHAR(50) PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    fatherName VARCHAR(255),
-                    mobileNumber VARCHAR(20),
-                    district VARCHAR(100),
-                    upazila VARCHAR(100),
-                    class VARCHAR(50),
-                    rollNumber VARCHAR(20) UNIQUE,
-                    registrationDate VARCHAR(20),
-                    status VARCHAR(20) NOT NULL DEFAULT 'active',
-                    inactivationDate DATE DEFAULT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Add current_score and last_updated columns to existing students table if they don't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM students LIKE 'current_score'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding current_score column to students table...")
-                    cursor.execute('ALTER TABLE students ADD COLUMN current_score INT DEFAULT 0')
-                    logger.info("MySQLDatabase: current_score column added successfully")
-                else:
-                    # Update existing column default to 0
-                    logger.info("MySQLDatabase: Updating current_score column default to 0...")
-                    cursor.execute('ALTER TABLE students ALTER COLUMN current_score SET DEFAULT 0')
-                    logger.info("MySQLDatabase: current_score column default updated to 0")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add current_score column: {e}")
-            
-            try:
-                cursor.execute("SHOW COLUMNS FROM students LIKE 'last_updated'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding last_updated column to students table...")
-                    cursor.execute('ALTER TABLE students ADD COLUMN last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')
-                    logger.info("MySQLDatabase: last_updated column added successfully")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add last_updated column: {e}")
-            
-            # Create attendance table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS attendance (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    student_id VARCHAR(50) NOT NULL,
-                    date VARCHAR(20) NOT NULL,
-                    status VARCHAR(20) NOT NULL,
-                    reason TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                    UNIQUE KEY unique_student_date (student_id, date)
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create holidays table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS holidays (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    date VARCHAR(20) UNIQUE NOT NULL,
-                    name VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create classes table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS classes (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) UNIQUE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create books table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS books (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    book_name VARCHAR(255) NOT NULL,
-                    class_id INT,
-                    total_pages INT DEFAULT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create users table for authentication
-            logger.info("MySQLDatabase: Creating users_new table...")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users_new (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(50) UNIQUE NOT NULL,
-                    password_hash VARCHAR(255) NOT NULL,
-                    role VARCHAR(20) NOT NULL DEFAULT 'admin',
-                    class_name VARCHAR(255) DEFAULT NULL,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    last_login TIMESTAMP NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            logger.info("MySQLDatabase: Users_new table created/verified")
-            
-            # Add class_name column to existing users table if it doesn't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM users_new LIKE 'class_name'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding class_name column to users_new table...")
-                    cursor.execute('ALTER TABLE users_new ADD COLUMN class_name VARCHAR(255) DEFAULT NULL')
-                    logger.info("MySQLDatabase: class_name column added successfully")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add class_name column: {e}")
-            
-            # Force commit to ensure table is created
-            conn.commit()
-            logger.info("MySQLDatabase: Users_new table committed to database")
-            
-            # Now that the table exists, check if admin user exists and create if needed
-            try:
-                logger.info("MySQLDatabase: Checking if admin user exists...")
-                cursor.execute("SELECT COUNT(*) FROM users_new WHERE username = 'admin'")
-                admin_count = cursor.fetchone()[0]
-                logger.info(f"MySQLDatabase: Found {admin_count} admin users")
-                
-                if admin_count == 0:
-                    logger.info("MySQLDatabase: Creating default admin user...")
-                    # Default password: admin123 (will be hashed)
-                    import hashlib
-                    default_password = "admin123"
-                    password_hash = hashlib.sha256(default_password.encode()).hexdigest()
-                    cursor.execute('''
-                        INSERT INTO users_new (username, password_hash, role) 
-                        VALUES ('admin', %s, 'admin')
-                    ''', (password_hash,))
-                    logger.info("MySQLDatabase: Default admin user created (username: admin, password: admin123)")
-                else:
-                    logger.info("MySQLDatabase: Admin user already exists")
-            except Error as e:
-                logger.error(f"MySQLDatabase: Error with admin user: {e}")
-                # Continue with other table creation even if admin user creation fails
-            
-            # Add total_pages column to existing books table if it doesn't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM books LIKE 'total_pages'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding total_pages column to books table...")
-                    cursor.execute('ALTER TABLE books ADD COLUMN total_pages INT DEFAULT NULL')
-                    logger.info("MySQLDatabase: total_pages column added successfully")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add total_pages column: {e}")
-            
-            # Migration completed - no longer needed
-            # (Previously migrated scores from 70 to 0 when changing default)
-            
-            # Create education progress table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS education_progress (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    class_id INT,
-                    class_name VARCHAR(50) NOT NULL,
-                    subject_name VARCHAR(100) NOT NULL,
-                    book_id INT,
-                    book_name VARCHAR(255) NOT NULL,
-                    total_pages INT NOT NULL,
-                    completed_pages INT DEFAULT 0,
-                    last_updated VARCHAR(20),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    UNIQUE KEY unique_class_subject_book (class_id, subject_name, book_id),
-                    FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE SET NULL,
-                    FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create education progress history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS education_progress_history (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    progress_id INT NOT NULL,
-                    class_id INT,
-                    class_name VARCHAR(50) NOT NULL,
-                    book_id INT,
-                    book_name VARCHAR(255) NOT NULL,
-                    completed_pages INT NOT NULL,
-                    notes TEXT,
-                    change_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (progress_id) REFERENCES education_progress(id) ON DELETE CASCADE,
-                    FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE SET NULL,
-                    FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create app settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS app_settings (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    setting_key VARCHAR(100) NOT NULL UNIQUE,
-                    setting_value TEXT,
-                    description VARCHAR(255),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create teacher_logs table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS teacher_logs (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    class_name VARCHAR(50) NOT NULL,
-                    student_id VARCHAR(50) NULL,
-                    log_type VARCHAR(100) NOT NULL,
-                    details TEXT NOT NULL,
-                    is_important BOOLEAN DEFAULT FALSE,
-                    needs_followup BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                    INDEX idx_class_student (class_name, student_id),
-                    INDEX idx_important_followup (is_important, needs_followup)
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Create score_change_history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS score_change_history (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    student_id VARCHAR(50) NOT NULL,
-                    old_score INT NOT NULL,
-                    new_score INT NOT NULL,
-                    change_reason TEXT,
-                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                    INDEX idx_student_date (student_id, changed_at)
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-            
-            # Add status column to existing students table if it doesn't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM students LIKE 'status'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding status column to students table...")
-                    cursor.execute('ALTER TABLE students ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT "active"')
-                    logger.info("MySQLDatabase: Status column added successfully")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add status column: {e}")
-            
-            # Add inactivationDate column to existing students table if it doesn't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM students LIKE 'inactivationDate'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding inactivationDate column to students table...")
-                    cursor.execute('ALTER TABLE students ADD COLUMN inactivationDate DATE DEFAULT NULL')
-                    logger.info("MySQLDatabase: InactivationDate column added successfully")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add inactivationDate column: {e}")
-            
-            # Add class_id column to existing education_progress table if it doesn't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM education_progress LIKE 'class_id'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding class_id column to education_progress table...")
-                    cursor.execute('ALTER TABLE education_progress ADD COLUMN class_id INT DEFAULT NULL')
-                    logger.info("MySQLDatabase: class_id column added to education_progress table")
-                    
-                    # Add foreign key constraint
-                    cursor.execute('ALTER TABLE education_progress ADD CONSTRAINT fk_education_progress_class_id FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE')
-                    logger.info("MySQLDatabase: Foreign key constraint added for class_id in education_progress")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add class_id column to education_progress: {e}")
-            
-            # Add class_id column to existing education_progress_history table if it doesn't exist
-            try:
-                cursor.execute("SHOW COLUMNS FROM education_progress_history LIKE 'class_id'")
-                if not cursor.fetchone():
-                    logger.info("MySQLDatabase: Adding class_id column to education_progress_history table...")
-                    cursor.execute('ALTER TABLE education_progress_history ADD COLUMN class_id INT DEFAULT NULL')
-                    logger.info("MySQLDatabase: class_id column added to education_progress_history table")
-                    
-                    # Add foreign key constraint
-                    cursor.execute('ALTER TABLE education_progress_history ADD CONSTRAINT fk_education_progress_history_class_id FOREIGN KEY (class_id) REFERENCES classes(id) ON DELETE CASCADE')
-                    logger.info("MySQLDatabase: Foreign key constraint added for class_id in education_progress_history")
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not check/add class_id column to education_progress_history: {e}")
-            
-            # Migrate existing data to populate class_id
-            try:
-                logger.info("MySQLDatabase: Starting class_id data migration...")
-                
-                # Update education_progress table
-                cursor.execute("""
-                    UPDATE education_progress ep
-                    JOIN classes c ON ep.class_name = c.name
-                    SET ep.class_id = c.id
-                    WHERE ep.class_id IS NULL
-                """)
-                progress_updated = cursor.rowcount
-                if progress_updated > 0:
-                    logger.info(f"MySQLDatabase: Updated {progress_updated} education_progress records with class_id")
-                
-                # Update education_progress_history table
-                cursor.execute("""
-                    UPDATE education_progress_history eph
-                    JOIN education_progress ep ON eph.progress_id = ep.id
-                    SET eph.class_id = ep.class_id
-                    WHERE eph.class_id IS NULL AND ep.class_id IS NOT NULL
-                """)
-                history_updated = cursor.rowcount
-                if history_updated > 0:
-                    logger.info(f"MySQLDatabase: Updated {history_updated} education_progress_history records with class_id")
-                
-                logger.info("MySQLDatabase: Class ID migration completed")
-                
-            except Error as e:
-                logger.warning(f"MySQLDatabase: Could not migrate class_id data: {e}")
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            logger.info("Database tables initialized successfully")
-            
+            migrations.migrate(self)
         except Error as e:
             logger.error(f"Error initializing database: {e}")
             raise
-        except Exception as e:
-            logger.error(f"Unexpected error initializing database: {e}")
-            raise
     
     def get_class_number(self, class_name):
         """Extract class number from class name (e.g., 'প্রথম শ্রেণি' -> 1)"""
@@ -544,12 +238,12 @@ class MySQLDatabase:
                 ORDER BY CAST(rollNumber AS UNSIGNED)
             ''', (class_name,))
             
-            existing_rolls = []
+            existing_rolls = set()
             for row in cursor.fetchall():
                 try:
                     roll = int(row[0])
                     if base_number <= roll < base_number + 100:
-                        existing_rolls.append(roll)
+                        existing_rolls.add(roll)
                 except:
                     continue
             
@@ -557,33 +251,34 @@ class MySQLDatabase:
             conn.close()
             
             # Find next available roll number
-            if not existing_rolls:
-                return base_number + 1
-            
-            existing_rolls.sort()
-            for i, roll in enumerate(existing_rolls):
-                expected = base_number + i + 1
-                if roll != expected:
-                    return expected
-            
-            # If all sequential, return next number
-            return max(existing_rolls) + 1
+            return self._next_free_roll_number(base_number, existing_rolls)
             
         except Error as e:
             print(f"Error generating roll number: {e}")
             return base_number + 1
     
+    def _next_free_roll_number(self, base_number, used_rolls):
+        """Lowest roll number above a class's base number that is not in used_rolls"""
+        roll = base_number + 1
+        while roll in used_rolls:
+            roll += 1
+        return roll
+    
     # Students methods
-    def get_students(self):
-        """Get all students"""
+    def get_students(self, include_archived=False):
+        """Get all students (archived students are left out unless requested)"""
         try:
-            # Initialize database tables if they don't exist
-            self._ensure_tables_exist()
-            
             conn = self.get_connection()
             cursor = conn.cursor(dictionary=True)
             
-            cursor.execute('SELECT * FROM students ORDER BY CAST(rollNumber AS UNSIGNED)')
+            if include_archived:
+                cursor.execute('SELECT * FROM students ORDER BY CAST(rollNumber AS UNSIGNED)')
+            else:
+                cursor.execute('''
+                    SELECT * FROM students 
+                    WHERE status <> 'archived'
+                    ORDER BY CAST(rollNumber AS UNSIGNED)
+                ''')
             students = []
             for row in cursor.fetchall():
                 student = dict(row)
@@ -603,6 +298,50 @@ class MySQLDatabase:
             logger.error(f"Unexpected error getting students: {e}")
             return []
 
+    def iter_students(self, class_name=None, include_archived=False, batch_size=1000, roster=False):
+        """
+        Yield student rows ordered by class and roll number, read in batches of
+        `batch_size` from an unbuffered cursor (see iter_attendance).
+        roster=True yields the rows of get_students instead: every column but
+        created_at, ordered by roll number.
+        """
+        if roster:
+            columns, order_by = '*', 'CAST(rollNumber AS UNSIGNED)'
+        else:
+            columns = ('id, name, fatherName, rollNumber, mobileNumber, district, upazila, '
+                       'class, registrationDate, status, inactivationDate')
+            order_by = 'class, CAST(rollNumber AS UNSIGNED)'
+        conditions, params = [], []
+        if not include_archived:
+            conditions.append("status <> 'archived'")
+        if class_name:
+            conditions.append('class = %s')
+            params.append(class_name)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f'''
+                SELECT {columns}
+                FROM students
+                {where}
+                ORDER BY {order_by}
+            ''', params)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    if roster:
+                        row.pop('created_at', None)
+                    yield row
+            
+            cursor.close()
+        finally:
+            conn.close()
+    
     def get_student_by_id(self, student_id):
         """Get a single student by ID"""
         try:
@@ -628,20 +367,170 @@ class MySQLDatabase:
             return None
 
     def _initialize_database(self):
-        """Initialize database tables - called once during startup"""
+        """Check the schema version - called once during startup"""
         try:
-            logger.info("MySQLDatabase: Initializing database tables...")
-            self._ensure_tables_exist()
+            logger.info("MySQLDatabase: Checking schema version...")
+            # Pending migrations run here only when DB_AUTO_MIGRATE is on (the default);
+            # otherwise apply them with `python migrations.py migrate`
+            auto_migrate = os.getenv('DB_AUTO_MIGRATE', 'true').lower() != 'false'
+            migrations.check_schema(self, auto_migrate=auto_migrate)
             logger.info("MySQLDatabase: Database initialization completed")
         except Exception as e:
             logger.error(f"MySQLDatabase: Database initialization failed: {e}")
             raise
     
+    def _student_classes(self, cursor, student_ids):
+        """Current classes of the given students, for refreshing the attendance rollup"""
+        student_ids = [student_id for student_id in student_ids if student_id]
+        if not student_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(student_ids))
+        cursor.execute(f'SELECT DISTINCT class FROM students WHERE id IN ({placeholders})', student_ids)
+        return [row[0] for row in cursor.fetchall()]
+    
+    _ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+    
+    def _rollup_since(self, cursor, student_ids, registration_dates=()):
+        """
+        Earliest date whose rollup rows the given students (and any new registration
+        dates) can count in: their registration or first attendance date, whichever
+        is earlier. None means every date (a registration date is missing or not ISO).
+        """
+        candidates = []
+        for registration in registration_dates:
+            if not self._ISO_DATE.match(str(registration or '')):
+                return None
+            candidates.append(str(registration)[:10])
+        
+        student_ids = [student_id for student_id in student_ids if student_id]
+        if student_ids:
+            placeholders = ', '.join(['%s'] * len(student_ids))
+            cursor.execute(f'''
+                SELECT s.registrationDate, MIN(a.date)
+                FROM students s
+                LEFT JOIN attendance a ON a.student_id = s.id
+                WHERE s.id IN ({placeholders})
+                GROUP BY s.id, s.registrationDate
+            ''', student_ids)
+            for registration, first_attendance in cursor.fetchall():
+                if not self._ISO_DATE.match(str(registration or '')):
+                    return None
+                candidates.append(registration[:10])
+                if first_attendance:
+                    candidates.append(first_attendance)
+        return min(candidates) if candidates else None
+    
+    def _student_enrolment(self, cursor, student_id):
+        """(status, inactivationDate) of a student, or None if there is no such student"""
+        cursor.execute('SELECT status, inactivationDate FROM students WHERE id = %s', (student_id,))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def _status_change_since(self, cursor, student_id, old, new):
+        """
+        Earliest date whose enrolment changes when a student's (status, inactivationDate)
+        goes from `old` to `new`; False when no date changes.
+        """
+        def end(state):
+            # None while active, otherwise the inactivation date ('' when unknown)
+            if state is None or state[0] == 'active':
+                return None
+            return str(state[1])[:10] if state[1] else ''
+        
+        ends = [end(old), end(new)]
+        if ends[0] == ends[1]:
+            return False
+        if '' in ends:
+            return self._rollup_since(cursor, [student_id])
+        return min(value for value in ends if value is not None)
+    
+    def delete_student(self, student_id):
+        """
+        Delete a single student.
+        Attendance, teacher logs and score history for that student go with it (ON DELETE CASCADE).
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            classes = self._student_classes(cursor, [student_id])
+            since = self._rollup_since(cursor, [student_id])
+            cursor.execute('DELETE FROM students WHERE id = %s', (student_id,))
+            rows_affected = cursor.rowcount
+            attendance_rollup.refresh(cursor, classes=classes, since=since)
+            
+            conn.commit()
+            self.cache.invalidate('students', 'attendance')
+            cursor.close()
+            conn.close()
+            
+            if rows_affected > 0:
+                logger.info(f"Student deleted successfully: {student_id}")
+                return True
+            else:
+                logger.warning(f"No student found to delete: {student_id}")
+                return False
+            
+        except Error as e:
+            logger.error(f"Error deleting student {student_id}: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+    
+    def archive_student(self, student_id):
+        """
+        Soft-delete a student: hide them from the roster but keep their history.
+        The inactivation date is set to today unless one was already recorded.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            # Check the row exists: re-archiving matches it without changing it, so rowcount is 0
+            old = self._student_enrolment(cursor, student_id)
+            if old is None:
+                conn.rollback()
+                cursor.close()
+                conn.close()
+                logger.warning(f"No student found to archive: {student_id}")
+                return False
+            
+            cursor.execute('''
+                UPDATE students 
+                SET status = 'archived', inactivationDate = COALESCE(inactivationDate, %s)
+                WHERE id = %s
+            ''', (self.get_timezone_aware_datetime().strftime('%Y-%m-%d'), student_id))
+            since = self._status_change_since(cursor, student_id, old, self._student_enrolment(cursor, student_id))
+            if since is not False:
+                attendance_rollup.refresh(cursor, classes=self._student_classes(cursor, [student_id]), since=since)
+            
+            conn.commit()
+            self.cache.invalidate('students', 'attendance')
+            cursor.close()
+            conn.close()
+            
+            logger.info(f"Student archived successfully: {student_id}")
+            return True
+            
+        except Error as e:
+            logger.error(f"Error archiving student {student_id}: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+    
     def save_students(self, students):
         """Save multiple students (used for bulk operations)"""
+        conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            conn.start_transaction()
             
             # Clear existing students
             cursor.execute('DELETE FROM students')
@@ -649,33 +538,43 @@ class MySQLDatabase:
             # Insert all students
             for student in students:
                 self._insert_student(cursor, student)
+            attendance_rollup.refresh(cursor)
             
             conn.commit()
+            self.cache.invalidate('students', 'attendance')
             cursor.close()
             conn.close()
             
         except Error as e:
             print(f"Error saving students: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
             raise
     
-    def _insert_student(self, cursor, student_data):
-        """Helper method to insert a single student"""
-        cursor.execute('''
-            INSERT INTO students 
-            (id, name, fatherName, mobileNumber, district, upazila, class, rollNumber, registrationDate, status, inactivationDate)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            name = VALUES(name),
-            fatherName = VALUES(fatherName),
-            mobileNumber = VALUES(mobileNumber),
-            district = VALUES(district),
-            upazila = VALUES(upazila),
-            class = VALUES(class),
-            rollNumber = VALUES(rollNumber),
-            registrationDate = VALUES(registrationDate),
-            status = VALUES(status),
-            inactivationDate = VALUES(inactivationDate)
-        ''', (
+    _STUDENT_INSERT_SQL = '''
+        INSERT INTO students 
+        (id, name, fatherName, mobileNumber, district, upazila, class, rollNumber, registrationDate, status, inactivationDate)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    '''
+    
+    _STUDENT_UPSERT_SQL = _STUDENT_INSERT_SQL + '''
+        ON DUPLICATE KEY UPDATE
+        name = VALUES(name),
+        fatherName = VALUES(fatherName),
+        mobileNumber = VALUES(mobileNumber),
+        district = VALUES(district),
+        upazila = VALUES(upazila),
+        class = VALUES(class),
+        rollNumber = VALUES(rollNumber),
+        registrationDate = VALUES(registrationDate),
+        status = VALUES(status),
+        inactivationDate = VALUES(inactivationDate)
+    '''
+    
+    def _student_params(self, student_data):
+        """Parameter tuple for _STUDENT_INSERT_SQL / _STUDENT_UPSERT_SQL"""
+        return (
             student_data.get('id'),
             student_data.get('name'),
             student_data.get('fatherName'),
@@ -687,31 +586,235 @@ class MySQLDatabase:
             student_data.get('registrationDate'),
             student_data.get('status', 'active'),  # Default to 'active' if not provided
             student_data.get('inactivationDate')  # Can be None for active students
-        ))
+        )
+    
+    def _insert_student(self, cursor, student_data):
+        """Helper method to insert a single student"""
+        cursor.execute(self._STUDENT_UPSERT_SQL, self._student_params(student_data))
+    
+    def bulk_import_students(self, students, chunk_size=500):
+        """
+        Insert or update many students in one transaction.
+        
+        Rows are validated up front; invalid rows are skipped and reported rather than
+        aborting the import. Missing roll numbers are assigned per class in the same
+        pass. Valid rows are upserted with executemany in chunks of `chunk_size`.
+        
+        Returns a dict with 'imported', 'updated', 'failed', 'errors' (per-row) and
+        'assigned_roll_numbers' ({student_id: rollNumber}).
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            # One read of the existing roster for roll number checks and assignment
+            cursor.execute('SELECT id, class, rollNumber FROM students FOR UPDATE')
+            existing_ids = set()
+            roll_owner = {}
+            student_roll = {}
+            student_class = {}
+            for student_id, class_name, roll_number in cursor.fetchall():
+                existing_ids.add(student_id)
+                student_class[student_id] = class_name
+                if roll_number:
+                    roll_owner[str(roll_number)] = student_id
+                    student_roll[student_id] = str(roll_number)
+            
+            errors = []
+            valid = []
+            batch_ids = set()
+            for index, student in enumerate(students):
+                row = index + 1
+                student_id = student.get('id')
+                if not student_id or not student.get('name'):
+                    errors.append({'row': row, 'id': student_id, 'code': 'missing_field', 'error': 'Missing required field: id or name'})
+                    continue
+                if student_id in batch_ids:
+                    errors.append({'row': row, 'id': student_id, 'code': 'duplicate_id', 'error': f'Duplicate student ID {student_id} in file'})
+                    continue
+                
+                # Existing students keep their roll number when the file leaves it blank
+                roll_number = str(student.get('rollNumber') or '').strip() or student_roll.get(student_id, '')
+                if roll_number:
+                    owner = roll_owner.get(roll_number)
+                    if owner is not None and owner != student_id:
+                        errors.append({'row': row, 'id': student_id, 'code': 'duplicate_roll', 'error': f'Roll number {roll_number} already exists'})
+                        continue
+                    # A roll number stays reserved for its current owner until the import commits,
+                    # otherwise the UNIQUE key would turn the upsert into an update of that owner's row
+                    roll_owner[roll_number] = student_id
+                
+                batch_ids.add(student_id)
+                valid.append(dict(student, rollNumber=roll_number or None))
+            
+            # Assign roll numbers for rows that did not provide one
+            assigned = {}
+            used_by_base = {}
+            for student in valid:
+                if student['rollNumber']:
+                    continue
+                base_number = self.get_class_number(student.get('class') or '') * 100
+                if base_number not in used_by_base:
+                    used_by_base[base_number] = {
+                        int(roll) for roll in roll_owner
+                        if roll.isdigit() and base_number <= int(roll) < base_number + 100
+                    }
+                roll = self._next_free_roll_number(base_number, used_by_base[base_number])
+                used_by_base[base_number].add(roll)
+                student['rollNumber'] = str(roll)
+                roll_owner[str(roll)] = student['id']
+                assigned[student['id']] = str(roll)
+            
+            for start in range(0, len(valid), chunk_size):
+                chunk = valid[start:start + chunk_size]
+                cursor.executemany(self._STUDENT_UPSERT_SQL, [self._student_params(s) for s in chunk])
+            
+            # Students may have moved between classes or changed status
+            touched_classes = {student.get('class') for student in valid}
+            touched_classes.update(student_class[student['id']] for student in valid if student['id'] in existing_ids)
+            attendance_rollup.refresh(cursor, classes=touched_classes)
+            
+            conn.commit()
+            self.cache.invalidate('students', 'attendance')
+            cursor.close()
+            conn.close()
+            
+            updated = sum(1 for student in valid if student['id'] in existing_ids)
+            return {
+                'imported': len(valid) - updated,
+                'updated': updated,
+                'failed': len(errors),
+                'errors': errors,
+                'assigned_roll_numbers': assigned
+            }
+            
+        except Error as e:
+            logger.error(f"Error bulk importing students: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
     
     def add_student(self, student_data):
         """Add or update a student"""
+        conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            conn.start_transaction()
             
+            classes = self._student_classes(cursor, [student_data.get('id')])
+            since = self._rollup_since(cursor, [student_data.get('id')], [student_data.get('registrationDate')])
             self._insert_student(cursor, student_data)
+            attendance_rollup.refresh(cursor, classes=classes + [student_data.get('class')], since=since)
             
             conn.commit()
+            self.cache.invalidate('students', 'attendance')
             cursor.close()
             conn.close()
             return True
             
         except Error as e:
             print(f"Error adding student: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
             raise
-
-    def set_student_status(self, student_id, status, inactivation_date=None):
-        """Set the status for a specific student and record the inactivation date."""
+    
+    def _raise_for_duplicate_student(self, e, student_data):
+        """Turn a unique-key violation on students into a ValueError with a readable message"""
+        if isinstance(e, IntegrityError) and e.errno == errorcode.ER_DUP_ENTRY:
+            if 'rollNumber' in str(e) or 'unique_roll_number' in str(e):
+                raise ValueError(f"Roll number {student_data.get('rollNumber')} already exists") from e
+            if 'PRIMARY' in str(e):
+                raise ValueError(f"Student ID {student_data.get('id')} already exists") from e
+    
+    def create_student(self, student_data):
+        """
+        Insert a new student.
+        Roll number and ID uniqueness are enforced by the database; a conflict raises ValueError.
+        """
+        conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            conn.start_transaction()
+            
+            # Plain INSERT: an upsert would silently overwrite an existing student with the same ID
+            cursor.execute(self._STUDENT_INSERT_SQL, self._student_params(student_data))
+            since = self._rollup_since(cursor, [student_data.get('id')])
+            attendance_rollup.refresh(cursor, classes=[student_data.get('class')], since=since)
+            
+            conn.commit()
+            self.cache.invalidate('students', 'attendance')
+            cursor.close()
+            conn.close()
+            return True
+            
+        except Error as e:
+            logger.error(f"Error creating student: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            self._raise_for_duplicate_student(e, student_data)
+            raise
+    
+    def update_student(self, student_id, student_data):
+        """
+        Update the editable fields of an existing student.
+        Only fields present in student_data are changed. Returns False if the student
+        does not exist; a roll number conflict raises ValueError.
+        """
+        editable_fields = ['name', 'fatherName', 'mobileNumber', 'district', 'upazila',
+                           'class', 'rollNumber', 'registrationDate']
+        updates = [field for field in editable_fields if field in student_data]
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            # A class or registration date change moves the student's rollup counts
+            moves_rollup = 'class' in updates or 'registrationDate' in updates
+            if updates:
+                if moves_rollup:
+                    old_classes = self._student_classes(cursor, [student_id])
+                    since = self._rollup_since(cursor, [student_id], [student_data['registrationDate']] if 'registrationDate' in updates else [])
+                assignments = ', '.join(f'{field} = %s' for field in updates)
+                cursor.execute(
+                    f'UPDATE students SET {assignments} WHERE id = %s',
+                    [student_data[field] for field in updates] + [student_id]
+                )
+                if moves_rollup:
+                    new_classes = [student_data['class']] if 'class' in updates else []
+                    attendance_rollup.refresh(cursor, classes=old_classes + new_classes, since=since)
+            
+            # rowcount is 0 for unchanged rows too, so confirm existence by key
+            cursor.execute('SELECT 1 FROM students WHERE id = %s', (student_id,))
+            exists = cursor.fetchone() is not None
+            
+            conn.commit()
+            self.cache.invalidate('students')
+            if moves_rollup:
+                self.cache.invalidate('attendance')
+            cursor.close()
+            conn.close()
+            return exists
+            
+        except Error as e:
+            logger.error(f"Error updating student {student_id}: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            self._raise_for_duplicate_student(e, student_data)
+            raise
 
+    def set_student_status(self, student_id, status, inactivation_date=None):
+        """Set the status for a specific student and record the inactivation date."""
+        conn = None
+        try:
             # If student is being made inactive, use provided date or today's date
             # If being made active, clear the date by setting it to NULL.
             if status == 'inactive':
@@ -730,18 +833,30 @@ class MySQLDatabase:
             else:
                 inactivation_date = None
 
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            old = self._student_enrolment(cursor, student_id)
             cursor.execute(
                 'UPDATE students SET status = %s, inactivationDate = %s WHERE id = %s',
                 (status, inactivation_date, student_id)
             )
+            since = self._status_change_since(cursor, student_id, old, (status, inactivation_date))
+            if since is not False:
+                attendance_rollup.refresh(cursor, classes=self._student_classes(cursor, [student_id]), since=since)
 
             conn.commit()
+            self.cache.invalidate('students', 'attendance')
             cursor.close()
             conn.close()
             return True
 
         except Error as e:
             logger.error(f"Error setting student status: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
             raise
 
     def set_student_status_with_attendance_handling(self, student_id, status, inactivation_date=None, handle_attendance='keep'):
@@ -754,13 +869,15 @@ class MySQLDatabase:
             inactivation_date: Date when student became inactive (for backdating)
             handle_attendance: 'keep', 'remove', or 'mark_absent'
         """
+        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
             # Set the student status first
             self.set_student_status(student_id, status, inactivation_date)
 
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
             # If making inactive with a backdated date, handle attendance
             if status == 'inactive' and inactivation_date:
                 from datetime import datetime
@@ -782,14 +899,20 @@ class MySQLDatabase:
                     ''', (student_id, inactivation_date))
                     
                 # If 'keep', do nothing - attendance records remain unchanged
+                if handle_attendance in ('remove', 'mark_absent'):
+                    attendance_rollup.refresh(cursor, classes=self._student_classes(cursor, [student_id]), since=inactivation_date)
 
             conn.commit()
+            self.cache.invalidate('students', 'attendance')
             cursor.close()
             conn.close()
             return True
 
         except Error as e:
             logger.error(f"Error setting student status with attendance handling: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
             raise
 
     def get_student_status_for_date(self, student_id, date):
@@ -862,13 +985,19 @@ class MySQLDatabase:
             return {'total': 0, 'active': 0, 'inactive': 0}
     
     # Attendance methods
-    def get_attendance(self, date=None):
-        """Get attendance data"""
+    def get_attendance(self, date=None, start_date=None, end_date=None, class_name=None, student_id=None):
+        """
+        Get attendance data.
+        
+        With `date`, returns {student_id: {status, reason}} for that day.
+        Otherwise returns {date: {student_id: {status, reason}}}, optionally limited
+        to a date range, a class and/or a single student.
+        """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            
             if date:
+                conn = self.get_connection()
+                cursor = conn.cursor(dictionary=True)
+                
                 # Get attendance for specific date
                 cursor.execute('''
                     SELECT student_id, status, reason 
@@ -885,17 +1014,18 @@ class MySQLDatabase:
                 
                 cursor.close()
                 conn.close()
+                
+                if date[:7] in self._archived_months():
+                    for row in self.iter_archived_attendance(date, date):
+                        attendance[row['student_id']] = {
+                            'status': row['status'],
+                            'reason': row['reason']
+                        }
                 return attendance
             else:
-                # Get all attendance grouped by date
-                cursor.execute('''
-                    SELECT date, student_id, status, reason 
-                    FROM attendance 
-                    ORDER BY date DESC
-                ''')
-                
+                # Get attendance grouped by date
                 attendance = {}
-                for row in cursor.fetchall():
+                for row in self.iter_attendance(start_date, end_date, class_name, student_id):
                     if row['date'] not in attendance:
                         attendance[row['date']] = {}
                     
@@ -904,98 +1034,1019 @@ class MySQLDatabase:
                         'reason': row['reason'] or ''
                     }
                 
-                cursor.close()
-                conn.close()
                 return attendance
                 
         except Error as e:
             print(f"Error getting attendance: {e}")
             return {}
     
+    def _attendance_filter_sql(self, start_date=None, end_date=None, class_name=None, student_id=None):
+        """Build the JOIN/WHERE clause and params shared by attendance range queries"""
+        join = ''
+        conditions = []
+        params = []
+        
+        if start_date:
+            conditions.append('a.date >= %s')
+            params.append(start_date)
+        if end_date:
+            conditions.append('a.date <= %s')
+            params.append(end_date)
+        if student_id:
+            conditions.append('a.student_id = %s')
+            params.append(student_id)
+        if class_name:
+            join = 'JOIN students s ON s.id = a.student_id'
+            conditions.append('s.class = %s')
+            params.append(class_name)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return join, where, params
+    
+    def iter_attendance(self, start_date=None, end_date=None, class_name=None, student_id=None, batch_size=1000):
+        """
+        Yield attendance rows (date, student_id, status, reason), newest date first.
+        
+        Rows are read from an unbuffered cursor in batches of `batch_size`, so memory
+        use is bounded by the batch rather than the size of the requested window.
+        The pooled connection is held until the generator is exhausted or closed.
+        Archived months in the window follow the live rows.
+        """
+        join, where, params = self._attendance_filter_sql(start_date, end_date, class_name, student_id)
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f'''
+                SELECT a.date, a.student_id, a.status, a.reason 
+                FROM attendance a
+                {join}
+                {where}
+                ORDER BY a.date DESC, a.student_id
+            ''', params)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+            
+            cursor.close()
+        finally:
+            conn.close()
+        
+        if self._archive_overlaps(start_date, end_date):
+            yield from self.iter_archived_attendance(start_date, end_date, class_name, student_id)
+    
+    # ===== ATTENDANCE ARCHIVE =====
+    # Closed months are moved out of `attendance` into attendance_archive: one BIGINT per
+    # student per month holding a 2-bit status code per day (day 1 in the lowest bits).
+    # Reasons, and statuses without a code (e.g. 'holiday'), go to attendance_archive_reasons.
+    
+    _ARCHIVE_CODES = {'present': 1, 'absent': 2, 'leave': 3}
+    _ARCHIVE_STATUSES = {code: status for status, code in _ARCHIVE_CODES.items()}
+    # 0b0101... selects the low bit of every 2-bit day slot
+    _ARCHIVE_LOW_BITS = 0x5555555555555555
+    
+    def _archived_months(self):
+        """Set of archived months ('YYYY-MM')"""
+        return self.cache.get_or_load('attendance', 'archived_months', self._query_archived_months)
+    
+    def _query_archived_months(self):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT month FROM attendance_archive_months')
+        months = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        conn.close()
+        return months
+    
+    def _check_not_archived(self, date):
+        """Reject writes to a month that has been archived"""
+        if date and date[:7] in self._archived_months():
+            raise ValueError(f"Attendance for {date[:7]} is archived")
+    
+    def _unpack_days(self, packed):
+        """Yield (day, status) for every day with a code in a packed month"""
+        day = 1
+        while packed:
+            code = packed & 3
+            if code:
+                yield day, self._ARCHIVE_STATUSES[code]
+            packed >>= 2
+            day += 1
+    
+    def get_archived_months(self):
+        """Archived months with their record counts, newest first"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute('SELECT month, records, archived_at FROM attendance_archive_months ORDER BY month DESC')
+            months = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            return months
+        
+        except Error as e:
+            logger.error(f"Error getting archived months: {e}")
+            raise
+    
+    def archive_attendance(self, first_month, last_month):
+        """
+        Move raw attendance for the months first_month..last_month ('YYYY-MM') into the archive.
+        Each month is archived in its own transaction. The month's rollup rows are refreshed
+        first and stay frozen afterwards. Returns {'months': [...], 'records': n}.
+        Raises ValueError unless every month is before the current (display-local) month,
+        since an archived month no longer accepts attendance.
+        """
+        months = self._month_range(first_month, last_month)
+        current_month = self.timezone.to_local(self.get_timezone_aware_datetime())[:7]
+        if months[-1] >= current_month:
+            raise ValueError(f"Only months before {current_month} can be archived")
+        archived, total = [], 0
+        for month in months:
+            conn = None
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                conn.start_transaction()
+                
+                cursor.execute('''
+                    SELECT student_id, date, status, reason
+                    FROM attendance
+                    WHERE date BETWEEN %s AND %s
+                    FOR UPDATE
+                ''', (f'{month}-01', f'{month}-31'))
+                rows = cursor.fetchall()
+                if not rows:
+                    conn.rollback()
+                    conn.close()
+                    continue
+                
+                attendance_rollup.refresh(cursor, dates={row[1] for row in rows})
+                
+                packed, masks, side_rows = {}, {}, []
+                for student_id, date, status, reason in rows:
+                    shift = 2 * (int(date[8:10]) - 1)
+                    code = self._ARCHIVE_CODES.get(status, 0)
+                    packed[student_id] = packed.get(student_id, 0) | (code << shift)
+                    masks[student_id] = masks.get(student_id, 0) | (3 << shift)
+                    if not code or reason:
+                        side_rows.append((student_id, date, None if code else status, reason or None))
+                
+                # Raw rows written after an earlier archive run of this month replace those days
+                cursor.execute('SELECT student_id, days FROM attendance_archive WHERE month = %s', (month,))
+                for student_id, days in cursor.fetchall():
+                    if student_id in packed:
+                        packed[student_id] |= int(days) & ~masks[student_id]
+                if month in self._archived_months():
+                    cursor.executemany(
+                        'DELETE FROM attendance_archive_reasons WHERE student_id = %s AND date = %s',
+                        [(row[0], row[1]) for row in rows]
+                    )
+                
+                cursor.executemany('''
+                    INSERT INTO attendance_archive (student_id, month, days)
+                    VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE days = VALUES(days)
+                ''', [(student_id, month, days) for student_id, days in packed.items()])
+                if side_rows:
+                    cursor.executemany('''
+                        INSERT INTO attendance_archive_reasons (student_id, date, status, reason)
+                        VALUES (%s, %s, %s, %s)
+                    ''', side_rows)
+                cursor.execute('DELETE FROM attendance WHERE date BETWEEN %s AND %s', (f'{month}-01', f'{month}-31'))
+                cursor.execute('''
+                    INSERT INTO attendance_archive_months (month, records)
+                    VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE records = records + VALUES(records), archived_at = CURRENT_TIMESTAMP
+                ''', (month, len(rows)))
+                
+                conn.commit()
+                cursor.close()
+                conn.close()
+                self.cache.invalidate('attendance')
+                archived.append(month)
+                total += len(rows)
+                logger.info(f"DB: Archived {len(rows)} attendance records for {month}")
+            
+            except Error as e:
+                logger.error(f"Error archiving attendance for {month}: {e}")
+                if conn is not None:
+                    conn.rollback()
+                    conn.close()
+                raise
+        
+        return {'months': archived, 'records': total}
+    
+    def restore_attendance_archive(self, month):
+        """Move an archived month back into the attendance table. Returns the number of records restored."""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            records = [
+                (row['student_id'], row['date'], row['status'], row['reason'])
+                for row in self._read_archive(cursor, f'{month}-01', f'{month}-31')
+            ]
+            if records:
+                cursor.executemany('''
+                    INSERT INTO attendance (student_id, date, status, reason)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                    status = VALUES(status),
+                    reason = VALUES(reason)
+                ''', records)
+            cursor.execute('DELETE FROM attendance_archive WHERE month = %s', (month,))
+            cursor.execute('DELETE FROM attendance_archive_reasons WHERE date BETWEEN %s AND %s', (f'{month}-01', f'{month}-31'))
+            cursor.execute('DELETE FROM attendance_archive_months WHERE month = %s', (month,))
+            attendance_rollup.refresh(cursor, dates={record[1] for record in records})
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            self.cache.invalidate('attendance')
+            return len(records)
+        
+        except Error as e:
+            logger.error(f"Error restoring archived attendance for {month}: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+    
+    def _month_range(self, first_month, last_month):
+        """All 'YYYY-MM' months from first_month to last_month inclusive"""
+        first = datetime.strptime(first_month, '%Y-%m')
+        last = datetime.strptime(last_month, '%Y-%m')
+        if first > last:
+            raise ValueError('first month must not be after last month')
+        months = []
+        year, month = first.year, first.month
+        while (year, month) <= (last.year, last.month):
+            months.append(f'{year:04d}-{month:02d}')
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+    
+    def _read_archive(self, cursor, start_date=None, end_date=None, class_name=None, student_id=None):
+        """
+        Decode archived attendance into (date, student_id, status, reason) rows,
+        newest month first and ordered by date and student within a month.
+        """
+        join = 'JOIN students s ON s.id = x.student_id' if class_name else ''
+        
+        def where(start_column, end_column, start, end):
+            conditions, params = [], []
+            for column, operator, value in ((start_column, '>=', start), (end_column, '<=', end),
+                                            ('x.student_id', '=', student_id), ('s.class', '=', class_name)):
+                if value:
+                    conditions.append(f'{column} {operator} %s')
+                    params.append(value)
+            return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+        
+        # The side table is sparse, so it is read up front for the whole window
+        side_where, side_params = where('x.date', 'x.date', start_date, end_date)
+        cursor.execute(f'''
+            SELECT x.student_id, x.date, x.status, x.reason
+            FROM attendance_archive_reasons x
+            {join}
+            {side_where}
+        ''', side_params)
+        side = {(row[0], row[1]): (row[2], row[3] or '') for row in cursor.fetchall()}
+        
+        month_where, month_params = where('x.month', 'x.month', start_date and start_date[:7], end_date and end_date[:7])
+        cursor.execute(f'''
+            SELECT x.student_id, x.month, x.days
+            FROM attendance_archive x
+            {join}
+            {month_where}
+            ORDER BY x.month DESC
+        ''', month_params)
+        
+        def decode_month(month, packed_rows):
+            rows = []
+            seen = set()
+            for student_id, days in packed_rows:
+                for day, status in self._unpack_days(int(days)):
+                    date = f'{month}-{day:02d}'
+                    seen.add((student_id, date))
+                    rows.append({'date': date, 'student_id': student_id, 'status': status,
+                                 'reason': side.get((student_id, date), (None, ''))[1]})
+            for (student_id, date), (status, reason) in side.items():
+                if status and date[:7] == month and (student_id, date) not in seen:
+                    rows.append({'date': date, 'student_id': student_id, 'status': status, 'reason': reason})
+            # Same order as iter_attendance: newest date first, then student ID
+            rows.sort(key=lambda row: row['student_id'])
+            rows.sort(key=lambda row: row['date'], reverse=True)
+            return [row for row in rows
+                    if (not start_date or row['date'] >= start_date) and (not end_date or row['date'] <= end_date)]
+        
+        month, packed_rows = None, []
+        for student_id, row_month, days in cursor.fetchall():
+            if row_month != month and packed_rows:
+                yield from decode_month(month, packed_rows)
+                packed_rows = []
+            month = row_month
+            packed_rows.append((student_id, days))
+        if packed_rows:
+            yield from decode_month(month, packed_rows)
+    
+    def _archive_overlaps(self, start_date=None, end_date=None):
+        """True when any archived month falls inside the date window"""
+        return any(
+            (not start_date or month >= start_date[:7]) and (not end_date or month <= end_date[:7])
+            for month in self._archived_months()
+        )
+    
+    def iter_archived_attendance(self, start_date=None, end_date=None, class_name=None, student_id=None):
+        """Yield archived attendance rows in the same shape as iter_attendance"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            yield from self._read_archive(cursor, start_date, end_date, class_name, student_id)
+            cursor.close()
+        finally:
+            conn.close()
+    
+    def _archived_attendance_rows(self, start_date=None, end_date=None, class_name=None, student_id=None):
+        """
+        Archived attendance rows in the window with holidays left out, for aggregates
+        over the live table that must also count archived months
+        """
+        if not self._archive_overlaps(start_date, end_date):
+            return []
+        rows = list(self.iter_archived_attendance(start_date, end_date, class_name, student_id))
+        if not rows:
+            return rows
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT date FROM holidays WHERE date BETWEEN %s AND %s',
+                           (start_date or '0000-00-00', end_date or '9999-12-31'))
+            holidays = {row[0] for row in cursor.fetchall()}
+            cursor.close()
+        finally:
+            conn.close()
+        return [row for row in rows if row['date'] not in holidays]
+    
+    def get_archived_attendance_counts(self, first_month, last_month, class_name=None):
+        """
+        Per-student present/absent/leave counts over archived months, counted in SQL
+        with BIT_COUNT on the packed days so nothing is decoded in Python.
+        """
+        low_bits = self._ARCHIVE_LOW_BITS
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            sql = f'''
+                SELECT x.student_id AS student_id, s.name AS name, s.class AS class,
+                    SUM(BIT_COUNT(x.days & ~(x.days >> 1) & {low_bits})) AS present,
+                    SUM(BIT_COUNT((x.days >> 1) & ~x.days & {low_bits})) AS absent,
+                    SUM(BIT_COUNT(x.days & (x.days >> 1) & {low_bits})) AS `leave`
+                FROM attendance_archive x
+                JOIN students s ON s.id = x.student_id
+                WHERE x.month BETWEEN %s AND %s
+            '''
+            params = [first_month, last_month]
+            if class_name:
+                sql += ' AND s.class = %s'
+                params.append(class_name)
+            cursor.execute(sql + ' GROUP BY x.student_id, s.name, s.class, s.rollNumber ORDER BY s.class, CAST(s.rollNumber AS UNSIGNED)', params)
+            counts = [self._attendance_counts(row) for row in cursor.fetchall()]
+            
+            cursor.close()
+            conn.close()
+            return counts
+        
+        except Error as e:
+            logger.error(f"Error getting archived attendance counts: {e}")
+            raise
+    
     def save_attendance(self, attendance_data):
-        """Save attendance data"""
+        """
+        Save attendance data.
+        Dates in archived months are skipped: their records already live in the archive.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            # Clear all attendance records
+            cursor.execute('DELETE FROM attendance')
+            
+            # Insert new attendance records
+            archived_months = self._archived_months()
+            skipped = 0
+            for date, students in attendance_data.items():
+                if date and date[:7] in archived_months:
+                    skipped += 1
+                    continue
+                for student_id, info in students.items():
+                    cursor.execute('''
+                        INSERT INTO attendance (student_id, date, status, reason)
+                        VALUES (%s, %s, %s, %s)
+                    ''', (student_id, date, info.get('status', 'absent'), info.get('reason', '')))
+            attendance_rollup.refresh(cursor)
+            
+            conn.commit()
+            self.cache.invalidate('attendance')
+            cursor.close()
+            conn.close()
+            if skipped:
+                logger.info(f"DB: Skipped {skipped} dates in archived months while saving attendance")
+            
+        except Error as e:
+            print(f"Error saving attendance: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+
+    def _write_attendance_date(self, cursor, date, records):
+        """
+        Merge `records` into one date's attendance inside the caller's transaction,
+        writing only the rows that changed. Students marked 'neutral' are cleared;
+        students missing from `records` are left alone. Returns (updated, removed).
+        """
+        if not records:
+            return 0, 0
+        
+        placeholders = ', '.join(['%s'] * len(records))
+        cursor.execute(f'''
+            SELECT student_id, status, reason
+            FROM attendance
+            WHERE date = %s AND student_id IN ({placeholders})
+            FOR UPDATE
+        ''', [date] + list(records))
+        existing = {row[0]: (row[1], row[2] or '') for row in cursor.fetchall()}
+        
+        wanted = {}
+        cleared = []
+        for student_id, info in records.items():
+            info = info or {}
+            status = info.get('status', 'absent')
+            if status == 'neutral':
+                cleared.append(student_id)
+                continue
+            wanted[student_id] = (status, info.get('reason') or '')
+        
+        upserts = [
+            (student_id, date, status, reason)
+            for student_id, (status, reason) in wanted.items()
+            if existing.get(student_id) != (status, reason)
+        ]
+        removed = [student_id for student_id in cleared if student_id in existing]
+        
+        if upserts:
+            cursor.executemany('''
+                INSERT INTO attendance (student_id, date, status, reason)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                status = VALUES(status),
+                reason = VALUES(reason)
+            ''', upserts)
+        
+        if removed:
+            placeholders = ', '.join(['%s'] * len(removed))
+            cursor.execute(
+                f'DELETE FROM attendance WHERE date = %s AND student_id IN ({placeholders})',
+                [date] + removed
+            )
+        
+        return len(upserts), len(removed)
+    
+    def save_attendance_for_date(self, date, records):
+        """
+        Merge attendance for a single date, writing only the rows that changed.
+        
+        Args:
+            date: Date string (YYYY-MM-DD)
+            records: Dict of student_id -> {'status': ..., 'reason': ...}.
+                     Students marked 'neutral' are cleared for that date; students
+                     missing from it keep whatever is stored.
+        
+        Returns a dict with the number of rows upserted and removed.
+        Raises ValueError when the date falls in an archived month.
+        """
+        result = self.save_attendance_for_dates({date: records})
+        return {'updated': result['updated'], 'removed': result['removed']}
+    
+    def save_attendance_for_dates(self, days):
+        """
+        Replace attendance for several dates in one transaction; see save_attendance_for_date.
+        
+        Args:
+            days: Dict of date (YYYY-MM-DD) -> records for that date
+        
+        Returns a dict with the rows upserted and removed across all dates and the
+        dates that changed. Raises ValueError when any date falls in an archived month.
+        """
+        for date in days:
+            self._check_not_archived(date)
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            updated = removed = 0
+            changed = []
+            # Fixed order so concurrent batches lock dates in the same sequence
+            for date in sorted(days):
+                date_updated, date_removed = self._write_attendance_date(cursor, date, days[date])
+                updated += date_updated
+                removed += date_removed
+                if date_updated or date_removed:
+                    changed.append(date)
+            
+            if changed:
+                attendance_rollup.refresh(cursor, dates=changed)
+            
+            conn.commit()
+            self.cache.invalidate('attendance')
+            cursor.close()
+            conn.close()
+            return {'updated': updated, 'removed': removed, 'changed_dates': changed}
+        
+        except Error as e:
+            logger.error(f"Error saving attendance for {len(days)} dates: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+    
+    def reset_attendance(self):
+        """Reset attendance data, including archived months and the rollup, to an empty state"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            for table in ('attendance', 'attendance_daily_rollup', 'attendance_archive',
+                          'attendance_archive_reasons', 'attendance_archive_months'):
+                cursor.execute(f'DELETE FROM {table}')
+            conn.commit()
+            self.cache.invalidate('attendance')
+            cursor.close()
+            conn.close()
+            
+        except Error as e:
+            print(f"Error resetting attendance: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+    
+    def update_attendance(self, date, student_id, status, reason=""):
+        """Update attendance for a specific student and date"""
+        self._check_not_archived(date)
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            conn.start_transaction()
+            
+            cursor.execute('''
+                INSERT INTO attendance (student_id, date, status, reason)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                status = VALUES(status),
+                reason = VALUES(reason)
+            ''', (student_id, date, status, reason))
+            attendance_rollup.refresh(cursor, dates=[date])
+            
+            conn.commit()
+            self.cache.invalidate('attendance')
+            cursor.close()
+            conn.close()
+            
+        except Error as e:
+            print(f"Error updating attendance: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            raise
+    
+    def _attendance_counts(self, row):
+        """Convert SUM() columns to ints and add the attendance rate"""
+        for key in ('present', 'absent', 'leave', 'holiday'):
+            row[key] = int(row.get(key) or 0)
+        if 'headcount' in row:
+            row['headcount'] = int(row['headcount'] or 0)
+        marked = row['present'] + row['absent'] + row['leave']
+        row['total'] = marked
+        row['rate'] = round(row['present'] * 100.0 / marked, 1) if marked else 0
+        return row
+    
+    def _add_archived_student_counts(self, cursor, by_student, archived):
+        """
+        Merge archived attendance rows into per-student count rows from the live table,
+        applying the same inactivation rule, and restore the class/roll number order
+        """
+        rows = {row['student_id']: row for row in by_student}
+        student_ids = list({row['student_id'] for row in archived} | set(rows))
+        placeholders = ', '.join(['%s'] * len(student_ids))
+        cursor.execute(f'''
+            SELECT id, name, class, rollNumber, status, inactivationDate
+            FROM students
+            WHERE id IN ({placeholders})
+        ''', student_ids)
+        students = {row['id']: row for row in cursor.fetchall()}
+        
+        for record in archived:
+            student = students.get(record['student_id'])
+            if student is None:
+                continue
+            inactivation = str(student['inactivationDate'])[:10] if student['inactivationDate'] else None
+            if student['status'] != 'active' and not (inactivation and record['date'] < inactivation):
+                continue
+            row = rows.get(record['student_id'])
+            if row is None:
+                row = rows[record['student_id']] = {
+                    'student_id': student['id'], 'name': student['name'], 'class': student['class'],
+                    'present': 0, 'absent': 0, 'leave': 0, 'holiday': 0
+                }
+            if record['status'] in ('present', 'absent', 'leave', 'holiday'):
+                row[record['status']] = int(row.get(record['status']) or 0) + 1
+        
+        def order(row):
+            # Same order as ORDER BY s.class, CAST(s.rollNumber AS UNSIGNED)
+            roll = re.match(r'\d+', str(students.get(row['student_id'], {}).get('rollNumber') or ''))
+            return (row['class'] or '', int(roll.group()) if roll else 0)
+        return sorted(rows.values(), key=order)
+    
+    def get_attendance_summary(self, start_date, end_date, class_name=None, include=('day', 'class', 'student')):
+        """
+        Aggregate attendance over a date range in SQL.
+        
+        Holidays from the holidays table are excluded, and attendance recorded on or
+        after a student's inactivationDate is ignored. Returns per-day, per-class and
+        per-student present/absent/leave counts and rates, plus overall totals and the
+        number of students active on the last day of the range.
+        Totals, days and classes are read from attendance_daily_rollup; only the
+        per-student breakdown scans raw attendance rows, plus the packed archive
+        for archived months in the range.
+        """
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            cursor = conn.cursor(dictionary=True)
             
-            # Clear all attendance records
-            cursor.execute('DELETE FROM attendance')
+            rollup_sql = '''
+                FROM attendance_daily_rollup r
+                LEFT JOIN holidays h ON h.date = r.date
+                WHERE r.date BETWEEN %s AND %s
+                AND h.id IS NULL
+            '''
+            rollup_params = [start_date, end_date]
+            if class_name:
+                rollup_sql += ' AND r.class = %s'
+                rollup_params.append(class_name)
+            
+            rollup_counts_sql = '''
+                SUM(r.present) AS present,
+                SUM(r.absent) AS absent,
+                SUM(r.`leave`) AS `leave`,
+                SUM(r.holiday) AS holiday
+            '''
+            # Rollup rows exist for every class on a saved date; skip the ones with nothing recorded
+            recorded_sql = 'HAVING SUM(r.present + r.absent + r.`leave` + r.holiday) > 0'
+            
+            base_sql = '''
+                FROM attendance a
+                JOIN students s ON s.id = a.student_id
+                LEFT JOIN holidays h ON h.date = a.date
+                WHERE a.date BETWEEN %s AND %s
+                AND h.id IS NULL
+                AND (s.status = 'active' OR a.date < s.inactivationDate)
+            '''
+            params = [start_date, end_date]
+            if class_name:
+                base_sql += ' AND s.class = %s'
+                params.append(class_name)
             
-            # Insert new attendance records
-            for date, students in attendance_data.items():
-                for student_id, info in students.items():
-                    cursor.execute('''
-                        INSERT INTO attendance (student_id, date, status, reason)
-                        VALUES (%s, %s, %s, %s)
-                    ''', (student_id, date, info.get('status', 'absent'), info.get('reason', '')))
+            counts_sql = '''
+                SUM(a.status = 'present') AS present,
+                SUM(a.status = 'absent') AS absent,
+                SUM(a.status = 'leave') AS `leave`,
+                SUM(a.status = 'holiday') AS holiday
+            '''
+            
+            summary = {
+                'from': start_date,
+                'to': end_date,
+                'class': class_name
+            }
+            
+            cursor.execute(f'SELECT {rollup_counts_sql} {rollup_sql}', rollup_params)
+            summary['totals'] = self._attendance_counts(cursor.fetchone() or {})
+            
+            if 'day' in include:
+                cursor.execute(f'''
+                    SELECT r.date AS date, {rollup_counts_sql}, SUM(r.headcount) AS headcount
+                    {rollup_sql}
+                    GROUP BY r.date
+                    {recorded_sql}
+                    ORDER BY r.date
+                ''', rollup_params)
+                summary['by_day'] = [self._attendance_counts(row) for row in cursor.fetchall()]
+            
+            if 'class' in include:
+                cursor.execute(f'''
+                    SELECT NULLIF(r.class, '') AS class, {rollup_counts_sql}
+                    {rollup_sql}
+                    GROUP BY r.class
+                    {recorded_sql}
+                    ORDER BY r.class
+                ''', rollup_params)
+                summary['by_class'] = [self._attendance_counts(row) for row in cursor.fetchall()]
+            
+            if 'student' in include:
+                cursor.execute(f'''
+                    SELECT a.student_id AS student_id, s.name AS name, s.class AS class, {counts_sql}
+                    {base_sql}
+                    GROUP BY a.student_id, s.name, s.class, s.rollNumber
+                    ORDER BY s.class, CAST(s.rollNumber AS UNSIGNED)
+                ''', params)
+                by_student = cursor.fetchall()
+                archived = self._archived_attendance_rows(start_date, end_date, class_name)
+                if archived:
+                    by_student = self._add_archived_student_counts(cursor, by_student, archived)
+                summary['by_student'] = [self._attendance_counts(row) for row in by_student]
+            
+            # Students who were active on the last day of the range, per class
+            headcount_sql = '''
+                SELECT class, COUNT(*) AS count
+                FROM students
+                WHERE (status = 'active' OR inactivationDate > %s)
+            '''
+            headcount_params = [end_date]
+            if class_name:
+                headcount_sql += ' AND class = %s'
+                headcount_params.append(class_name)
+            cursor.execute(headcount_sql + ' GROUP BY class', headcount_params)
+            headcount = {row['class']: row['count'] for row in cursor.fetchall()}
+            summary['headcount'] = sum(headcount.values())
+            for row in summary.get('by_class', []):
+                row['headcount'] = headcount.get(row['class'], 0)
             
-            conn.commit()
             cursor.close()
             conn.close()
-            
+            return summary
+        
         except Error as e:
-            print(f"Error saving attendance: {e}")
+            logger.error(f"Error getting attendance summary: {e}")
             raise
-
-    def reset_attendance(self):
-        """Reset attendance data to an empty state"""
+    
+    def get_attendance_calendar(self, year, month, class_name=None):
+        """
+        Per-day attendance counts for one month, merged with holidays.
+        Every day of the month is returned; 'saved' is true when any attendance was recorded that day.
+        """
+        days_in_month = calendar.monthrange(year, month)[1]
+        start_date = f'{year:04d}-{month:02d}-01'
+        end_date = f'{year:04d}-{month:02d}-{days_in_month:02d}'
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM attendance')
-            conn.commit()
+            cursor = conn.cursor(dictionary=True)
+            
+            sql = '''
+                SELECT date,
+                    SUM(present) AS present,
+                    SUM(absent) AS absent,
+                    SUM(`leave`) AS `leave`
+                FROM attendance_daily_rollup
+                WHERE date BETWEEN %s AND %s
+            '''
+            params = [start_date, end_date]
+            if class_name:
+                sql += ' AND class = %s'
+                params.append(class_name)
+            cursor.execute(sql + ' GROUP BY date HAVING SUM(present + absent + `leave` + holiday) > 0', params)
+            recorded = {row['date']: self._attendance_counts(row) for row in cursor.fetchall()}
+            
             cursor.close()
             conn.close()
-            
+        
         except Error as e:
-            print(f"Error resetting attendance: {e}")
+            logger.error(f"Error getting attendance calendar for {year}-{month:02d}: {e}")
             raise
+        
+        holidays = {h['date']: h['name'] for h in self.get_holidays() if start_date <= h['date'] <= end_date}
+        
+        days = []
+        for day in range(1, days_in_month + 1):
+            date_str = f'{year:04d}-{month:02d}-{day:02d}'
+            counts = recorded.get(date_str) or self._attendance_counts({})
+            counts.pop('holiday', None)
+            counts.pop('date', None)
+            days.append(dict(
+                counts,
+                date=date_str,
+                saved=date_str in recorded,
+                holiday=holidays.get(date_str)
+            ))
+        
+        return {
+            'year': year,
+            'month': month,
+            'class': class_name,
+            'days': days,
+            'saved_days': len(recorded),
+            'holidays': len(holidays)
+        }
     
-    def update_attendance(self, date, student_id, status, reason=""):
-        """Update attendance for a specific student and date"""
+    def _attendance_streaks(self, rows):
+        """Present/absence streaks over (date, status) rows ordered by date"""
+        streaks = {
+            'current_present': 0,
+            'longest_present': 0,
+            'current_absence': 0,
+            'longest_absence': {'days': 0, 'from': None, 'to': None}
+        }
+        present_run = absent_run = 0
+        absent_start = None
+        for row in rows:
+            status = row['status']
+            if status == 'present':
+                present_run += 1
+                streaks['longest_present'] = max(streaks['longest_present'], present_run)
+            else:
+                present_run = 0
+            
+            if status == 'absent':
+                if absent_run == 0:
+                    absent_start = row['date']
+                absent_run += 1
+                if absent_run > streaks['longest_absence']['days']:
+                    streaks['longest_absence'] = {'days': absent_run, 'from': absent_start, 'to': row['date']}
+            else:
+                absent_run = 0
+        
+        # Runs still open at the last recorded day are the current streaks
+        streaks['current_present'] = present_run
+        streaks['current_absence'] = absent_run
+        return streaks
+    
+    def _student_attendance_stats(self, cursor, student_id, start_date, end_date):
+        """Attendance counts and streaks for one student using an open dictionary cursor"""
+        base_sql = '''
+            FROM attendance a
+            LEFT JOIN holidays h ON h.date = a.date
+            WHERE a.student_id = %s AND a.date BETWEEN %s AND %s
+            AND h.id IS NULL
+        '''
+        # No academic year configured: take the student's whole history
+        params = (student_id, start_date or '0000-00-00', end_date)
+        
+        # Both queries are range scans on unique_student_date (student_id, date)
+        cursor.execute(f'''
+            SELECT
+                SUM(a.status = 'present') AS present,
+                SUM(a.status = 'absent') AS absent,
+                SUM(a.status = 'leave') AS `leave`
+            {base_sql}
+        ''', params)
+        counts = cursor.fetchone() or {}
+        
+        cursor.execute(f"""
+            SELECT a.date AS date, a.status AS status
+            {base_sql}
+            AND a.status IN ('present', 'absent', 'leave')
+            ORDER BY a.date
+        """, params)
+        marked = cursor.fetchall()
+        
+        # Archived months are no longer in `attendance`; count them from the archive
+        archived = [row for row in self._archived_attendance_rows(start_date, end_date, student_id=student_id)
+                    if row['status'] in ('present', 'absent', 'leave')]
+        if archived:
+            for key in ('present', 'absent', 'leave'):
+                counts[key] = int(counts.get(key) or 0) + sum(1 for row in archived if row['status'] == key)
+            marked = sorted(marked + archived, key=lambda row: row['date'])
+        
+        stats = self._attendance_counts(counts)
+        stats.pop('holiday', None)
+        stats['streaks'] = self._attendance_streaks(marked)
+        stats['from'] = start_date
+        stats['to'] = end_date
+        return stats
+    
+    def _academic_year_range(self, start_date=None, end_date=None):
+        """Fill in a missing range: academicYearStart setting (or all history) up to today"""
+        end_date = end_date or self.get_timezone_aware_datetime().strftime('%Y-%m-%d')
+        start_date = start_date or self.get_app_setting('academicYearStart') or None
+        return start_date, end_date
+    
+    def get_student_attendance_stats(self, student_id, start_date=None, end_date=None):
+        """
+        Present/absent/leave counts, attendance rate and streaks for one student.
+        The range defaults to the current academic year. Returns None if the student does not exist.
+        """
+        start_date, end_date = self._academic_year_range(start_date, end_date)
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            cursor = conn.cursor(dictionary=True)
             
-            cursor.execute('''
-                INSERT INTO attendance (student_id, date, status, reason)
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                status = VALUES(status),
-                reason = VALUES(reason)
-            ''', (student_id, date, status, reason))
+            cursor.execute('SELECT 1 FROM students WHERE id = %s', (student_id,))
+            if cursor.fetchone() is None:
+                cursor.close()
+                conn.close()
+                return None
+            
+            stats = self._student_attendance_stats(cursor, student_id, start_date, end_date)
             
-            conn.commit()
             cursor.close()
             conn.close()
-            
+            return stats
+        
         except Error as e:
-            print(f"Error updating attendance: {e}")
+            logger.error(f"Error getting attendance stats for student {student_id}: {e}")
             raise
     
-    # Holidays methods
-    def get_holidays(self):
-        """Get all holidays"""
+    def get_student_profile(self, student_id, start_date=None, end_date=None, log_limit=50, history_limit=50):
+        """
+        Everything the student profile shows, read over a single pooled connection:
+        the student row, attendance stats, recent teacher logs and score history.
+        Returns None if the student does not exist.
+        """
+        start_date, end_date = self._academic_year_range(start_date, end_date)
         try:
             conn = self.get_connection()
             cursor = conn.cursor(dictionary=True)
             
-            cursor.execute('SELECT date, name FROM holidays ORDER BY date')
-            holidays = []
-            for row in cursor.fetchall():
-                holidays.append({
-                    'date': row['date'],
-                    'name': row['name']
-                })
+            cursor.execute('SELECT * FROM students WHERE id = %s', (student_id,))
+            student = cursor.fetchone()
+            if student is None:
+                cursor.close()
+                conn.close()
+                return None
+            student.pop('created_at', None)
+            
+            attendance_stats = self._student_attendance_stats(cursor, student_id, start_date, end_date)
+            
+            cursor.execute('''
+                SELECT * FROM teacher_logs
+                WHERE student_id = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            ''', (student_id, log_limit))
+            logs = self.timezone.localize_rows(cursor.fetchall(), self._LOG_TIMESTAMPS)
+            
+            cursor.execute('''
+                SELECT * FROM score_change_history
+                WHERE student_id = %s
+                ORDER BY changed_at DESC
+                LIMIT %s
+            ''', (student_id, history_limit))
+            score_history = self.timezone.localize_rows(cursor.fetchall(), self._SCORE_HISTORY_TIMESTAMPS)
             
             cursor.close()
             conn.close()
-            return holidays
             
+            return {
+                'student': student,
+                'score': student.get('current_score') or 0,
+                'attendance_stats': attendance_stats,
+                'logs': logs,
+                'score_history': score_history
+            }
+        
+        except Error as e:
+            logger.error(f"Error getting profile for student {student_id}: {e}")
+            raise
+    
+    # Holidays methods
+    def get_holidays(self):
+        """Get all holidays"""
+        try:
+            return self.cache.get_or_load('holidays', 'all', self._query_holidays)
         except Error as e:
             print(f"Error getting holidays: {e}")
             return []
     
+    def _query_holidays(self):
+        """Load all holidays from the database"""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute('SELECT date, name FROM holidays ORDER BY date')
+        holidays = []
+        for row in cursor.fetchall():
+            holidays.append({
+                'date': row['date'],
+                'name': row['name']
+            })
+        
+        cursor.close()
+        conn.close()
+        return holidays
+    
     def save_holidays(self, holidays):
         """Save holidays list"""
         try:
@@ -1015,6 +2066,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('holidays')
             
         except Error as e:
             print(f"Error saving holidays: {e}")
@@ -1036,6 +2088,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('holidays')
             return True
             
         except Error as e:
@@ -1053,6 +2106,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('holidays')
             return True
             
         except Error as e:
@@ -1063,17 +2117,21 @@ class MySQLDatabase:
     def get_classes(self):
         """Get all classes from the database"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute('SELECT * FROM classes ORDER BY name')
-            classes = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return classes
+            return self.cache.get_or_load('classes', 'all', self._query_classes)
         except Error as e:
             logger.error(f"Error getting classes: {e}")
             return []
 
+    def _query_classes(self):
+        """Load all classes from the database"""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('SELECT * FROM classes ORDER BY name')
+        classes = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return classes
+    
     def add_class(self, name):
         """Add a new class"""
         try:
@@ -1084,6 +2142,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('classes')
             return class_id
         except Error as e:
             logger.error(f"Error adding class: {e}")
@@ -1091,31 +2150,40 @@ class MySQLDatabase:
 
     def update_class(self, class_id, new_name):
         """Update an existing class's name"""
+        conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            conn.start_transaction()
             # First, update the students table
             cursor.execute('SELECT name FROM classes WHERE id = %s', (class_id,))
             old_name_row = cursor.fetchone()
             if old_name_row:
                 old_name = old_name_row[0]
                 cursor.execute('UPDATE students SET class = %s WHERE class = %s', (new_name, old_name))
+                attendance_rollup.refresh(cursor, classes=[old_name, new_name])
 
             # Then, update the classes table
             cursor.execute('UPDATE classes SET name = %s WHERE id = %s', (new_name, class_id))
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('classes', 'students')
             return True
         except Error as e:
             logger.error(f"Error updating class: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
             raise
 
     def delete_class(self, class_id):
         """Delete a class"""
+        conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            conn.start_transaction()
             # Get the class name before deleting
             cursor.execute('SELECT name FROM classes WHERE id = %s', (class_id,))
             class_name_row = cursor.fetchone()
@@ -1124,14 +2192,19 @@ class MySQLDatabase:
                 # Optional: Handle students in the deleted class. Here we'll set their class to NULL.
                 # A better approach might be to prevent deletion if students exist.
                 cursor.execute('UPDATE students SET class = NULL WHERE class = %s', (class_name,))
+                attendance_rollup.refresh(cursor, classes=[class_name, None])
 
             cursor.execute('DELETE FROM classes WHERE id = %s', (class_id,))
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('classes', 'students', 'books')
             return True
         except Error as e:
             logger.error(f"Error deleting class: {e}")
+            if conn is not None:
+                conn.rollback()
+                conn.close()
             raise
     
     # Education Progress methods
@@ -1361,12 +2434,8 @@ class MySQLDatabase:
                 ORDER BY change_date DESC
             ''', (progress_id,))
             
-            history = cursor.fetchall()
-            
             # Format datetime fields for consistent display in local time
-            for record in history:
-                if 'change_date' in record and record['change_date']:
-                    record['change_date'] = self.convert_utc_to_local(record['change_date'])
+            history = self.timezone.localize_rows(cursor.fetchall(), ('change_date',))
             
             cursor.close()
             conn.close()
@@ -1390,12 +2459,8 @@ class MySQLDatabase:
                 ORDER BY h.change_date DESC
             ''', (book_id, class_id))
             
-            history = cursor.fetchall()
-            
             # Format datetime fields for consistent display in local time
-            for record in history:
-                if 'change_date' in record and record['change_date']:
-                    record['change_date'] = self.convert_utc_to_local(record['change_date'])
+            history = self.timezone.localize_rows(cursor.fetchall(), ('change_date',))
             
             cursor.close()
             conn.close()
@@ -1409,24 +2474,27 @@ class MySQLDatabase:
     def get_app_setting(self, setting_key):
         """Get a specific app setting by key"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute('''
-                SELECT setting_value FROM app_settings 
-                WHERE setting_key = %s
-            ''', (setting_key,))
-            
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            return result['setting_value'] if result else None
-            
+            return self.cache.get_or_load('settings', setting_key, lambda: self._query_app_setting(setting_key))
         except Error as e:
             print(f"Error getting app setting {setting_key}: {e}")
             return None
     
+    def _query_app_setting(self, setting_key):
+        """Load a single app setting from the database"""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute('''
+            SELECT setting_value FROM app_settings 
+            WHERE setting_key = %s
+        ''', (setting_key,))
+        
+        result = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        
+        return result['setting_value'] if result else None
+    
     def set_app_setting(self, setting_key, setting_value, description=None):
         """Set or update an app setting"""
         try:
@@ -1445,6 +2513,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('settings')
             return True
             
         except Error as e:
@@ -1454,30 +2523,33 @@ class MySQLDatabase:
     def get_all_app_settings(self):
         """Get all app settings as a dictionary"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute('''
-                SELECT setting_key, setting_value, description 
-                FROM app_settings 
-                ORDER BY setting_key
-            ''')
-            
-            settings = {}
-            for row in cursor.fetchall():
-                settings[row['setting_key']] = {
-                    'value': row['setting_value'],
-                    'description': row['description']
-                }
-            
-            cursor.close()
-            conn.close()
-            return settings
-            
+            return self.cache.get_or_load('settings', '*', self._query_all_app_settings)
         except Error as e:
             print(f"Error getting all app settings: {e}")
             return {}
     
+    def _query_all_app_settings(self):
+        """Load all app settings from the database"""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute('''
+            SELECT setting_key, setting_value, description 
+            FROM app_settings 
+            ORDER BY setting_key
+        ''')
+        
+        settings = {}
+        for row in cursor.fetchall():
+            settings[row['setting_key']] = {
+                'value': row['setting_value'],
+                'description': row['description']
+            }
+        
+        cursor.close()
+        conn.close()
+        return settings
+    
     def delete_app_setting(self, setting_key):
         """Delete an app setting"""
         try:
@@ -1489,6 +2561,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('settings')
             return True
             
         except Error as e:
@@ -1537,6 +2610,7 @@ class MySQLDatabase:
             
             log_id = cursor.lastrowid
             conn.commit()
+            self.cache.invalidate('teacher_logs')
             cursor.close()
             conn.close()
             
@@ -1569,7 +2643,7 @@ class MySQLDatabase:
                     ORDER BY created_at DESC
                 ''', (class_name,))
             
-            logs = cursor.fetchall()
+            logs = self.timezone.localize_rows(cursor.fetchall(), self._LOG_TIMESTAMPS)
             cursor.close()
             conn.close()
             
@@ -1582,6 +2656,240 @@ class MySQLDatabase:
             logger.error(f"Unexpected error getting teacher logs: {e}")
             return []
     
+    # Timestamp columns converted to display time by the log and score history readers
+    _LOG_TIMESTAMPS = ('created_at', 'updated_at')
+    _SCORE_HISTORY_TIMESTAMPS = ('changed_at',)
+    
+    # ===== KEYSET PAGINATION =====
+    
+    def _encode_cursor(self, row, time_column):
+        """Opaque cursor pointing just past `row` in (time_column, id) DESC order"""
+        raw = json.dumps([str(row[time_column]), row['id']])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    def _decode_cursor(self, cursor_token):
+        """Inverse of _encode_cursor; raises ValueError for malformed cursors"""
+        try:
+            timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor_token.encode('ascii')))
+            return timestamp, int(row_id)
+        except (ValueError, TypeError, UnicodeError):
+            raise ValueError("Invalid cursor")
+    
+    def _keyset_page(self, table, time_column, where_sql, params, limit, cursor_token=None):
+        """
+        One page of `table` rows newest first, ordered by (time_column, id).
+        Returns {'items', 'next_cursor', 'limit'}; next_cursor is None on the last page.
+        """
+        if cursor_token:
+            timestamp, row_id = self._decode_cursor(cursor_token)
+            where_sql += f' AND ({time_column} < %s OR ({time_column} = %s AND id < %s))'
+            params = list(params) + [timestamp, timestamp, row_id]
+        
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        # Fetch one extra row to learn whether another page exists
+        cursor.execute(f'''
+            SELECT * FROM {table}
+            WHERE {where_sql}
+            ORDER BY {time_column} DESC, id DESC
+            LIMIT %s
+        ''', list(params) + [limit + 1])
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        items = rows[:limit]
+        # The cursor keeps the stored UTC value; callers localize the items afterwards
+        next_cursor = self._encode_cursor(items[-1], time_column) if len(rows) > limit else None
+        return {'items': items, 'next_cursor': next_cursor, 'limit': limit}
+    
+    def get_teacher_logs_page(self, class_name, student_id=None, limit=50, cursor=None):
+        """Keyset-paginated teacher logs for a class or student, newest first"""
+        where_sql = 'class_name = %s'
+        params = [class_name]
+        if student_id:
+            where_sql += ' AND student_id = %s'
+            params.append(student_id)
+        try:
+            page = self._keyset_page('teacher_logs', 'created_at', where_sql, params, limit, cursor)
+            self.timezone.localize_rows(page['items'], self._LOG_TIMESTAMPS)
+            return page
+        except Error as e:
+            logger.error(f"Error getting teacher logs page: {e}")
+            raise
+    
+    # Alert categories over idx_important_followup (is_important, needs_followup).
+    # "is_important IN (0, 1)" lets the follow-up filter use the index as a range.
+    _LOG_ALERT_FILTERS = {
+        'important': 'l.is_important = 1 AND l.needs_followup = 0',
+        'followup': 'l.is_important IN (0, 1) AND l.needs_followup = 1'
+    }
+    
+    def get_teacher_log_alerts(self, kinds=('important', 'followup'), limit=20, offset=0, class_name=None):
+        """
+        Important and follow-up teacher logs across all classes.
+        Returns counts for every category plus one page (limit/offset) of the newest logs per requested category.
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            class_sql = ' AND l.class_name = %s' if class_name else ''
+            class_params = [class_name] if class_name else []
+            
+            # Covering scan of the index, grouped by flag combination
+            cursor.execute(f'''
+                SELECT l.is_important AS is_important, l.needs_followup AS needs_followup, COUNT(*) AS count
+                FROM teacher_logs l
+                WHERE (l.is_important = 1 OR l.needs_followup = 1){class_sql}
+                GROUP BY l.is_important, l.needs_followup
+            ''', class_params)
+            counts = {'important': 0, 'followup': 0}
+            for row in cursor.fetchall():
+                if row['needs_followup']:
+                    counts['followup'] += row['count']
+                elif row['is_important']:
+                    counts['important'] += row['count']
+            
+            alerts = {'counts': counts}
+            for kind in kinds:
+                cursor.execute(f'''
+                    SELECT l.*, s.name AS student_name, s.rollNumber AS student_roll
+                    FROM teacher_logs l
+                    LEFT JOIN students s ON s.id = l.student_id
+                    WHERE {self._LOG_ALERT_FILTERS[kind]}{class_sql}
+                    ORDER BY l.created_at DESC, l.id DESC
+                    LIMIT %s OFFSET %s
+                ''', class_params + [limit, offset])
+                items = self.timezone.localize_rows(cursor.fetchall(), self._LOG_TIMESTAMPS)
+                alerts[kind] = {
+                    'total': counts[kind],
+                    'limit': limit,
+                    'offset': offset,
+                    'has_more': offset + len(items) < counts[kind],
+                    'items': items
+                }
+            
+            cursor.close()
+            conn.close()
+            return alerts
+            
+        except Error as e:
+            logger.error(f"Error getting teacher log alerts: {e}")
+            raise
+    
+    # ===== DASHBOARD ALERTS =====
+    
+    DEFAULT_ALERT_CONFIG = {
+        'LOW_SCORE_THRESHOLD': 60,
+        'CRITICAL_SCORE_THRESHOLD': 50,
+        'LOW_CLASS_AVERAGE_THRESHOLD': 70
+    }
+    
+    def get_alert_config(self):
+        """alertConfig from app_settings merged over the defaults"""
+        config = dict(self.DEFAULT_ALERT_CONFIG)
+        value = self.get_app_setting('alertConfig')
+        if value:
+            try:
+                saved = json.loads(value) if isinstance(value, str) else value
+                if isinstance(saved, dict):
+                    config.update(saved)
+            except ValueError:
+                logger.warning("DB: Ignoring invalid alertConfig setting")
+        return config
+    
+    def get_dashboard_alerts(self, today, log_limit=50):
+        """
+        Ready-to-render dashboard alerts for the given day.
+        Cached briefly; any student, attendance, teacher log or settings write drops the entry.
+        """
+        return self.cache.get_or_load(
+            'dashboard_alerts', (today, log_limit),
+            lambda: self._query_dashboard_alerts(today, log_limit),
+            ttl=self.dashboard_alerts_ttl,
+            depends_on=('students', 'attendance', 'teacher_logs', 'settings')
+        )
+    
+    def _query_dashboard_alerts(self, today, log_limit):
+        """Evaluate score thresholds, today's absentees and log flags in set-based queries"""
+        config = self.get_alert_config()
+        critical_threshold = float(config['CRITICAL_SCORE_THRESHOLD'])
+        low_threshold = float(config['LOW_SCORE_THRESHOLD'])
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            # A score of 0 means "not scored yet" and never raises an alert
+            cursor.execute('''
+                SELECT id, name, fatherName, rollNumber, class, current_score AS score
+                FROM students
+                WHERE status = 'active' AND current_score > 0 AND current_score < %s
+                ORDER BY current_score, class, CAST(rollNumber AS UNSIGNED)
+            ''', (max(critical_threshold, low_threshold),))
+            critical_students, low_students = [], []
+            for row in cursor.fetchall():
+                if row['score'] < critical_threshold:
+                    critical_students.append(row)
+                elif row['score'] < low_threshold:
+                    low_students.append(row)
+            
+            # Absentees among students who were still enrolled on that day
+            cursor.execute('''
+                SELECT s.id, s.name, s.fatherName, s.rollNumber, s.class, a.status, a.reason
+                FROM attendance a
+                JOIN students s ON s.id = a.student_id
+                WHERE a.date = %s AND a.status = 'absent'
+                AND (s.status = 'active' OR (s.status = 'inactive' AND s.inactivationDate > %s))
+                ORDER BY s.class, CAST(s.rollNumber AS UNSIGNED)
+            ''', (today, today))
+            absent_rows = cursor.fetchall()
+            
+            cursor.close()
+            conn.close()
+        
+        except Error as e:
+            logger.error(f"Error getting dashboard alerts: {e}")
+            raise
+        
+        log_alerts = self.get_teacher_log_alerts(limit=log_limit)
+        
+        alerts = []
+        if critical_students:
+            alerts.append({
+                'alertType': 'critical', 'type': 'danger', 'icon': 'fas fa-exclamation-triangle',
+                'count': len(critical_students), 'threshold': config['CRITICAL_SCORE_THRESHOLD'],
+                'students': critical_students
+            })
+        if low_students:
+            alerts.append({
+                'alertType': 'low', 'type': 'warning', 'icon': 'fas fa-user-times',
+                'count': len(low_students), 'threshold': config['LOW_SCORE_THRESHOLD'],
+                'students': low_students
+            })
+        if absent_rows:
+            alerts.append({
+                'alertType': 'absent', 'type': 'info', 'icon': 'fas fa-user-clock',
+                'count': len(absent_rows),
+                'students': [{k: v for k, v in row.items() if k not in ('status', 'reason')} for row in absent_rows],
+                'todayAttendance': {row['id']: {'status': row['status'], 'reason': row['reason']} for row in absent_rows}
+            })
+        if log_alerts['counts']['important']:
+            alerts.append({
+                'alertType': 'important_logs', 'type': 'danger', 'icon': 'fas fa-exclamation-circle',
+                'count': log_alerts['counts']['important'],
+                'logs': log_alerts['important']['items']
+            })
+        if log_alerts['counts']['followup']:
+            alerts.append({
+                'alertType': 'followup_logs', 'type': 'warning', 'icon': 'fas fa-tasks',
+                'count': log_alerts['counts']['followup'],
+                'logs': log_alerts['followup']['items']
+            })
+        
+        return {'date': today, 'config': config, 'alerts': alerts}
+    
     def update_teacher_log(self, log_id, log_data):
         """Update an existing teacher log"""
         try:
@@ -1602,6 +2910,7 @@ class MySQLDatabase:
             
             rows_affected = cursor.rowcount
             conn.commit()
+            self.cache.invalidate('teacher_logs')
             cursor.close()
             conn.close()
             
@@ -1629,6 +2938,7 @@ class MySQLDatabase:
             
             rows_affected = cursor.rowcount
             conn.commit()
+            self.cache.invalidate('teacher_logs')
             cursor.close()
             conn.close()
             
@@ -1703,6 +3013,7 @@ class MySQLDatabase:
             ''', (student_id, old_score, new_score, reason))
             
             conn.commit()
+            self.cache.invalidate('students')
             cursor.close()
             conn.close()
             
@@ -1728,7 +3039,7 @@ class MySQLDatabase:
                 ORDER BY changed_at DESC
             ''', (student_id,))
             
-            history = cursor.fetchall()
+            history = self.timezone.localize_rows(cursor.fetchall(), self._SCORE_HISTORY_TIMESTAMPS)
             cursor.close()
             conn.close()
             
@@ -1741,6 +3052,98 @@ class MySQLDatabase:
             logger.error(f"Unexpected error getting score history: {e}")
             return []
     
+    def get_score_history_page(self, student_id, limit=50, cursor=None):
+        """Keyset-paginated score change history for a student, newest first"""
+        try:
+            page = self._keyset_page('score_change_history', 'changed_at', 'student_id = %s', [student_id], limit, cursor)
+            self.timezone.localize_rows(page['items'], self._SCORE_HISTORY_TIMESTAMPS)
+            return page
+        except Error as e:
+            logger.error(f"Error getting score history page: {e}")
+            raise
+    
+    def get_score_tier(self, score):
+        """Performance tier for a score: mustaid (>=80), mutawassit (60-79), mujtahid (<60)"""
+        if score >= 80:
+            return 'mustaid'
+        elif score >= 60:
+            return 'mutawassit'
+        return 'mujtahid'
+    
+    def get_all_student_scores(self, class_name=None):
+        """
+        Get current scores for all active students with a single query.
+        
+        Returns a dict with:
+            scores: {student_id: {'score', 'class', 'name'}}
+            tiers: overall tier counts for students with a score above 0
+            class_averages: {class: {'average', 'count', 'mustaid', 'mutawassit', 'mujtahid'}}
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            if class_name:
+                cursor.execute('''
+                    SELECT id, name, class, current_score
+                    FROM students
+                    WHERE status = 'active' AND class = %s
+                ''', (class_name,))
+            else:
+                cursor.execute('''
+                    SELECT id, name, class, current_score
+                    FROM students
+                    WHERE status = 'active'
+                ''')
+            rows = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            
+            scores = {}
+            tiers = {'mustaid': 0, 'mutawassit': 0, 'mujtahid': 0}
+            class_totals = {}
+            for row in rows:
+                score = row['current_score']
+                if score is None:
+                    continue
+                scores[row['id']] = {
+                    'score': score,
+                    'class': row['class'],
+                    'name': row['name']
+                }
+                
+                # Unscored students (0) are left out of tiers and averages
+                if score > 0:
+                    tier = self.get_score_tier(score)
+                    tiers[tier] += 1
+                    totals = class_totals.setdefault(row['class'], {
+                        'total': 0, 'count': 0, 'mustaid': 0, 'mutawassit': 0, 'mujtahid': 0
+                    })
+                    totals['total'] += score
+                    totals['count'] += 1
+                    totals[tier] += 1
+            
+            class_averages = {}
+            for name, totals in class_totals.items():
+                class_averages[name] = {
+                    'average': int(totals['total'] / totals['count'] + 0.5),
+                    'count': totals['count'],
+                    'mustaid': totals['mustaid'],
+                    'mutawassit': totals['mutawassit'],
+                    'mujtahid': totals['mujtahid']
+                }
+            
+            return {
+                'total_students': len(rows),
+                'scores': scores,
+                'tiers': tiers,
+                'class_averages': class_averages
+            }
+        
+        except Error as e:
+            logger.error(f"Error getting all student scores: {e}")
+            raise
+    
     def get_students_with_scores(self, class_name=None):
         """Get all students with their current scores"""
         try:
@@ -1779,23 +3182,26 @@ class MySQLDatabase:
     def get_books(self, class_id=None):
         """Get all books or books for a specific class"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            if class_id:
-                cursor.execute('SELECT * FROM books WHERE class_id = %s ORDER BY book_name', (class_id,))
-            else:
-                cursor.execute('SELECT * FROM books ORDER BY book_name')
-            
-            books = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return books
-            
+            return self.cache.get_or_load('books', class_id or 'all', lambda: self._query_books(class_id))
         except Error as e:
             print(f"Error getting books: {e}")
             raise
     
+    def _query_books(self, class_id=None):
+        """Load books from the database"""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        if class_id:
+            cursor.execute('SELECT * FROM books WHERE class_id = %s ORDER BY book_name', (class_id,))
+        else:
+            cursor.execute('SELECT * FROM books ORDER BY book_name')
+        
+        books = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return books
+    
     def add_book(self, book_name, class_id=None, total_pages=None):
         """Add a new book and create corresponding education progress record"""
         try:
@@ -1835,6 +3241,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('books')
             return book_id
             
         except Error as e:
@@ -1853,6 +3260,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('books')
             return True
             
         except Error as e:
@@ -1874,6 +3282,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('books')
             return True
             
         except Error as e:
@@ -2031,7 +3440,8 @@ class MySQLDatabase:
     def update_user(self, user_id, username=None, role=None, class_name=None, is_active=None):
         """Update user information"""
         try:
-            logger.info(f"Updating user {user_id} with: username={username}, role={role}, class_name={class_name}, is_active={is_active}")
+            logger.debug("Updating user %s with: username=%s, role=%s, class_name=%s, is_active=%s",
+                         user_id, username, role, class_name, is_active)
             
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -2058,7 +3468,7 @@ class MySQLDatabase:
             if updates:
                 params.append(user_id)
                 query = f"UPDATE users_new SET {', '.join(updates)} WHERE id = %s"
-                logger.info(f"Executing query: {query} with params: {params}")
+                logger.debug("Executing query: %s", query)
                 cursor.execute(query, params)
                 
                 rows_affected = cursor.rowcount
@@ -2166,6 +3576,7 @@ class MySQLDatabase:
             conn.commit()
             cursor.close()
             conn.close()
+            self.cache.invalidate('books')
             
             logger.info(f"Deleted {rows_affected} books and their related data")
             return True
@@ -2188,6 +3599,7 @@ class MySQLDatabase:
             
             rows_affected = cursor.rowcount
             conn.commit()
+            self.cache.invalidate('teacher_logs')
             cursor.close()
             conn.close()
             
@@ -2216,6 +3628,7 @@ class MySQLDatabase:
             scores_reset = cursor.rowcount
             
             conn.commit()
+            self.cache.invalidate('students')
             cursor.close()
             conn.close()
             
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Query Statistics
+Timing of MySQLDatabase methods and SQL statements, with a slow-query log
+
+MySQLDatabase.get_connection() wraps every pooled connection it hands out,
+so each statement executed through it is timed (execute plus fetches) and
+attributed to the database method that checked the connection out. No
+method has to be changed to be measured.
+"""
+
+import re
+import time
+import threading
+import logging
+from collections import deque
+
+# Configure logging
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('madani_maktab.slow_query')
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+MAX_STATEMENT_LENGTH = 300
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and IN (%s, %s, ...) lists so one query shape is one entry"""
+    sql = _WHITESPACE.sub(' ', str(sql)).strip()
+    sql = _PLACEHOLDER_LIST.sub('%s, ...', sql)
+    return sql if len(sql) <= MAX_STATEMENT_LENGTH else sql[:MAX_STATEMENT_LENGTH] + '...'
+
+
+def redact_params(params, many=False):
+    """Describe parameters by type only, so names, phone numbers etc. never reach logs"""
+    if params is None:
+        return None
+    if many:
+        rows = list(params) if not isinstance(params, (list, tuple)) else params
+        return f"{len(rows)} rows of {redact_params(rows[0]) if rows else '[]'}"
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+class _Totals:
+    """Running totals for one method or statement"""
+
+    __slots__ = ('calls', 'total', 'max', 'rows')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def add(self, seconds, rows):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.rows += rows
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'total_ms': round(self.total * 1000, 2),
+            'avg_ms': round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max * 1000, 2),
+            'rows': self.rows
+        }
+
+
+class QueryStats:
+    """
+    Per-method and per-statement timings for this worker.
+
+    Statements slower than `slow_threshold` seconds are logged to the
+    'madani_maktab.slow_query' logger and kept in a ring buffer of the last
+    `slow_buffer_size` slow statements, with their parameters redacted.
+    """
+
+    def __init__(self, slow_threshold=0.5, slow_buffer_size=50, enabled=True):
+        self.enabled = enabled
+        self.slow_threshold = float(slow_threshold)
+        self._lock = threading.Lock()
+        self._methods = {}
+        self._acquire = {}
+        self._statements = {}
+        self._slow = deque(maxlen=int(slow_buffer_size))
+
+    def record_acquire(self, method, seconds):
+        with self._lock:
+            totals = self._acquire.get(method)
+            if totals is None:
+                totals = self._acquire[method] = _Totals()
+            totals.add(seconds, 0)
+
+    def record_statement(self, method, sql, params, many, seconds, rows):
+        statement = normalize_sql(sql)
+        with self._lock:
+            for registry, key in ((self._methods, method), (self._statements, statement)):
+                totals = registry.get(key)
+                if totals is None:
+                    totals = registry[key] = _Totals()
+                totals.add(seconds, rows)
+            if seconds >= self.slow_threshold:
+                entry = {
+                    'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'method': method,
+                    'statement': statement,
+                    'params': redact_params(params, many),
+                    'ms': round(seconds * 1000, 2),
+                    'rows': rows
+                }
+                self._slow.append(entry)
+            else:
+                entry = None
+        if entry is not None:
+            slow_query_logger.warning(
+                "Slow query in %s: %sms, %s rows: %s params=%s",
+                method, entry['ms'], rows, statement, entry['params']
+            )
+
+    def snapshot(self, top=20):
+        """Top methods and statements by total time, plus the recent slow statements (slowest first)"""
+        def ranked(registry):
+            items = sorted(registry.items(), key=lambda item: item[1].total, reverse=True)
+            return [dict(totals.as_dict(), name=name) for name, totals in items[:top]]
+
+        with self._lock:
+            methods = ranked(self._methods)
+            for method in methods:
+                acquire = self._acquire.get(method['name'])
+                # 'calls' counts statements; 'connections' counts checkouts (roughly, method calls)
+                method['connections'] = acquire.calls if acquire else 0
+                method['acquire_ms'] = round(acquire.total * 1000, 2) if acquire else 0.0
+                method['acquire_max_ms'] = round(acquire.max * 1000, 2) if acquire else 0.0
+            return {
+                'enabled': self.enabled,
+                'slow_threshold_ms': round(self.slow_threshold * 1000, 2),
+                'methods': methods,
+                'statements': ranked(self._statements),
+                'slow': sorted(self._slow, key=lambda entry: entry['ms'], reverse=True)
+            }
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+            self._acquire.clear()
+            self._statements.clear()
+            self._slow.clear()
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times each statement from execute() through its fetches.
+    A statement is recorded when the next one starts or the cursor closes.
+    """
+
+    def __init__(self, cursor, stats, method):
+        self._cursor = cursor
+        self._stats = stats
+        self._method = method
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        sql, params, many, seconds, fetched = pending
+        rows = fetched
+        if rows is None:
+            try:
+                rows = max(self._cursor.rowcount, 0)
+            except Exception:
+                rows = 0
+        self._stats.record_statement(self._method, sql, params, many, seconds, rows)
+
+    def _run(self, call, sql, params, many):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self._pending = [sql, params, many, time.perf_counter() - started, None]
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(lambda: self._cursor.execute(operation, params, *args, **kwargs), operation, params, False)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._run(lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs), operation, seq_params, True)
+
+    def _fetch(self, call, count):
+        started = time.perf_counter()
+        result = call()
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - started
+            self._pending[4] = (self._pending[4] or 0) + count(result)
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone, lambda row: 0 if row is None else 1)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetch(lambda: self._cursor.fetchmany(*args, **kwargs), len)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall, len)
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors report to QueryStats under the checking-out method's name"""
+
+    def __init__(self, conn, stats, method):
+        self._conn = conn
+        self._stats = stats
+        self._method = method
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._stats, self._method)
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        # Record statements whose cursor was never closed
+        for cursor in self._cursors:
+            cursor._finish()
+        self._cursors = []
+        return self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Madani Maktab - Display Timezone
+Converts the UTC timestamps stored in MySQL into display-local strings
+
+Every connection runs with time_zone '+00:00', so TIMESTAMP columns come
+back as naive UTC datetimes. DISPLAY_TIMEZONE_OFFSET ("+06:00", "-05:30")
+is parsed once; converting a value is then one addition and one C-level
+isoformat call, and whole result sets are converted in a single pass.
+An empty offset means the server's own local time.
+"""
+
+import os
+import logging
+from datetime import datetime, date, timezone, timedelta
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISPLAY_OFFSET = '+06:00'
+
+
+def parse_offset(value):
+    """'+06:00' -> timedelta(hours=6); raises ValueError for anything else"""
+    value = (value or '').strip()
+    if len(value) < 2 or value[0] not in '+-':
+        raise ValueError(f"Timezone offset must look like +06:00, got {value!r}")
+    hours, _, minutes = value[1:].partition(':')
+    delta = timedelta(hours=int(hours), minutes=int(minutes or 0))
+    if delta >= timedelta(hours=24):
+        raise ValueError(f"Timezone offset out of range: {value!r}")
+    return -delta if value[0] == '-' else delta
+
+
+class TimezoneService:
+    """UTC -> display-local conversion with the offset parsed up front"""
+
+    def __init__(self, offset=DEFAULT_DISPLAY_OFFSET):
+        self.offset = offset or ''
+        self._delta = None
+        if self.offset:
+            try:
+                self._delta = parse_offset(self.offset)
+            except ValueError as e:
+                logger.warning(f"TimezoneService: {e}; using the server's local time")
+        self.tzinfo = timezone(self._delta) if self._delta is not None else None
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('DISPLAY_TIMEZONE_OFFSET', DEFAULT_DISPLAY_OFFSET))
+
+    def to_local(self, value):
+        """
+        'YYYY-MM-DD HH:MM:SS' in display time for a UTC datetime (naive or aware).
+        None and strings pass through unchanged; dates are formatted as they are.
+        """
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, datetime):
+            if self._delta is not None:
+                if value.tzinfo is None:
+                    local = value + self._delta
+                else:
+                    local = value.astimezone(self.tzinfo).replace(tzinfo=None)
+            else:
+                if value.tzinfo is None:
+                    value = value.replace(tzinfo=timezone.utc)
+                local = value.astimezone().replace(tzinfo=None)
+            return local.isoformat(sep=' ', timespec='seconds')
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+
+    def today(self):
+        """Today's date ('YYYY-MM-DD') in display time"""
+        return self.to_local(datetime.now(timezone.utc))[:10]
+
+    def localize_rows(self, rows, fields):
+        """Convert the given timestamp fields of every row in place; returns the rows"""
+        to_local = self.to_local
+        for row in rows:
+            for field in fields:
+                value = row.get(field)
+                if value is not None:
+                    row[field] = to_local(value)
+        return rows
+
+    def info(self):
+        """Configured display offset, for the timezone debug endpoint"""
+        return {
+            'display_offset': self.offset or None,
+            'display_tz': str(self.tzinfo) if self.tzinfo is not None else 'server local time',
+            'display_now': self.to_local(datetime.now(timezone.utc))
+        }
@@ -36,6 +36,39 @@ function updateDateInputMax() {
     }
 }
 
+// Dates outside the startup window that have been fetched on demand
+const fetchedAttendanceDates = new Set();
+
+function isAttendanceDateLoaded(date) {
+    return Boolean(window.attendanceLoadedFrom && date >= window.attendanceLoadedFrom) || fetchedAttendanceDates.has(date);
+}
+
+// Startup only loads recent attendance (see main.js); fetch an older date before it is
+// shown or saved, so a save never starts from an empty sheet. Returns false on failure.
+async function ensureAttendanceLoaded(date) {
+    if (isAttendanceDateLoaded(date)) {
+        return true;
+    }
+    let url = `/api/attendance?from=${date}&to=${date}`;
+    if (window.currentUser && window.currentUser.role === 'user' && window.currentUser.class_name) {
+        url += `&class=${encodeURIComponent(window.currentUser.class_name)}`;
+    }
+    try {
+        const response = await fetch(url);
+        if (!response.ok) {
+            console.error(`Failed to load attendance for ${date}:`, response.status);
+            return false;
+        }
+        const data = await response.json();
+        attendance[date] = data[date] || {};
+        fetchedAttendanceDates.add(date);
+        return true;
+    } catch (error) {
+        console.error(`Error loading attendance for ${date}:`, error);
+        return false;
+    }
+}
+
 async function loadAttendanceForDate() {
     let selectedDate = document.getElementById('attendanceDate').value;
     const attendanceList = document.getElementById('attendanceList');
@@ -70,6 +103,11 @@ async function loadAttendanceForDate() {
         return;
     }
     
+    if (!(await ensureAttendanceLoaded(selectedDate))) {
+        attendanceList.innerHTML = '<p>Failed to load attendance for this date. Please try again.</p>';
+        return;
+    }
+    
     // Initialize attendance record for the day if it doesn't exist
     if (!attendance[selectedDate]) {
         attendance[selectedDate] = {};
@@ -207,6 +245,11 @@ async function copyPreviousDayAttendance() {
     selectedDateObj.setDate(selectedDateObj.getDate() - 1);
     const previousDate = selectedDateObj.toISOString().split('T')[0];
 
+    if (!(await ensureAttendanceLoaded(selectedDate)) || !(await ensureAttendanceLoaded(previousDate))) {
+        showModal(t('error'), 'Failed to load attendance. Please try again.');
+        return;
+    }
+
     if (attendance[previousDate] && Object.keys(attendance[previousDate]).length > 0) {
         // Deep copy the attendance data
         attendance[selectedDate] = JSON.parse(JSON.stringify(attendance[previousDate]));
@@ -436,6 +479,12 @@ async function saveAttendance() {
     
     console.log('Saving attendance for date:', selectedDate);
     
+    // Never save a date whose stored attendance has not been loaded
+    if (!isAttendanceDateLoaded(selectedDate)) {
+        showModal(t('error'), 'Attendance for this date has not been loaded yet. Please reopen the date and try again.');
+        return;
+    }
+    
     // Holiday status is now allowed - no restrictions
     
     // Initialize attendance record for the day if it doesn't exist
@@ -489,14 +538,8 @@ async function saveAttendance() {
     console.log('Current attendance object before save:', attendance);
     
     try {
-        // Save to database via API
-        const response = await fetch('/api/attendance', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(attendance)
-        });
+        // Save only this date to the database via API
+        const response = await saveAttendanceForDate(selectedDate);
         
         if (response.ok) {
         console.log('Attendance saved successfully to database');
@@ -552,6 +595,45 @@ async function saveAttendance() {
     }
 }
 
+// Save a single date's attendance; the server only rewrites rows that changed
+// The server merges saved attendance: students left out of the payload keep their stored
+// record. Students this client manages but has no mark for are sent as 'neutral' so that
+// clearing them is saved, without touching classes the client never loaded.
+function attendancePayload(date) {
+    const records = { ...(attendance[date] || {}) };
+    students.forEach(student => {
+        if (!records[student.id]) {
+            records[student.id] = { status: 'neutral', reason: '' };
+        }
+    });
+    return records;
+}
+
+function saveAttendanceForDate(date) {
+    return fetch(`/api/attendance/${date}`, {
+        method: 'PUT',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(attendancePayload(date))
+    });
+}
+
+// Save several dates in one request (and one database transaction)
+function saveAttendanceForDates(dates) {
+    const days = {};
+    dates.forEach(date => {
+        days[date] = attendancePayload(date);
+    });
+    return fetch('/api/attendance', {
+        method: 'PUT',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(days)
+    });
+}
+
 async function applyStickyAttendanceToFuture(savedDate) {
     console.log('Applying sticky attendance to future dates from:', savedDate);
     
@@ -600,15 +682,9 @@ async function applyStickyAttendanceToFuture(savedDate) {
         }
     });
     
-    // Save the updated attendance to the database
+    // Save the updated dates to the database
     try {
-        const response = await fetch('/api/attendance', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(attendance)
-        });
+        const response = await saveAttendanceForDates(futureDates);
         
                  if (response.ok) {
              console.log('Sticky attendance applied to future dates successfully');
@@ -679,15 +755,9 @@ async function cleanupStickyAttendanceData() {
     if (datesToRemove.length > 0) {
         console.log(`Cleaned up ${datesToRemove.length} auto-applied future dates`);
         
-        // Save the cleaned attendance data to database
+        // Clear the removed dates in the database
         try {
-            const response = await fetch('/api/attendance', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(attendance)
-            });
+            const response = await saveAttendanceForDates(datesToRemove);
             
             if (response.ok) {
                 console.log('Cleaned attendance data saved to database');
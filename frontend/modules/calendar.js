@@ -87,16 +87,63 @@ function changeCalendarYear() {
     }
 }
 
-function refreshCalendar() {
+// Per-month calendar data from /api/attendance/calendar, keyed by 'YYYY-MM'
+const calendarMonthCache = {};
+
+function calendarMonthKey(year, month) {
+    return `${year}-${String(month + 1).padStart(2, '0')}`;
+}
+
+function getCalendarMonthData(year, month) {
+    return calendarMonthCache[calendarMonthKey(year, month)] || null;
+}
+
+async function loadCalendarMonth(year, month) {
+    const params = new URLSearchParams({ year, month: month + 1 });
+    if (window.currentUser && window.currentUser.role === 'user' && window.currentUser.class_name) {
+        params.set('class', window.currentUser.class_name);
+    }
+    try {
+        const response = await fetch(`/api/attendance/calendar?${params}`);
+        if (response.ok) {
+            const data = await response.json();
+            calendarMonthCache[calendarMonthKey(year, month)] = data;
+            return data;
+        }
+        console.error('Failed to load calendar month:', response.status);
+    } catch (error) {
+        console.error('Error loading calendar month:', error);
+    }
+    return null;
+}
+
+function renderCalendarSection() {
     const calendarSection = document.querySelector('.attendance-tracking-section');
     if (calendarSection) {
-        console.log('Refreshing calendar for month:', currentCalendarMonth + 1, 'year:', currentCalendarYear);
         const newCalendarHTML = generateAttendanceTrackingCalendar(currentCalendarMonth, currentCalendarYear);
         calendarSection.outerHTML = newCalendarHTML;
-        console.log('Calendar refreshed successfully');
-    } else {
+        return true;
+    }
+    return false;
+}
+
+function refreshCalendar() {
+    console.log('Refreshing calendar for month:', currentCalendarMonth + 1, 'year:', currentCalendarYear);
+    if (!renderCalendarSection()) {
         console.log('Calendar section not found for refresh');
+        return;
     }
+    
+    // Re-render once the month's server data arrives (unless the user has moved on)
+    const year = currentCalendarYear;
+    const month = currentCalendarMonth;
+    loadCalendarMonth(year, month).then(data => {
+        if (data && year === currentCalendarYear && month === currentCalendarMonth) {
+            renderCalendarSection();
+            generateAttendanceSummary(year, month);
+            console.log('Calendar refreshed successfully');
+        }
+    });
 }
 
 function forceRefreshAttendanceCalendar() {
@@ -183,12 +230,15 @@ function generateCalendarDays(year, month, startDayOfWeek, daysInMonth) {
         calendarHTML += '<div class="calendar-day empty"></div>';
     }
     
+    const monthData = getCalendarMonthData(year, month);
+    
     // Add days of the month
     for (let day = 1; day <= daysInMonth; day++) {
         const date = new Date(year, month, day);
         // Use local date to avoid timezone issues with toISOString()
         const dateStr = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
         const dayOfWeek = date.getDay(); // 0 = Sunday, 6 = Saturday
+        const dayData = monthData ? monthData.days[day - 1] : null;
         
         let dayClass = 'calendar-day';
         let dayTitle = dateStr;
@@ -198,12 +248,16 @@ function generateCalendarDays(year, month, startDayOfWeek, daysInMonth) {
             dayClass += ' before-academic-year';
             dayTitle = `Before academic year start (${formatDate(academicYearStartDate)})`;
         }
-        // Note: Holiday status is now handled in attendance data, not displayed here
         // Check if attendance was saved to database (priority over future date)
-        else if (savedAttendanceDates.has(dateStr)) {
+        else if (savedAttendanceDates.has(dateStr) || (dayData && dayData.saved)) {
             dayClass += ' attendance-taken';
-            dayTitle = `Attendance saved on ${dateStr}`;
-            console.log(`Date ${dateStr} marked as attendance-taken (saved)`);
+            dayTitle = dayData && dayData.saved
+                ? `Attendance saved on ${dateStr} (${dayData.present} present, ${dayData.absent} absent, ${dayData.leave} leave)`
+                : `Attendance saved on ${dateStr}`;
+        }
+        else if (dayData && dayData.holiday) {
+            dayClass += ' holiday-day';
+            dayTitle = `Holiday: ${dayData.holiday}`;
         }
         // Check if it's a future date (after checking attendance status)
         else if (date > today) {
@@ -241,15 +295,21 @@ function generateAttendanceSummary(year, month) {
     let totalMissed = 0;
     let holidaysCount = 0;
     const missedDates = [];
+    const monthData = getCalendarMonthData(year, month);
 
     for (let d = new Date(startDate); d <= endDate; d.setDate(d.getDate() + 1)) {
-        const dateString = d.toISOString().split('T')[0];
+        const dateString = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+        const dayData = monthData ? monthData.days[d.getDate() - 1] : null;
         const dayOfWeek = d.getDay();
         const isWeekend = dayOfWeek === 5; // Assuming Friday is the weekend
+        const isSaved = dayData
+            ? dayData.saved || savedAttendanceDates.has(dateString)
+            : attendance[dateString] && Object.keys(attendance[dateString]).length > 0;
 
-        // Note: Holiday status is now handled in attendance data, not counted here
-        if (!isWeekend) {
-            if (attendance[dateString] && Object.keys(attendance[dateString]).length > 0) {
+        if (dayData && dayData.holiday && !isSaved) {
+            holidaysCount++;
+        } else if (!isWeekend) {
+            if (isSaved) {
                 totalTaken++;
         } else {
                 if (d < new Date()) { // Only count missed days in the past
@@ -337,4 +397,4 @@ async function selectCalendarDate(dateStr) {
     }, 100);
 }
 
-export { navigateCalendar, canNavigateToMonth, changeCalendarMonth, changeCalendarYear, refreshCalendar, forceRefreshAttendanceCalendar, refreshAttendanceCalendarIfVisible, goToCurrentMonth, generateCalendarDays, generateAttendanceSummary, selectCalendarDate }
+export { navigateCalendar, canNavigateToMonth, changeCalendarMonth, changeCalendarYear, loadCalendarMonth, refreshCalendar, forceRefreshAttendanceCalendar, refreshAttendanceCalendarIfVisible, goToCurrentMonth, generateCalendarDays, generateAttendanceSummary, selectCalendarDate }
@@ -54,34 +54,43 @@ async function updateDashboard() {
     
     let presentCount = 0;
     let absentCount = 0;
+    let activeCount = activeStudentsForToday.length;
     
-    // Count attendance properly for active students only
-    for (const studentId in todayAttendance) {
-        // Only count if this student was active for today
-        const student = students.find(s => s.id === studentId);
-        if (student) {
-            const isActiveForToday = student.status === 'active' || 
-                (student.status === 'inactive' && student.inactivationDate && 
-                 (() => {
-                     const parsedDate = parseInactivationDate(student.inactivationDate);
-                     return parsedDate ? today < parsedDate : false;
-                 })());
+    // Prefer the server-side aggregation; fall back to counting the loaded data
+    const summary = await fetchAttendanceSummary(today, today, 'class');
+    if (summary) {
+        presentCount = summary.totals.present;
+        absentCount = summary.totals.absent;
+        activeCount = summary.headcount;
+    } else {
+        // Count attendance properly for active students only
+        for (const studentId in todayAttendance) {
+            // Only count if this student was active for today
+            const student = students.find(s => s.id === studentId);
+            if (student) {
+                const isActiveForToday = student.status === 'active' || 
+                    (student.status === 'inactive' && student.inactivationDate && 
+                     (() => {
+                         const parsedDate = parseInactivationDate(student.inactivationDate);
+                         return parsedDate ? today < parsedDate : false;
+                     })());
             
-            if (isActiveForToday) {
-                const att = todayAttendance[studentId];
-                if (att && att.status === 'present') {
-                    presentCount++;
-                } else if (att && att.status === 'absent') {
-                    absentCount++;
+                if (isActiveForToday) {
+                    const att = todayAttendance[studentId];
+                    if (att && att.status === 'present') {
+                        presentCount++;
+                    } else if (att && att.status === 'absent') {
+                        absentCount++;
+                    }
+                    // Note: Holiday status is not counted in present/absent for attendance rate calculation
                 }
-                // Note: Holiday status is not counted in present/absent for attendance rate calculation
             }
         }
     }
     
-    const unmarkedCount = activeStudentsForToday.length - presentCount - absentCount;
+    const unmarkedCount = activeCount - presentCount - absentCount;
     
-    console.log('Active students for today:', activeStudentsForToday.length);
+    console.log('Active students for today:', activeCount);
     console.log('Attendance counts - Present:', presentCount, 'Absent:', absentCount, 'Unmarked:', unmarkedCount);
     
     // Force update DOM elements with immediate value changes
@@ -91,7 +100,7 @@ async function updateDashboard() {
     const totalElement = document.getElementById('totalStudents');
     
     if (totalElement) {
-        totalElement.textContent = activeStudentsForToday.length;
+        totalElement.textContent = activeCount;
         totalElement.style.color = '#2c3e50';
     }
     
@@ -113,7 +122,7 @@ async function updateDashboard() {
         attendanceRate = Math.round((presentCount / (presentCount + absentCount)) * 100);
     }
     
-    console.log('Final dashboard values - Total:', activeStudentsForToday.length, 'Present:', presentCount, 'Absent:', absentCount, 'Rate:', attendanceRate + '%');
+    console.log('Final dashboard values - Total:', activeCount, 'Present:', presentCount, 'Absent:', absentCount, 'Rate:', attendanceRate + '%');
     
     if (rateElement) {
         rateElement.textContent = `${attendanceRate}%`;
@@ -135,6 +144,24 @@ async function updateDashboard() {
     }
 }
 
+// Fetch server-side attendance aggregates (counts per day/class/student) for a date range
+async function fetchAttendanceSummary(from, to, include = 'day,class,student', className = null) {
+    try {
+        const params = new URLSearchParams({ from, to, include });
+        if (className) {
+            params.append('class', className);
+        }
+        const response = await fetch(`/api/attendance/summary?${params}`);
+        if (response.ok) {
+            return await response.json();
+        }
+        console.error('❌ Failed to fetch attendance summary');
+    } catch (error) {
+        console.error('❌ Error fetching attendance summary:', error);
+    }
+    return null;
+}
+
 function updateTodayOverview() {
     // Use local date methods to avoid timezone issues (same as attendance module)
     const today = getTodayString();
@@ -308,46 +335,21 @@ async function updateClassWiseStats() {
     // Fetch all student scores in one batch API call
     console.log('🔄 Fetching all student scores in batch...');
     try {
-        const response = await fetch('/api/all-student-scores');
+        const response = await fetch('/api/all-student-scores?include=class_averages');
         if (response.ok) {
             const scoresData = await response.json();
-            const allScores = scoresData.scores || {};
+            const classAverages = scoresData.class_averages || {};
             
             console.log(`✅ Fetched scores for ${scoresData.scores_fetched} students in batch`);
             
-            // Calculate performance metrics for each class using batch data
+            // Apply per-class averages and tier counts computed on the server
             Object.keys(classSummary).forEach(className => {
-                const classStudents = students.filter(student => 
-                    student.class === className && student.status === 'active'
-                );
-                
-                if (classStudents.length > 0) {
-                    const classScores = [];
-                    
-                    // Get scores for students in this class from batch data
-                    classStudents.forEach(student => {
-                        const studentScoreData = allScores[student.id];
-                        if (studentScoreData && studentScoreData.score > 0) {
-                            classScores.push(studentScoreData.score);
-                        }
-                    });
-                    
-                    if (classScores.length > 0) {
-                        // Calculate average score
-                        const totalScore = classScores.reduce((sum, score) => sum + score, 0);
-                        classSummary[className].averageScore = Math.round(totalScore / classScores.length);
-                        
-                        // Categorize students into performance tiers
-                        classScores.forEach(score => {
-                            if (score >= 80) {
-                                classSummary[className].mustaidCount++;
-                            } else if (score >= 60) {
-                                classSummary[className].mutawassitCount++;
-                            } else {
-                                classSummary[className].mujtahidCount++;
-                            }
-                        });
-                    }
+                const classScores = classAverages[className];
+                if (classScores) {
+                    classSummary[className].averageScore = classScores.average;
+                    classSummary[className].mustaidCount = classScores.mustaid;
+                    classSummary[className].mutawassitCount = classScores.mutawassit;
+                    classSummary[className].mujtahidCount = classScores.mujtahid;
                 }
             });
         } else {
@@ -518,10 +520,14 @@ function generateAttendanceTrackingCalendar(month = null, year = null) {
 
 
 // Function to refresh attendance data from server
-async function refreshAttendanceData() {
+// Only the recent window is fetched; it is merged into the already-loaded history
+async function refreshAttendanceData(days = 31) {
     try {
         console.log('🔄 Refreshing attendance data from server...');
-        const response = await fetch('/api/attendance');
+        const fromDate = new Date();
+        fromDate.setDate(fromDate.getDate() - days);
+        const from = fromDate.toISOString().split('T')[0];
+        const response = await fetch(`/api/attendance?from=${from}`);
         if (response.ok) {
             const newAttendanceData = await response.json();
             // Update the global attendance object
@@ -540,52 +546,27 @@ async function updatePerformanceMetrics() {
     try {
         console.log('🔄 Updating performance metrics...');
         
-        // Get all active students
-        const activeStudents = students.filter(student => student.status === 'active');
-        
-        if (activeStudents.length === 0) {
-            console.log('⚠️ No active students found for performance metrics');
+        // Fetch tier counts for all active students in one request
+        const response = await fetch('/api/all-student-scores?include=tiers');
+        if (!response.ok) {
+            console.error('❌ Failed to fetch score tiers:', response.status);
             return;
         }
         
-        // Fetch scores for all active students
-        const scorePromises = activeStudents.map(async (student) => {
-            try {
-                const response = await fetch(`/api/student-scores/${student.id}`);
-                if (response.ok) {
-                    const data = await response.json();
-                    return data.score || 0;
-                }
-                return 0;
-            } catch (error) {
-                console.error(`❌ Error fetching score for student ${student.id}:`, error);
-                return 0;
-            }
-        });
+        const scoresData = await response.json();
+        const tiers = scoresData.tiers || {};
         
-        const scores = await Promise.all(scorePromises);
-        const validScores = scores.filter(score => score > 0);
+        // Performance tiers: ≥80 Excellent (Green), 60-79 Average (Orange), <60 Needs Improvement (Red)
+        const mustaidCount = tiers.mustaid || 0;
+        const mutawassitCount = tiers.mutawassit || 0;
+        const mujtahidCount = tiers.mujtahid || 0;
+        const scoredCount = mustaidCount + mutawassitCount + mujtahidCount;
         
-        if (validScores.length === 0) {
+        if (scoredCount === 0) {
             console.log('⚠️ No valid scores found for performance metrics');
             return;
         }
         
-        // Categorize students into performance tiers
-        let mustaidCount = 0;    // ≥80: Excellent (Green)
-        let mutawassitCount = 0; // 60-79: Average (Orange)
-        let mujtahidCount = 0;   // <60: Needs Improvement (Red)
-        
-        validScores.forEach(score => {
-            if (score >= 80) {
-                mustaidCount++;
-            } else if (score >= 60) {
-                mutawassitCount++;
-            } else {
-                mujtahidCount++;
-            }
-        });
-        
         // Update DOM elements
         const mustaidElement = document.getElementById('mustaidCount');
         const mutawassitElement = document.getElementById('mutawassitCount');
@@ -599,7 +580,7 @@ async function updatePerformanceMetrics() {
             mustaidCount,
             mutawassitCount,
             mujtahidCount,
-            totalStudents: validScores.length
+            totalStudents: scoredCount
         });
         
     } catch (error) {
@@ -620,188 +601,30 @@ async function updateMainDashboardAlerts() {
             return;
         }
         
-        // Get alert configuration from database with localStorage fallback
-        let alertConfig = {
-            LOW_SCORE_THRESHOLD: 60,
-            CRITICAL_SCORE_THRESHOLD: 50,
-            LOW_CLASS_AVERAGE_THRESHOLD: 70
-        };
-        
-        try {
-            const response = await fetch('/api/settings/alertConfig');
-            if (response.ok) {
-                const data = await response.json();
-                const savedConfig = JSON.parse(data.value || '{}');
-                alertConfig = { ...alertConfig, ...savedConfig };
-            } else {
-                // Fallback to localStorage
-                const saved = localStorage.getItem('alertConfig');
-                if (saved) {
-                    const savedConfig = JSON.parse(saved);
-                    alertConfig = { ...alertConfig, ...savedConfig };
-                }
-            }
-        } catch (error) {
-            console.error('Error loading alert config from database:', error);
-            // Fallback to localStorage
-            const saved = localStorage.getItem('alertConfig');
-            if (saved) {
-                try {
-                    const savedConfig = JSON.parse(saved);
-                    alertConfig = { ...alertConfig, ...savedConfig };
-                } catch (e) {
-                    console.error('Error loading alert config from localStorage:', e);
-                }
-            }
-        }
-        
-        // Get all active students
-        const activeStudents = students.filter(student => student.status === 'active');
-        
-        if (activeStudents.length === 0) {
-            alertsContainer.style.display = 'none';
-            return;
-        }
-        
-        const alerts = [];
-        
-        // Check for students with low scores across all classes
-        const lowScoreStudents = [];
-        const criticalScoreStudents = [];
-        
-        // Fetch scores for all active students
-        for (const student of activeStudents) {
-            try {
-                const response = await fetch(`/api/student-scores/${student.id}`);
-                if (response.ok) {
-                    const data = await response.json();
-                    const score = data.score || 0;
-                    
-                    if (score > 0) {
-                        if (score < alertConfig.CRITICAL_SCORE_THRESHOLD) {
-                            criticalScoreStudents.push({ ...student, score });
-                        } else if (score < alertConfig.LOW_SCORE_THRESHOLD) {
-                            lowScoreStudents.push({ ...student, score });
-                        }
-                    }
-                }
-            } catch (error) {
-                console.error(`❌ Error fetching score for student ${student.id}:`, error);
-            }
-        }
-        
-        // Add critical score alert
-        if (criticalScoreStudents.length > 0) {
-            alerts.push({
-                type: 'danger',
-                icon: 'fas fa-exclamation-triangle',
-                title: t('critical_students'),
-                message: `${criticalScoreStudents.length} ${t('students_have_scores_below')} ${alertConfig.CRITICAL_SCORE_THRESHOLD}`,
-                action: t('view_details'),
-                students: criticalScoreStudents,
-                alertType: 'critical'
-            });
-        }
-        
-        // Add low score alert
-        if (lowScoreStudents.length > 0) {
-            alerts.push({
-                type: 'warning',
-                icon: 'fas fa-user-times',
-                title: t('low_score_students'),
-                message: `${lowScoreStudents.length} ${t('students_have_scores_below')} ${alertConfig.LOW_SCORE_THRESHOLD}`,
-                action: t('view_details'),
-                students: lowScoreStudents,
-                alertType: 'low'
-            });
+        // Alerts are evaluated server-side against alertConfig
+        const response = await fetch(`/api/dashboard/alerts?date=${getTodayString()}`);
+        if (!response.ok) {
+            throw new Error(`Failed to load dashboard alerts: ${response.status}`);
         }
+        const data = await response.json();
         
-        // Check for today's absent students
-        const today = getTodayString();
-        const todayAttendance = attendance[today] || {};
-        
-        // Get active students for today
-        const activeStudentsForToday = students.filter(student => {
-            if (student.status === 'active') {
-                return true;
-            }
-            if (student.status === 'inactive' && student.inactivationDate) {
-                const parsedInactivationDate = parseInactivationDate(student.inactivationDate);
-                return parsedInactivationDate ? today < parsedInactivationDate : false;
+        const alerts = data.alerts.map(alert => {
+            switch (alert.alertType) {
+                case 'critical':
+                    return { ...alert, title: t('critical_students'), message: `${alert.count} ${t('students_have_scores_below')} ${alert.threshold}`, action: t('view_details') };
+                case 'low':
+                    return { ...alert, title: t('low_score_students'), message: `${alert.count} ${t('students_have_scores_below')} ${alert.threshold}`, action: t('view_details') };
+                case 'absent':
+                    return { ...alert, title: 'Today\'s Absent Students', message: `${alert.count} students are absent today`, action: 'View Details' };
+                case 'important_logs':
+                    return { ...alert, title: 'Important Teacher Logs', message: `${alert.count} important logs require attention`, action: 'View Logs' };
+                case 'followup_logs':
+                    return { ...alert, title: 'Logs Needing Follow-up', message: `${alert.count} logs require follow-up action`, action: 'View Logs' };
+                default:
+                    return { ...alert, title: alert.alertType, message: `${alert.count}`, action: t('view_details') };
             }
-            return false;
         });
         
-        const absentStudents = activeStudentsForToday.filter(student => 
-            todayAttendance[student.id] && todayAttendance[student.id].status === 'absent'
-        );
-        
-        // Add absent students alert
-        if (absentStudents.length > 0) {
-            alerts.push({
-                type: 'info',
-                icon: 'fas fa-user-clock',
-                title: 'Today\'s Absent Students',
-                message: `${absentStudents.length} students are absent today`,
-                action: 'View Details',
-                students: absentStudents,
-                alertType: 'absent',
-                todayAttendance: todayAttendance
-            });
-        }
-        
-        // Check for important teacher logs across all classes
-        try {
-            // Get all unique classes from students
-            const allClasses = [...new Set(students.map(student => student.class))];
-            const allLogs = [];
-            
-            // Fetch logs from each class
-            for (const className of allClasses) {
-                try {
-                    const logsResponse = await fetch(`/api/teacher-logs?class=${encodeURIComponent(className)}`);
-                    if (logsResponse.ok) {
-                        const classLogs = await logsResponse.json();
-                        allLogs.push(...classLogs);
-                    }
-                } catch (classError) {
-                    console.error(`❌ Error fetching logs for class ${className}:`, classError);
-                }
-            }
-            
-            // Filter for important logs
-            const importantLogs = allLogs.filter(log => log.is_important && !log.needs_followup);
-            const followupLogs = allLogs.filter(log => log.needs_followup);
-            
-            // Add important logs alert
-            if (importantLogs.length > 0) {
-                alerts.push({
-                    type: 'danger',
-                    icon: 'fas fa-exclamation-circle',
-                    title: 'Important Teacher Logs',
-                    message: `${importantLogs.length} important logs require attention`,
-                    action: 'View Logs',
-                    logs: importantLogs,
-                    alertType: 'important_logs'
-                });
-            }
-            
-            // Add follow-up required logs alert
-            if (followupLogs.length > 0) {
-                alerts.push({
-                    type: 'warning',
-                    icon: 'fas fa-tasks',
-                    title: 'Logs Needing Follow-up',
-                    message: `${followupLogs.length} logs require follow-up action`,
-                    action: 'View Logs',
-                    logs: followupLogs,
-                    alertType: 'followup_logs'
-                });
-            }
-        } catch (error) {
-            console.error('❌ Error fetching teacher logs for alerts:', error);
-        }
-        
         // Render alerts
         if (alerts.length === 0) {
             alertsContainer.style.display = 'none';
@@ -1014,12 +837,13 @@ function showTeachersCornerForClass(className) {
 async function showStudentLogsModal(studentId, studentInfo, className) {
     try {
         // Fetch student's logs from API
-        const response = await fetch(`/api/teacher-logs?class=${encodeURIComponent(className)}&student_id=${studentId}`);
+        // Newest page of the student's logs
+        const response = await fetch(`/api/teacher-logs?class=${encodeURIComponent(className)}&student_id=${studentId}&limit=100`);
         if (!response.ok) {
             throw new Error('Failed to fetch student logs');
         }
         
-        const studentLogs = await response.json();
+        const studentLogs = (await response.json()).items;
         
         // Find student details
         const student = students.find(s => s.id === studentId);
@@ -1241,4 +1065,4 @@ function showAbsentStudents(students, todayAttendance) {
     document.body.appendChild(modal);
 }
 
-export { currentReportData, sortDirection, columnFilters, generateAttendanceTrackingCalendar, updateClassWiseStats, updateDashboard, updateTodayOverview, refreshAttendanceData, updatePerformanceMetrics, updateMainDashboardAlerts, showLowScoreStudents, showAbsentStudents, toggleAlertDetails, renderAlertDetails, showTeachersCornerForClass, showStudentLogsModal }
+export { currentReportData, sortDirection, columnFilters, generateAttendanceTrackingCalendar, updateClassWiseStats, updateDashboard, updateTodayOverview, refreshAttendanceData, fetchAttendanceSummary, updatePerformanceMetrics, updateMainDashboardAlerts, showLowScoreStudents, showAbsentStudents, toggleAlertDetails, renderAlertDetails, showTeachersCornerForClass, showStudentLogsModal }
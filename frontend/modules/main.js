@@ -263,6 +263,16 @@ async function refreshStudentsData() {
 }
 
 // Initialize application data from database
+// Startup loads only recent attendance (and any sticky future dates), the same window
+// the dashboard refreshes; reports fetch the range they cover themselves
+const STARTUP_ATTENDANCE_DAYS = 31;
+
+function startupAttendanceFrom() {
+    const fromDate = new Date();
+    fromDate.setDate(fromDate.getDate() - STARTUP_ATTENDANCE_DAYS);
+    return fromDate.toISOString().split('T')[0];
+}
+
 async function initializeApp() {
     try {
         console.log('🔄 Initializing application data...');
@@ -291,12 +301,14 @@ async function initializeApp() {
                 console.log(`✅ Loaded ${studentsData.length} students from database`);
             }
             
-            // Load attendance from database
-            const attendanceResponse = await fetch('/api/attendance');
+            // Load recent attendance from database
+            const attendanceFrom = startupAttendanceFrom();
+            const attendanceResponse = await fetch(`/api/attendance?from=${attendanceFrom}`);
             if (attendanceResponse.ok) {
                 const attendanceData = await attendanceResponse.json();
                 // Update the global window variables directly
                 window.attendance = attendanceData;
+                window.attendanceLoadedFrom = attendanceFrom;
                 
                 // Populate savedAttendanceDates with dates that have attendance data
                 if (attendanceData && typeof attendanceData === 'object') {
@@ -338,11 +350,13 @@ async function initializeApp() {
                 console.log(`✅ Loaded ${classStudents.length} students for class ${window.currentUser.class_name}`);
             }
             
-            // Load attendance data (will be filtered later by Teachers Corner)
-            const attendanceResponse = await fetch('/api/attendance');
+            // Load attendance data for their assigned class only
+            const attendanceFrom = startupAttendanceFrom();
+            const attendanceResponse = await fetch(`/api/attendance?from=${attendanceFrom}&class=${encodeURIComponent(window.currentUser.class_name)}`);
             if (attendanceResponse.ok) {
                 const attendanceData = await attendanceResponse.json();
                 window.attendance = attendanceData;
+                window.attendanceLoadedFrom = attendanceFrom;
                 
                 // Populate savedAttendanceDates with dates that have attendance data
                 if (attendanceData && typeof attendanceData === 'object') {
@@ -374,6 +374,10 @@ function showAttendanceCalendar() {
                 calendarToggle.insertAdjacentHTML('afterend', calendarHTML);
                 toggleButton.innerHTML = `📅 ${t('hideAttendanceTrackingCalendar')}`;
                 console.log('Calendar created and inserted successfully');
+                // Fill in per-day counts and holidays for the month from the server
+                if (typeof refreshCalendar === 'function') {
+                    refreshCalendar();
+                }
             } else {
                 console.error('Calendar toggle section not found');
             }
@@ -427,8 +431,15 @@ function generateReportWithDates(startDate, endDate, selectedClass, fromBeginnin
         reportResults.innerHTML = '<p><i class="fas fa-spinner fa-spin"></i> Generating report...</p>';
     
     // Use a short timeout to allow the UI to update before processing
-    setTimeout(() => {
+    setTimeout(async () => {
         try {
+            // Startup only loads recent attendance, so fetch the report's range
+            const attendanceResponse = await fetch(`/api/attendance?from=${startDate}&to=${endDate}`);
+            if (!attendanceResponse.ok) {
+                throw new Error(`Failed to load attendance: ${attendanceResponse.status}`);
+            }
+            const reportAttendance = await attendanceResponse.json();
+            
             console.log("Filtering students...");
             // MODIFICATION: Start with only active students
             let filteredStudents = students.filter(student => student.status !== 'inactive');
@@ -449,9 +460,9 @@ function generateReportWithDates(startDate, endDate, selectedClass, fromBeginnin
                     const dateStr = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
                     
                     // Holiday status is now handled in attendance data, not blocked here
-                    if (!attendance[dateStr] || Object.keys(attendance[dateStr]).length === 0) continue;
+                    if (!reportAttendance[dateStr] || Object.keys(reportAttendance[dateStr]).length === 0) continue;
                     
-                    const record = attendance[dateStr] ? attendance[dateStr][student.id] : null;
+                    const record = reportAttendance[dateStr] ? reportAttendance[dateStr][student.id] : null;
                     
                     if (record) {
                         if (record.status === 'present') {
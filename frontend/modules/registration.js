@@ -712,7 +712,9 @@ async function importStudentsBatch(studentsData) {
 
         if (response.ok) {
             updateProgress(100, 'Import complete!');
-            showImportResults(total, total, 0, 0, 0, []); // Simplified results
+            const rowErrors = (result.errors || []).map(e => `Row ${e.row}${e.id ? ` (${e.id})` : ''}: ${e.error}`);
+            const duplicateRolls = (result.errors || []).filter(e => e.code === 'duplicate_roll').length;
+            showImportResults(total, result.imported + result.updated, result.failed, result.updated, duplicateRolls, rowErrors);
             
             // Refresh local student data
             const studentsResponse = await fetch('/api/students');
@@ -749,9 +751,9 @@ function showImportResults(total, successful, failed, updated, duplicateRolls, e
     
     let summaryHTML;
     if (errors && errors.length > 0) {
-        // This is now for client-side parsing errors only
+        // Per-row errors reported by the server (skipped rows)
         summaryHTML = `<div class="error-list">
-            <h5>❌ CSV Parsing Errors (${errors.length}):</h5>
+            <h5>❌ Import Errors (${errors.length}):</h5>
             <ul>${errors.slice(0, 20).map(e => `<li>${e}</li>`).join('')}</ul>
         </div>`;
     } else {
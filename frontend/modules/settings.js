@@ -1491,29 +1491,9 @@ function downloadAllStudentsCSV() {
     }
     
     try {
-        // Create CSV content with headers that match the import format exactly
-        const headers = ['id', 'name', 'fathername', 'rollnumber', 'mobilenumber', 'district', 'upazila', 'class', 'registrationdate'];
-        const csvContent = [
-            headers.join(','),
-            ...window.students.map(student => [
-                student.id || '',
-                `"${student.name || ''}"`,
-                `"${student.fatherName || ''}"`,
-                student.rollNumber || '',
-                student.mobileNumber || '',
-                `"${student.district || ''}"`,
-                `"${student.upazila || ''}"`,
-                `"${student.class || ''}"`,
-                student.registrationDate || ''
-            ].join(','))
-        ].join('\n');
-        
-        // Download CSV file with UTF-8 BOM for proper Bengali text support
-        const BOM = '\uFEFF';
-        const blob = new Blob([BOM + csvContent], { type: 'text/csv;charset=utf-8;' });
+        // The server streams the CSV (UTF-8 BOM, import-compatible headers)
         const link = document.createElement('a');
-        const url = URL.createObjectURL(blob);
-        link.setAttribute('href', url);
+        link.setAttribute('href', '/api/export/students');
         link.setAttribute('download', `students_export_${new Date().toISOString().split('T')[0]}.csv`);
         link.style.visibility = 'hidden';
         document.body.appendChild(link);
@@ -1746,7 +1726,9 @@ async function importStudentsBatch(studentsData) {
 
         if (response.ok) {
             updateProgress(100, 'Import complete!');
-            showImportResults(total, total, 0, 0, 0, []); // Simplified results
+            const rowErrors = (result.errors || []).map(e => `Row ${e.row}${e.id ? ` (${e.id})` : ''}: ${e.error}`);
+            const duplicateRolls = (result.errors || []).filter(e => e.code === 'duplicate_roll').length;
+            showImportResults(total, result.imported + result.updated, result.failed, result.updated, duplicateRolls, rowErrors);
             
             // Refresh local student data
             const studentsResponse = await fetch('/api/students');
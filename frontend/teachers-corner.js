@@ -12,9 +12,7 @@
         async function loadStudentsFromMainApp() {
             try {
                 const response = await fetch('/api/students', {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     allStudents = await response.json();
@@ -33,19 +31,20 @@
         }
         
         // Function to load attendance data from main app
+        // Teachers Corner only shows today's attendance, so only today is fetched
         async function loadAttendanceFromMainApp() {
             try {
-                const response = await fetch('/api/attendance', {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                const today = getTodayString();
+                const response = await fetch(`/api/attendance?from=${today}&to=${today}`, {
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     const attendanceData = await response.json();
                     console.log('✅ Loaded attendance data from main app');
                     
-                    // Store attendance data globally
-                    window.attendance = attendanceData;
+                    // Merge today into the main app's attendance instead of replacing its loaded window
+                    window.attendance = window.attendance || {};
+                    window.attendance[today] = attendanceData[today] || {};
                     
                     // If we have a current class, refresh the dashboard
                     if (currentClass) {
@@ -72,9 +71,7 @@
                 }
                 
                 const response = await fetch(`/api/books/class/${classId}`, {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     const books = await response.json();
@@ -101,9 +98,7 @@
                 }
                 
                 const response = await fetch(`/api/education?class_id=${classId}`, {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     const classProgress = await response.json();
@@ -133,9 +128,7 @@
                 console.log(`🔍 Frontend: Using class_id=${classId} for class '${className}'`);
                 
                 const response = await fetch(`/api/education/history/book/${bookId}/class/${classId}`, {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 console.log(`🔍 Frontend: API response status: ${response.status}`);
                 
@@ -166,9 +159,7 @@
         async function loadClassMapping() {
             try {
                 const response = await fetch('/api/classes', {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     const classes = await response.json();
@@ -301,16 +292,30 @@
         
         // --- DATABASE INTEGRATION FUNCTIONS ---
         
+        // Fetch a keyset-paginated list ({items, next_cursor}) page by page.
+        // Returns all items, or null if a page fails to load.
+        async function fetchAllPages(url, limit = 200) {
+            const items = [];
+            let cursor = null;
+            do {
+                const separator = url.includes('?') ? '&' : '?';
+                const pageUrl = `${url}${separator}limit=${limit}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+                const response = await fetch(pageUrl, { cache: 'no-cache' });
+                if (!response.ok) {
+                    return null;
+                }
+                const page = await response.json();
+                items.push(...page.items);
+                cursor = page.next_cursor;
+            } while (cursor);
+            return items;
+        }
+        
         // Load teacher logs from database
         async function loadTeacherLogsFromDatabase(className) {
             try {
-                const response = await fetch(`/api/teacher-logs?class=${encodeURIComponent(className)}`, {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
-                });
-                if (response.ok) {
-                    const logs = await response.json();
+                const logs = await fetchAllPages(`/api/teacher-logs?class=${encodeURIComponent(className)}`);
+                if (logs) {
                     console.log(`✅ Loaded ${logs.length} teacher logs for class: ${className}`);
                     
                     // Convert database format to local format for compatibility
@@ -362,9 +367,7 @@
                 // Load scores for all classes, not just the current class
                 // This ensures we have all scores available regardless of which class is selected
                 const response = await fetch(`/api/students-with-scores`, {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     const studentsWithScores = await response.json();
@@ -393,13 +396,8 @@
         // Load score change history from database
         async function loadScoreHistoryFromDatabase(studentId) {
             try {
-                const response = await fetch(`/api/student-scores/${studentId}/history`, {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
-                });
-                if (response.ok) {
-                    const history = await response.json();
+                const history = await fetchAllPages(`/api/student-scores/${studentId}/history`);
+                if (history) {
                     console.log(`✅ Loaded ${history.length} score changes for student: ${studentId}`);
                     
                     // Convert database format to local format
@@ -422,6 +420,51 @@
             }
         }
 
+        // Load everything the student profile needs in one request.
+        // Updates the local score, score history and logbook caches and returns the attendance stats.
+        async function loadStudentProfileFromDatabase(student) {
+            try {
+                const response = await fetch(`/api/students/${encodeURIComponent(student.id)}/profile`, {
+                    cache: 'no-cache'
+                });
+                if (!response.ok) {
+                    console.error('❌ Failed to load student profile from database');
+                    return null;
+                }
+                const profile = await response.json();
+                
+                studentScores[student.id] = profile.score || 0;
+                
+                scoreChangeHistory[student.id] = profile.score_history.map(change => ({
+                    date: change.changed_at,
+                    oldScore: change.old_score,
+                    newScore: change.new_score,
+                    reason: change.change_reason || 'কোন কারণ উল্লেখ করা হয়নি',
+                    changedBy: 'শিক্ষক'
+                }));
+                
+                if (!teachersLogbook[student.class]) {
+                    teachersLogbook[student.class] = { class_logs: [], student_logs: {} };
+                }
+                teachersLogbook[student.class].student_logs[student.id] = profile.logs.map(log => ({
+                    id: log.id,
+                    type: log.log_type,
+                    details: log.details,
+                    date: log.created_at,
+                    isImportant: log.is_important,
+                    needsFollowup: log.needs_followup,
+                    studentId: log.student_id,
+                    student_id: log.student_id
+                }));
+                
+                console.log(`✅ Loaded profile for student: ${student.id}`);
+                return toAttendanceStats(profile.attendance_stats);
+            } catch (error) {
+                console.error('❌ Error loading student profile:', error);
+                return null;
+            }
+        }
+
         // --- INITIALIZATION ---
         document.addEventListener('DOMContentLoaded', async () => {
             initTeachersCorner();
@@ -919,11 +962,10 @@
             let present = 0;
             let absent = 0;
             
-            // Load attendance data from main app (same endpoint as main app)
-            fetch('/api/attendance', {
-                headers: {
-                    'Cache-Control': 'no-cache'
-                }
+            // Load today's attendance for the class from main app (same endpoint as main app)
+            const classParam = currentClass ? `&class=${encodeURIComponent(currentClass)}` : '';
+            fetch(`/api/attendance?from=${today}&to=${today}${classParam}`, {
+                cache: 'no-cache'
             })
                 .then(response => response.json())
                 .then(attendanceData => {
@@ -2657,26 +2699,23 @@
             const student = allStudents.find(s => s.id === studentId);
             if (!student) return;
             
-            // Load score history from database first
-            await loadScoreHistoryFromDatabase(studentId);
+            // Load score history, logs and attendance statistics in one request
+            const attendanceStats = await loadStudentProfileFromDatabase(student) || await calculateAttendanceStats(student);
             
             // Get student data
             const score = getHusnulKhulukScore(studentId);
             const studentLogs = (teachersLogbook[student.class]?.student_logs[studentId] || []).sort((a, b) => new Date(b.date) - new Date(a.date));
             const scoreHistory = scoreChangeHistory[studentId] || [];
             
-            // Calculate attendance statistics
-            calculateAttendanceStats(student).then(attendanceStats => {
-                const printContent = generateStudentDetailPrint(student, attendanceStats, studentLogs, scoreHistory);
-                
-                // Create new window for printing
-                const printWindow = window.open('', '_blank');
-                printWindow.document.write(printContent);
-                printWindow.document.close();
-                
-                // Don't auto-print, let user decide when to print
-                // User can use the print button in the generated content
-            });
+            const printContent = generateStudentDetailPrint(student, attendanceStats, studentLogs, scoreHistory);
+            
+            // Create new window for printing
+            const printWindow = window.open('', '_blank');
+            printWindow.document.write(printContent);
+            printWindow.document.close();
+            
+            // Don't auto-print, let user decide when to print
+            // User can use the print button in the generated content
         }
         
         async function showStudentProfile(studentId) {
@@ -2684,10 +2723,8 @@
             const student = allStudents.find(s => s.id === studentId);
             if (!student) return;
             
-            // Ensure we have the latest data loaded for this student's class
-            await loadStudentScoresFromDatabase(student.class);
-            await loadTeacherLogsFromDatabase(student.class);
-            await loadScoreHistoryFromDatabase(studentId);
+            // Load the latest score, logs, score history and attendance statistics in one request
+            const attendanceStats = await loadStudentProfileFromDatabase(student) || await calculateAttendanceStats(student);
             
             const profileTitle = document.getElementById('student-profile-title');
             if (profileTitle) profileTitle.innerText = `${student.name} - বিস্তারিত প্রোফাইল`;
@@ -2695,9 +2732,6 @@
             const studentLogs = (teachersLogbook[student.class]?.student_logs[studentId] || []).sort((a, b) => new Date(b.date) - new Date(a.date));
             const scoreHistory = scoreChangeHistory[studentId] || [];
             
-            // Calculate attendance statistics (real data)
-            const attendanceStats = await calculateAttendanceStats(student);
-            
             const profileContent = `<div class="space-y-6">
                 <!-- Profile Tabs -->
                 <div class="border-b border-gray-200">
@@ -3329,45 +3363,28 @@
             alert('তরবিয়াহ লক্ষ্যগুলি সংরক্ষিত হয়েছে।');
         }
         
-        // Calculate attendance statistics for student profile
+        // Convert server attendance stats to the shape the profile templates use
+        function toAttendanceStats(stats) {
+            return {
+                present: stats.present,
+                absent: stats.absent,
+                leave: stats.leave,
+                totalSchoolDays: stats.total,
+                attendanceRate: Math.round(stats.rate),
+                streaks: stats.streaks
+            };
+        }
+        
+        // Calculate attendance statistics for student profile (aggregated on the server)
         async function calculateAttendanceStats(student) {
             try {
-                // Fetch real attendance data for this student
-                const response = await fetch('/api/attendance', {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                const response = await fetch(`/api/students/${encodeURIComponent(student.id)}/attendance-stats`, {
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
-                    const allAttendance = await response.json();
-                    
-                    // The API returns data grouped by date: { "2025-08-18": { "ST001": { "status": "present" } } }
-                    let present = 0;
-                    let absent = 0;
-                    let leave = 0;
-                    
-                    // Iterate through all dates and find this student's attendance
-                    Object.values(allAttendance).forEach(dateAttendance => {
-                        if (dateAttendance[student.id]) {
-                            const status = dateAttendance[student.id].status;
-                            if (status === 'present') present++;
-                            else if (status === 'absent') absent++;
-                            else if (status === 'leave') leave++;
-                        }
-                    });
-                    
-                    const totalSchoolDays = present + absent + leave;
-                    const attendanceRate = totalSchoolDays > 0 ? Math.round((present / totalSchoolDays) * 100) : 0;
-                    
-                    console.log(`📊 Attendance stats for ${student.name}:`, { present, absent, leave, totalSchoolDays, attendanceRate });
-                    
-                    return {
-                        present,
-                        absent,
-                        leave,
-                        totalSchoolDays,
-                        attendanceRate
-                    };
+                    const attendanceStats = toAttendanceStats(await response.json());
+                    console.log(`📊 Attendance stats for ${student.name}:`, attendanceStats);
+                    return attendanceStats;
                 }
             } catch (error) {
                 console.error('Error fetching attendance data:', error);
@@ -3778,9 +3795,7 @@
         async function loadAlertSettings() {
             try {
                 const response = await fetch('/api/settings/alertConfig', {
-                    headers: {
-                        'Cache-Control': 'no-cache'
-                    }
+                    cache: 'no-cache'
                 });
                 if (response.ok) {
                     const data = await response.json();